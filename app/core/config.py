@@ -9,9 +9,116 @@ class Settings(BaseSettings):
     app_env: str = "local"
     ollama_url: str = "http://localhost:11434"
     model_name: str = "llama3:8b"
+    # Sent as Ollama's system prompt; empty keeps the Modelfile's
+    system_prompt: str = ""
+    embedding_model: str = "nomic-embed-text"
     allowed_origins: list[str] = ["*"]
     rate_limit_rpm: int = 60
     log_level: str = "INFO"
+    # Enables /admin endpoints and X-Profile (empty disables both)
+    admin_token: str = ""
+
+    # WebSocket chat (/api/ws/chat) per-connection limits
+    ws_max_in_flight: int = 4
+    ws_max_message_bytes: int = 8192
+    ws_idle_timeout_seconds: float = 300.0
+    ws_max_queued_events: int = 64
+
+    # Guardrail checks on larger inputs run in worker processes
+    guardrail_inline_max_chars: int = 500  # chat messages allow up to 1000
+    guardrail_workers: int = 2  # 0 keeps all checks inline
+    guardrail_timeout_seconds: float = 1.0
+
+    # Request deadlines (X-Request-Timeout header, seconds)
+    request_timeout_default_seconds: float = 30.0
+    request_timeout_max_seconds: float = 120.0
+    # /api/chat/batch: whole batch, and each item once it gets a slot
+    batch_timeout_seconds: float = 1800.0
+    batch_item_timeout_seconds: float = 30.0
+    # Generations are skipped when less than this budget remains
+    llm_min_budget_seconds: float = 0.5
+    # Used to size num_predict to the remaining budget (0 disables sizing)
+    llm_tokens_per_second: float = 20.0
+    llm_max_predict: int = 1024
+    # Deadlines leaving room for fewer tokens than this fail instead
+    llm_min_predict: int = 64
+    # Load the model on every Ollama backend before reporting ready
+    llm_warm_up_on_startup: bool = False
+
+    # Per-request profiling (kept on X-Profile, by sampling, or when slow)
+    profiling_enabled: bool = True
+    profiling_sample_ratio: float = 0.0
+    profiling_slow_threshold_ms: float = 10_000.0
+    profiling_buffer_size: int = 200
+
+    # Tracing (0 = no sampling unless an incoming traceparent is trusted)
+    tracing_sample_ratio: float = 0.0
+    # Follow the sampled flag of incoming traceparents (trusted callers only)
+    tracing_trust_incoming: bool = False
+    tracing_export_path: str = "traces.jsonl"
+    tracing_export_max_mb: float = 64.0  # then rotated to <path>.1
+    tracing_batch_size: int = 64
+    tracing_flush_interval_seconds: float = 2.0
+    tracing_max_queue: int = 4096  # spans beyond this are dropped
+
+    # Traffic recording for replay load tests (sanitized prompts, opt-in)
+    traffic_record_enabled: bool = False
+    traffic_record_path: str = "traffic.jsonl"
+    traffic_record_salt: str = ""  # empty: random per process
+
+    # Hedged requests: extra Ollama nodes that take a duplicate of slow calls
+    ollama_hedge_urls: list[str] = []
+    llm_hedge_percentile: float = 95.0
+    llm_hedge_initial_delay_seconds: float = 2.0
+    llm_hedge_budget_percent: float = 5.0
+
+    # LLM concurrency and fair scheduling
+    llm_max_concurrency: int = 4  # fixed limit, or starting point when adaptive
+    llm_adaptive_concurrency: bool = True
+    llm_concurrency_min: int = 1
+    llm_concurrency_max: int = 16
+    scheduler_batch_share: float = 0.5
+    scheduler_client_weights: dict[str, float] = {}
+    # X-API-Key values that identify a client (others are keyed by IP)
+    api_keys: list[str] = []
+
+    # Precomputed FAQ answers
+    faq_enabled: bool = True
+    faq_path: str = "app/data/faq.json"
+    faq_min_similarity: float = 0.8
+    # Generate null answers through the LLM after startup and save them to faq_path
+    faq_generate_missing: bool = False
+
+    # Semantic answer cache (kill switch: SEMANTIC_CACHE_ENABLED=false)
+    semantic_cache_enabled: bool = False
+    semantic_cache_capacity: int = 2048
+    semantic_cache_threshold: float = 0.92
+    semantic_cache_ttl_seconds: float = 3600
+
+    # Concurrent embedding calls sent as one batch (max size 1 disables)
+    embed_batch_max_size: int = 32
+    embed_batch_max_wait_ms: float = 5.0
+
+    # Persistent response cache shared by workers (SQLite, WAL mode);
+    # invalidated when model_name or system_prompt changes
+    response_cache_enabled: bool = False
+    response_cache_path: str = "response_cache.sqlite3"
+    response_cache_max_mb: float = 64.0
+    response_cache_ttl_seconds: float = 7 * 24 * 3600
+    response_cache_compact_interval_seconds: float = 300.0
+
+    # Conversation sessions
+    session_store_backend: str = "memory"  # "memory" | "sqlite"
+    session_store_path: str = "sessions.sqlite3"
+    session_max_turns: int = 10
+    session_ttl_seconds: int = 1800
+    session_max_total_chars: int = 2_000_000
+    session_summary_max_chars: int = 1000  # 0 disables summarisation
+
+    # Ollama KV context reuse across turns of a session
+    ollama_context_reuse: bool = True
+    ollama_context_cache_sessions: int = 1000
+    ollama_context_max_tokens: int = 8192
 
     model_config = SettingsConfigDict(
         env_file=f".env.{_env}",
@@ -14,3 +14,13 @@ class RateLimitError(Exception):
 class ValidationError(Exception):
     """Raised when input/output validation fails"""
     pass
+
+
+class DeadlineExceededError(Exception):
+    """Raised when a request's time budget is exhausted"""
+    pass
+
+
+class SessionNotFoundError(Exception):
+    """Raised when a session_id was not issued by this server or has expired"""
+    pass
@@ -1,7 +1,19 @@
 """Input/output validation and filtering guardrails"""
 
+import asyncio
+import multiprocessing
 import re
+from collections.abc import Callable
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from typing import Any, TypeVar
+from app.core.config import get_settings
 from app.core.exceptions import ValidationError
+from app.core.metrics import metrics
+from app.core.tracing import traced
+
+T = TypeVar("T")
 
 
 # XSS and script injection patterns
@@ -18,7 +30,14 @@ DANGEROUS_PATTERNS = [
     r"window\.",  # window access
 ]
 
+# All patterns as one alternation so each input is scanned once
+_DANGEROUS_RE = re.compile(
+    "|".join(f"(?:{pattern})" for pattern in DANGEROUS_PATTERNS),
+    re.IGNORECASE | re.DOTALL,
+)
+
 
+@traced("guardrails.validate_input")
 def validate_input(text: str, max_length: int = 10000) -> str:
     """
     Validate and filter user input for XSS/injection attacks
@@ -43,13 +62,35 @@ def validate_input(text: str, max_length: int = 10000) -> str:
         raise ValidationError(f"Input exceeds maximum length of {max_length} characters")
     
     # Check for dangerous patterns (case-insensitive)
-    for pattern in DANGEROUS_PATTERNS:
-        if re.search(pattern, text, re.IGNORECASE | re.DOTALL):
-            raise ValidationError(f"Input contains potentially dangerous content")
+    if _DANGEROUS_RE.search(text):
+        raise ValidationError(f"Input contains potentially dangerous content")
     
     return text.strip()
 
 
+def validate_inputs(
+    texts: list[str], max_length: int = 10000
+) -> list[str | ValidationError]:
+    """
+    Validate a batch of user inputs in one pass
+    
+    Args:
+        texts: User inputs to validate
+        max_length: Maximum allowed length per input
+        
+    Returns:
+        Per input, either the cleaned text or the ValidationError it raised
+    """
+    results: list[str | ValidationError] = []
+    for text in texts:
+        try:
+            results.append(validate_input(text, max_length=max_length))
+        except ValidationError as e:
+            results.append(e)
+    return results
+
+
+@traced("guardrails.validate_output")
 def validate_output(text: str) -> str:
     """
     Validate and clean LLM output
@@ -72,3 +113,116 @@ def validate_output(text: str) -> str:
         raise ValidationError("LLM returned empty response")
     
     return cleaned
+
+
+class GuardrailPool:
+    """
+    Size-based offload of guardrail checks to a bounded process pool
+
+    Checks on inputs up to `inline_max_chars` run inline; they take about
+    a millisecond at worst. Larger inputs, including single chat messages
+    above half of their 1000-character limit (where crafted input such as
+    a run of "on" costs several milliseconds), and batches are scanned in
+    worker processes so the event loop keeps serving other connections. Threads
+    would not help here: `re` holds the GIL for the whole search. A check
+    that does not finish within `timeout` fails closed with a
+    ValidationError; the worker finishes the (length-capped) scan on its
+    own and returns to the pool.
+    """
+    
+    def __init__(
+        self,
+        max_workers: int = 2,
+        inline_max_chars: int = 500,
+        timeout: float = 1.0,
+    ):
+        """
+        Initialize guardrail pool
+        
+        Args:
+            max_workers: Worker processes (0 keeps every check inline)
+            inline_max_chars: Largest total input size checked inline
+            timeout: Seconds an offloaded check may take
+        """
+        self.max_workers = max_workers
+        self.inline_max_chars = inline_max_chars
+        self.timeout = timeout
+        self._executor: ProcessPoolExecutor | None = None
+        self._started: list[Future] = []
+    
+    def start(self) -> None:
+        """Create the pool and start its workers ahead of the first large input"""
+        if self.max_workers <= 0 or self._executor is not None:
+            return
+        # Spawned workers do not inherit the server's threads or sockets
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+        self._started = [self._executor.submit(int) for _ in range(self.max_workers)]
+    
+    async def wait_ready(self) -> None:
+        """Start the pool and wait until its workers have answered once"""
+        self.start()
+        await asyncio.gather(*(asyncio.wrap_future(f) for f in self._started))
+    
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+    
+    async def run(self, func: Callable[..., T], *args: Any, size: int) -> T:
+        """Run a guardrail check inline or in the pool depending on `size`"""
+        if size <= self.inline_max_chars or self.max_workers <= 0:
+            return func(*args)
+        
+        self.start()
+        metrics.incr("guardrails.offloaded")
+        future = asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+        try:
+            return await asyncio.wait_for(future, self.timeout)
+        except asyncio.TimeoutError:
+            metrics.incr("guardrails.timeouts")
+            raise ValidationError("Input could not be validated in time")
+        except BrokenProcessPool:
+            # A worker died; check inline this time and rebuild the pool
+            metrics.incr("guardrails.pool_broken")
+            self.shutdown()
+            return func(*args)
+
+
+async def validate_input_async(
+    text: str, max_length: int = 10000, pool: "GuardrailPool | None" = None
+) -> str:
+    """`validate_input` that offloads large inputs to the guardrail pool"""
+    pool = pool or get_guardrail_pool()
+    size = len(text) if isinstance(text, str) else 0
+    return await pool.run(validate_input, text, max_length, size=size)
+
+
+async def validate_inputs_async(
+    texts: list[str], max_length: int = 10000, pool: "GuardrailPool | None" = None
+) -> list[str | ValidationError]:
+    """
+    `validate_inputs` that offloads large batches to the guardrail pool
+
+    Like `validate_inputs` it never raises: a batch that cannot be checked
+    in time fails item by item.
+    """
+    pool = pool or get_guardrail_pool()
+    size = sum(len(text) for text in texts if isinstance(text, str))
+    try:
+        return await pool.run(validate_inputs, texts, max_length, size=size)
+    except ValidationError as e:
+        return [e] * len(texts)
+
+
+@lru_cache
+def get_guardrail_pool() -> GuardrailPool:
+    """Dependency injection factory for the guardrail pool"""
+    settings = get_settings()
+    return GuardrailPool(
+        max_workers=settings.guardrail_workers,
+        inline_max_chars=settings.guardrail_inline_max_chars,
+        timeout=settings.guardrail_timeout_seconds,
+    )
@@ -1,9 +1,9 @@
 """Structured logging configuration"""
 
 import logging
-import json
 from datetime import datetime, timezone
 from typing import Any
+from app.core.serialization import dumps_str
 
 
 class JsonFormatter(logging.Formatter):
@@ -33,7 +33,7 @@ class JsonFormatter(logging.Formatter):
         if hasattr(record, "event_type"):
             log_data["event_type"] = record.event_type
         
-        return json.dumps(log_data)
+        return dumps_str(log_data, default=str)
 
 
 def configure_logging(level: str = "INFO") -> None:
@@ -0,0 +1,74 @@
+"""In-process metrics registry"""
+
+from collections import defaultdict
+from typing import Any
+
+
+class Metrics:
+    """
+    Minimal counters, gauges and summaries kept in process memory
+
+    Exposed as JSON by the `/metrics` endpoint. Each uvicorn worker keeps
+    its own registry.
+    """
+    
+    def __init__(self):
+        self._counters: dict[str, float] = defaultdict(float)
+        self._gauges: dict[str, float] = {}
+        self._summaries: dict[str, list[float]] = {}
+    
+    def incr(self, name: str, value: float = 1) -> None:
+        """Increase a counter"""
+        self._counters[name] += value
+    
+    def set_gauge(self, name: str, value: float) -> None:
+        """Set a gauge to its current value"""
+        self._gauges[name] = value
+    
+    def observe(self, name: str, value: float) -> None:
+        """Record one observation in a summary (count/sum/min/max)"""
+        summary = self._summaries.get(name)
+        if summary is None:
+            self._summaries[name] = [1, value, value, value]
+            return
+        summary[0] += 1
+        summary[1] += value
+        if value < summary[2]:
+            summary[2] = value
+        if value > summary[3]:
+            summary[3] = value
+    
+    def counter(self, name: str) -> float:
+        """Current value of a counter"""
+        return self._counters.get(name, 0)
+    
+    def ratio(self, numerator: str, denominator: str) -> float:
+        """Ratio of two counters (0 when the denominator is zero)"""
+        total = self.counter(denominator)
+        return self.counter(numerator) / total if total else 0.0
+    
+    def snapshot(self) -> dict[str, Any]:
+        """Return all metrics as a JSON-serialisable dict"""
+        return {
+            "counters": dict(self._counters),
+            "gauges": dict(self._gauges),
+            "summaries": {
+                name: {
+                    "count": count,
+                    "sum": total,
+                    "avg": total / count,
+                    "min": low,
+                    "max": high,
+                }
+                for name, (count, total, low, high) in self._summaries.items()
+            },
+        }
+    
+    def reset(self) -> None:
+        """Clear all metrics (used by tests)"""
+        self._counters.clear()
+        self._gauges.clear()
+        self._summaries.clear()
+
+
+metrics = Metrics()
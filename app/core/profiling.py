@@ -0,0 +1,124 @@
+"""Per-request timing breakdowns (phase timer and ring buffer of profiles)"""
+
+import time
+from collections import OrderedDict
+from contextlib import nullcontext
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any
+
+from app.core.config import get_settings
+from app.core.metrics import metrics
+
+_current: ContextVar["Profile | None"] = ContextVar("profile", default=None)
+_NOOP = nullcontext()
+
+
+@dataclass(slots=True)
+class Profile:
+    """Timing breakdown of one request"""
+
+    method: str
+    path: str
+    request_id: str = ""
+    reason: str = ""  # "header", "sampled" or "slow" once captured
+    status_code: int = 0
+    started_at: float = field(default_factory=time.time)
+    total_ms: float = 0.0
+    # (name, start offset ms, duration ms) in completion order
+    phases: list[tuple[str, float, float]] = field(default_factory=list)
+    _t0: float = field(default_factory=time.perf_counter, repr=False)
+
+    def to_dict(self) -> dict[str, Any]:
+        endpoint_ms = sum(ms for name, _, ms in self.phases if name == "endpoint")
+        return {
+            "request_id": self.request_id,
+            "method": self.method,
+            "path": self.path,
+            "status_code": self.status_code,
+            "reason": self.reason,
+            "started_at": self.started_at,
+            "total_ms": round(self.total_ms, 3),
+            # Middleware, routing and (de)serialisation around the endpoint
+            "outside_endpoint_ms": round(self.total_ms - endpoint_ms, 3),
+            "phases": [
+                {"name": name, "start_ms": round(start, 3), "duration_ms": round(ms, 3)}
+                for name, start, ms in sorted(self.phases, key=lambda p: p[1])
+            ],
+        }
+
+
+class _Phase:
+    __slots__ = ("_profile", "_name", "_start")
+
+    def __init__(self, profile: Profile, name: str):
+        self._profile = profile
+        self._name = name
+
+    def __enter__(self) -> None:
+        self._start = time.perf_counter()
+
+    def __exit__(self, *exc) -> None:
+        end = time.perf_counter()
+        self._profile.phases.append(
+            (
+                self._name,
+                (self._start - self._profile._t0) * 1000,
+                (end - self._start) * 1000,
+            )
+        )
+
+
+def phase(name: str):
+    """
+    Time a block as a named phase of the current request's profile
+
+    A no-op (one context variable lookup) outside a profiled request.
+    """
+    profile = _current.get()
+    if profile is None:
+        return _NOOP
+    return _Phase(profile, name)
+
+
+def start_profile(method: str, path: str) -> tuple[Profile, Any]:
+    """Make a new profile current; returns it with the token to reset"""
+    profile = Profile(method=method, path=path)
+    return profile, _current.set(profile)
+
+
+def finish_profile(profile: Profile, token: Any) -> None:
+    profile.total_ms = (time.perf_counter() - profile._t0) * 1000
+    _current.reset(token)
+
+
+class ProfileStore:
+    """Bounded ring buffer of captured profiles keyed by request id"""
+
+    def __init__(self, capacity: int = 200):
+        self.capacity = capacity
+        self._profiles: OrderedDict[str, Profile] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._profiles)
+
+    def add(self, profile: Profile) -> None:
+        self._profiles[profile.request_id] = profile
+        self._profiles.move_to_end(profile.request_id)
+        while len(self._profiles) > self.capacity:
+            self._profiles.popitem(last=False)
+        metrics.incr(f"profiling.captured.{profile.reason}")
+
+    def get(self, request_id: str) -> Profile | None:
+        return self._profiles.get(request_id)
+
+    def recent(self, limit: int = 50) -> list[Profile]:
+        """Most recent profiles first"""
+        return list(reversed(self._profiles.values()))[:limit]
+
+
+@lru_cache
+def get_profile_store() -> ProfileStore:
+    """Dependency injection factory for the profile ring buffer"""
+    return ProfileStore(capacity=get_settings().profiling_buffer_size)
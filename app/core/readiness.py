@@ -0,0 +1,70 @@
+"""Readiness gate: startup checks that must finish before traffic is routed"""
+
+import logging
+import time
+from collections.abc import Awaitable
+from functools import lru_cache
+from typing import Any
+
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class Readiness:
+    """
+    Named startup checks, run in order once the server is listening
+
+    Liveness (/health) answers as soon as the app is built; readiness
+    (/ready) only once every check has finished. A failed required check
+    keeps /ready at 503, so the Docker HEALTHCHECK marks the container
+    unhealthy; nothing restarts it (the compose restart policy only acts
+    when the process exits), so it stays out of rotation until an operator
+    steps in. A failed optional one (e.g. warming a model on a remote
+    Ollama) is reported but does not block.
+    """
+
+    def __init__(self):
+        self.started_at = time.monotonic()
+        self.checks: dict[str, dict[str, Any]] = {}
+        self._finished = False
+
+    @property
+    def ready(self) -> bool:
+        return self._finished and all(
+            check["status"] == "ok" or not check["required"]
+            for check in self.checks.values()
+        )
+
+    async def run(self, name: str, check: Awaitable[Any], required: bool = True) -> bool:
+        """Await one startup check and record its outcome and duration"""
+        self.checks[name] = {"status": "pending", "required": required}
+        started = time.perf_counter()
+        try:
+            await check
+        except Exception as e:
+            self.checks[name]["status"] = "failed"
+            self.checks[name]["error"] = f"{type(e).__name__}: {e}"
+            logger.warning("Startup check %s failed: %s", name, e)
+            return False
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self.checks[name]["ms"] = round(elapsed_ms, 1)
+            metrics.set_gauge(f"startup.{name}_ms", elapsed_ms)
+        self.checks[name]["status"] = "ok"
+        return True
+
+    def finish(self) -> None:
+        """Mark the end of startup; /ready reports the outcome from now on"""
+        self._finished = True
+        metrics.set_gauge("startup.ready_ms", (time.monotonic() - self.started_at) * 1000)
+
+    def snapshot(self) -> dict[str, Any]:
+        status = "ready" if self.ready else ("failed" if self._finished else "starting")
+        return {"status": status, "checks": self.checks}
+
+
+@lru_cache
+def get_readiness() -> Readiness:
+    """Process-wide readiness state"""
+    return Readiness()
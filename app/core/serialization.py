@@ -0,0 +1,50 @@
+"""JSON serialization for responses and logs (orjson when installed)"""
+
+import json
+from collections.abc import Callable
+from typing import Any
+
+from pydantic import BaseModel
+from starlette.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+JSON_BACKEND = "orjson" if orjson is not None else "json"
+
+
+def dumps(obj: Any, default: Callable[[Any], Any] | None = None) -> bytes:
+    """
+    Serialize to compact UTF-8 JSON bytes
+
+    Both backends produce the same output for plain JSON data (no spaces,
+    non-ASCII kept as UTF-8).
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, default=default)
+    return json.dumps(
+        obj, ensure_ascii=False, separators=(",", ":"), default=default
+    ).encode("utf-8")
+
+
+def dumps_str(obj: Any, default: Callable[[Any], Any] | None = None) -> str:
+    """Serialize to a compact JSON string"""
+    return dumps(obj, default=default).decode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response rendered with the fast serializer
+
+    Also accepts an already validated pydantic model. Returning
+    ``FastJSONResponse(model)`` from an endpoint bypasses FastAPI's
+    ``response_model`` re-validation. The model is dumped once by
+    pydantic's own JSON serializer.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, BaseModel):
+            return content.model_dump_json().encode("utf-8")
+        return dumps(content)
@@ -0,0 +1,361 @@
+"""Minimal in-process tracing (context-var spans, W3C traceparent, OTLP JSON export)"""
+
+import functools
+import inspect
+import os
+import queue
+import random
+import re
+import threading
+import time
+from collections.abc import Callable
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, TypeVar
+
+from app.core.config import get_settings
+from app.core.metrics import metrics
+from app.core.serialization import dumps
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+# OTLP span kinds
+KIND_INTERNAL = 1
+KIND_SERVER = 2
+KIND_CLIENT = 3
+
+_TRACEPARENT_RE = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+_current: ContextVar["Span | None"] = ContextVar("span", default=None)
+# traceparent (flags 00) of an incoming trace this request did not sample
+_unsampled: ContextVar[str | None] = ContextVar("unsampled_traceparent", default=None)
+_STOP = object()
+
+
+@dataclass(slots=True)
+class Span:
+    """One timed operation of a sampled trace"""
+
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: str | None
+    kind: int = KIND_INTERNAL
+    start_ns: int = field(default_factory=time.time_ns)
+    end_ns: int = 0
+    attributes: dict[str, Any] = field(default_factory=dict)
+    error: str | None = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    @property
+    def traceparent(self) -> str:
+        """W3C traceparent header value naming this span as the parent"""
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def to_otlp(self) -> dict[str, Any]:
+        """Span in OTLP/JSON form"""
+        data = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [
+                {"key": key, "value": _otlp_value(value)}
+                for key, value in self.attributes.items()
+            ],
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1},
+        }
+        if self.parent_id:
+            data["parentSpanId"] = self.parent_id
+        return data
+
+
+def _otlp_value(value: Any) -> dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class _NoopSpan:
+    """Stand-in used when the request is not sampled"""
+
+    __slots__ = ()
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        pass
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+class _UnsampledTrace:
+    """Root of an unsampled request that still propagates the caller's trace"""
+
+    __slots__ = ("traceparent", "_token")
+
+    def __init__(self, traceparent: str):
+        self.traceparent = traceparent
+
+    def __enter__(self) -> _NoopSpan:
+        self._token = _unsampled.set(self.traceparent)
+        return _NOOP
+
+    def __exit__(self, *exc) -> None:
+        _unsampled.reset(self._token)
+
+
+class _ActiveSpan:
+    __slots__ = ("span", "_token")
+
+    def __init__(self, span: Span):
+        self.span = span
+
+    def __enter__(self) -> Span:
+        self._token = _current.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.span.end_ns = time.time_ns()
+        if exc_type is not None:
+            self.span.error = exc_type.__name__
+        _current.reset(self._token)
+        get_span_exporter().export(self.span)
+
+
+def _new_id(hex_chars: int) -> str:
+    return os.urandom(hex_chars // 2).hex()
+
+
+def span(name: str, kind: int = KIND_INTERNAL, **attributes: Any):
+    """
+    Child span of the current span, as a context manager
+
+    Outside a sampled trace this returns a shared no-op after one context
+    variable lookup, so instrumentation can stay in hot paths.
+    """
+    parent = _current.get()
+    if parent is None:
+        return _NOOP
+    return _ActiveSpan(
+        Span(
+            name,
+            parent.trace_id,
+            _new_id(16),
+            parent.span_id,
+            kind,
+            attributes=attributes,
+        )
+    )
+
+
+def traced(name: str) -> Callable[[F], F]:
+    """Decorator running a sync or async function inside `span(name)`"""
+
+    def decorator(func: F) -> F:
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(name):
+                    return await func(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def parse_traceparent(value: str | None) -> tuple[str, str, bool] | None:
+    """Return (trace id, parent span id, sampled) from a W3C traceparent"""
+    if not value:
+        return None
+    match = _TRACEPARENT_RE.match(value.strip().lower())
+    if match is None:
+        return None
+    trace_id, parent_id, flags = match.groups()
+    if trace_id == "0" * 32 or parent_id == "0" * 16:
+        return None
+    return trace_id, parent_id, bool(int(flags, 16) & 1)
+
+
+def start_trace(
+    name: str,
+    traceparent: str | None = None,
+    sample_ratio: float = 0.0,
+    trust_incoming: bool = False,
+    **attributes: Any,
+):
+    """
+    Root span for an incoming request
+
+    An incoming traceparent is continued (same trace id, parent span). Its
+    sampled flag is followed only with `trust_incoming`, i.e. when callers
+    are trusted services; otherwise any client could force full span
+    export. Without one, traces are sampled with probability `sample_ratio`.
+    An unsampled request records nothing but still forwards the caller's
+    trace id and parent downstream, with the sampled flag cleared.
+    """
+    parent = parse_traceparent(traceparent)
+    if parent is not None:
+        trace_id, parent_id, sampled = parent
+    else:
+        trace_id, parent_id, sampled = _new_id(32), None, False
+    if not (trust_incoming and parent is not None):
+        sampled = sample_ratio > 0 and random.random() < sample_ratio
+    if not sampled:
+        if parent is None:
+            return _NOOP
+        return _UnsampledTrace(f"00-{trace_id}-{parent_id}-00")
+    return _ActiveSpan(
+        Span(name, trace_id, _new_id(16), parent_id, KIND_SERVER, attributes=attributes)
+    )
+
+
+def current_traceparent() -> str | None:
+    """traceparent for an outgoing call from the current span or caller's trace"""
+    current = _current.get()
+    return current.traceparent if current is not None else _unsampled.get()
+
+
+class BatchSpanExporter:
+    """
+    Batches finished spans and appends them to a file from a worker thread
+
+    Each line is one OTLP/HTTP JSON export request (``resourceSpans``), so
+    the file can be replayed into a collector. The request path only puts
+    spans on a bounded queue; when the writer falls behind, spans are
+    dropped and counted in ``tracing.spans_dropped``. Once the file reaches
+    ``max_bytes`` it is rotated to ``<path>.1``, replacing the previous one.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        batch_size: int = 64,
+        flush_interval: float = 2.0,
+        service_name: str = "local-llm-server",
+        max_queue: int = 4096,
+        max_bytes: int = 64 * 1024 * 1024,
+    ):
+        self.path = Path(path)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.service_name = service_name
+        self.max_bytes = max_bytes
+        self._queue: queue.Queue[Any] = queue.Queue(maxsize=max_queue)
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(
+                        target=self._run, name="span-exporter", daemon=True
+                    )
+                    self._thread.start()
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            metrics.incr("tracing.spans_dropped")
+
+    def shutdown(self) -> None:
+        """Flush queued spans and stop the worker"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            # Waits for room, so the queued spans are written first
+            self._queue.put(_STOP)
+            thread.join()
+
+    def _run(self) -> None:
+        batch: list[Span] = []
+        flush_at: float | None = None
+        while True:
+            timeout = None if flush_at is None else max(0.0, flush_at - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None  # flush interval elapsed
+            if isinstance(item, Span):
+                batch.append(item)
+                if flush_at is None:
+                    flush_at = time.monotonic() + self.flush_interval
+                if len(batch) < self.batch_size:
+                    continue
+            if batch:
+                self._write(batch)
+                batch = []
+            flush_at = None
+            if item is _STOP:
+                return
+
+    def _write(self, batch: list[Span]) -> None:
+        request = {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": [
+                            {"key": "service.name", "value": {"stringValue": self.service_name}}
+                        ]
+                    },
+                    "scopeSpans": [
+                        {
+                            "scope": {"name": "app"},
+                            "spans": [span.to_otlp() for span in batch],
+                        }
+                    ],
+                }
+            ]
+        }
+        line = dumps(request) + b"\n"
+        try:
+            self._rotate_if_full(len(line))
+            with self.path.open("ab") as f:
+                f.write(line)
+        except OSError:
+            metrics.incr("tracing.export_errors")
+            return
+        metrics.incr("tracing.spans_exported", len(batch))
+
+    def _rotate_if_full(self, incoming: int) -> None:
+        try:
+            size = self.path.stat().st_size
+        except FileNotFoundError:
+            return
+        if size and size + incoming > self.max_bytes:
+            os.replace(self.path, self.path.with_name(self.path.name + ".1"))
+            metrics.incr("tracing.export_rotations")
+
+
+@lru_cache
+def get_span_exporter() -> BatchSpanExporter:
+    """Dependency injection factory for the span exporter"""
+    settings = get_settings()
+    return BatchSpanExporter(
+        settings.tracing_export_path,
+        batch_size=settings.tracing_batch_size,
+        flush_interval=settings.tracing_flush_interval_seconds,
+        max_queue=settings.tracing_max_queue,
+        max_bytes=int(settings.tracing_export_max_mb * 1024 * 1024),
+    )
@@ -1,43 +1,157 @@
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
-from app.core.config import get_settings
-from app.core.logging import configure_logging
-from app.middleware.request_id import RequestIDMiddleware
-from app.middleware.rate_limiter import RateLimiterMiddleware
-from app.middleware.error_handler import ErrorHandlerMiddleware
-from app.routers import chat
-
-# Configure logging
-settings = get_settings()
-configure_logging(level=settings.log_level)
-
-# Create FastAPI app
-app = FastAPI(
-    title="Local LLM Server",
-    description="AI agent server with LLM integration",
-    version="1.0.0"
-)
-
-# CORS configuration
-origins = settings.allowed_origins
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=origins,
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# Add custom middleware (order matters - process from bottom to top)
-app.add_middleware(ErrorHandlerMiddleware)
-app.add_middleware(RateLimiterMiddleware, rpm=settings.rate_limit_rpm)
-app.add_middleware(RequestIDMiddleware)
-
-# Include routers
-app.include_router(chat.router, prefix="/api")
-
-
-@app.get("/health", tags=["health"])
-async def health():
-    """Health check endpoint"""
-    return {"status": "ok", "service": "local-llm-server"}
+"""
+Application factory
+
+    uvicorn app.main:create_app --factory
+
+Importing this module does no work: settings, logging, middleware, routers
+and services are set up when the server calls `create_app`, and optional
+subsystems (response cache, profiling, traffic recording) are only
+imported when enabled.
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from fastapi import FastAPI
+
+    from app.core.config import Settings
+    from app.core.readiness import Readiness
+
+
+async def warm_up(settings: "Settings", readiness: "Readiness") -> None:
+    """Startup checks behind /ready; they run once the server is listening"""
+    from app.core.guardrails import get_guardrail_pool
+    from app.services.faq import fill_faq_table, get_faq_table
+    from app.services.llm_service import get_llm_service, warm_up_models
+
+    await readiness.run("faq_table", asyncio.to_thread(get_faq_table))
+    if settings.semantic_cache_enabled:
+        from app.services.semantic_cache import get_semantic_cache
+
+        await readiness.run("semantic_cache", asyncio.to_thread(get_semantic_cache))
+    if settings.response_cache_enabled:
+        from app.services.response_cache import get_response_cache
+
+        await readiness.run("response_cache", asyncio.to_thread(get_response_cache))
+    await readiness.run("guardrail_workers", get_guardrail_pool().wait_ready())
+    if settings.llm_warm_up_on_startup:
+        await readiness.run("llm_model", warm_up_models(), required=False)
+    readiness.finish()
+    if settings.faq_generate_missing:
+        # After ready: FAQ answers are served from the table once generated
+        await readiness.run(
+            "faq_answers", fill_faq_table(get_llm_service()), required=False
+        )
+
+
+def create_app() -> "FastAPI":
+    """Build the FastAPI app from the current settings"""
+    from fastapi import FastAPI
+    from fastapi.middleware.cors import CORSMiddleware
+    from app.core.config import get_settings
+    from app.core.guardrails import get_guardrail_pool
+    from app.core.logging import configure_logging
+    from app.core.metrics import metrics
+    from app.core.readiness import get_readiness
+    from app.core.serialization import FastJSONResponse
+    from app.core.tracing import get_span_exporter
+    from app.middleware.deadline import DeadlineMiddleware
+    from app.middleware.tracing import TracingMiddleware
+    from app.middleware.request_id import RequestIDMiddleware
+    from app.middleware.rate_limiter import RateLimiterMiddleware, get_rate_limiter
+    from app.middleware.error_handler import ErrorHandlerMiddleware
+    from app.routers import admin, chat, ws
+
+    settings = get_settings()
+    configure_logging(level=settings.log_level)
+    readiness = get_readiness()
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        """Warm up in the background so liveness answers right away"""
+        startup = asyncio.create_task(warm_up(settings, readiness))
+        yield
+        startup.cancel()
+        get_guardrail_pool().shutdown()
+        if settings.response_cache_enabled:
+            from app.services.response_cache import get_response_cache
+
+            get_response_cache().close()
+        get_span_exporter().shutdown()
+
+    app = FastAPI(
+        title="Local LLM Server",
+        description="AI agent server with LLM integration",
+        version="1.0.0",
+        lifespan=lifespan,
+        default_response_class=FastJSONResponse,
+    )
+
+    # CORS configuration
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=settings.allowed_origins,
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    # Add custom middleware (order matters - process from bottom to top)
+    app.add_middleware(ErrorHandlerMiddleware)
+    app.add_middleware(RateLimiterMiddleware, limiter=get_rate_limiter())
+    app.add_middleware(RequestIDMiddleware)
+    if settings.profiling_enabled:
+        from app.middleware.profiling import ProfilingMiddleware
+
+        app.add_middleware(
+            ProfilingMiddleware,
+            sample_ratio=settings.profiling_sample_ratio,
+            slow_threshold_ms=settings.profiling_slow_threshold_ms,
+            token=settings.admin_token,
+        )
+    if settings.traffic_record_enabled:
+        from app.middleware.recorder import TrafficRecorder, TrafficRecorderMiddleware
+
+        app.add_middleware(
+            TrafficRecorderMiddleware,
+            recorder=TrafficRecorder(
+                settings.traffic_record_path, salt=settings.traffic_record_salt
+            ),
+        )
+    # Right inside tracing, so the budget covers every other layer
+    app.add_middleware(
+        DeadlineMiddleware,
+        default_seconds=settings.request_timeout_default_seconds,
+        max_seconds=settings.request_timeout_max_seconds,
+    )
+    app.add_middleware(
+        TracingMiddleware,
+        sample_ratio=settings.tracing_sample_ratio,
+        trust_incoming=settings.tracing_trust_incoming,
+    )
+
+    # Include routers
+    app.include_router(chat.router, prefix="/api")
+    app.include_router(ws.router, prefix="/api")
+    app.include_router(admin.router, prefix="/admin")
+
+    @app.get("/health", tags=["health"])
+    async def health():
+        """Health check endpoint (liveness)"""
+        return {"status": "ok", "service": "local-llm-server"}
+
+    @app.get("/ready", tags=["health"])
+    async def ready():
+        """Readiness gate: 200 once startup checks have finished, 503 before"""
+        return FastJSONResponse(
+            readiness.snapshot(), status_code=200 if readiness.ready else 503
+        )
+
+    @app.get("/metrics", tags=["health"])
+    async def get_metrics():
+        """In-process metrics of this worker"""
+        return metrics.snapshot()
+
+    return app
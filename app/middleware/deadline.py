@@ -0,0 +1,45 @@
+"""Deadline middleware for end-to-end request budgets"""
+
+import time
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Receive, Scope, Send
+from app.core.tracing import span
+
+
+class DeadlineMiddleware:
+    """
+    Set `request.state.deadline` from X-Request-Timeout or the default budget
+
+    A pure ASGI middleware; main.py adds it directly inside tracing, so the
+    recorder's body read and every other layer count against the budget.
+    """
+    
+    def __init__(
+        self, app: ASGIApp, default_seconds: float = 30.0, max_seconds: float = 120.0
+    ):
+        self.app = app
+        self.default_seconds = default_seconds
+        self.max_seconds = max_seconds
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Process request with a monotonic deadline"""
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        with span("middleware.deadline"):
+            started = time.monotonic()
+            
+            budget = self.default_seconds
+            header = Headers(scope=scope).get("X-Request-Timeout")
+            if header:
+                try:
+                    requested = float(header)
+                except ValueError:
+                    requested = 0.0
+                if requested > 0:
+                    budget = min(requested, self.max_seconds)
+            
+            scope.setdefault("state", {})["deadline"] = started + budget
+            
+            await self.app(scope, receive, send)
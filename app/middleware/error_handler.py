@@ -3,13 +3,21 @@
 from fastapi import Request
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.responses import JSONResponse
-from app.core.exceptions import LLMServiceError, RateLimitError, ValidationError
+from app.core.exceptions import (
+    DeadlineExceededError,
+    LLMServiceError,
+    RateLimitError,
+    SessionNotFoundError,
+    ValidationError,
+)
 from app.core.logging import log_security_event
+from app.core.tracing import traced
 
 
 class ErrorHandlerMiddleware(BaseHTTPMiddleware):
     """Global error handler for application exceptions"""
     
+    @traced("middleware.error_handler")
     async def dispatch(self, request: Request, call_next):
         """Process request and handle exceptions"""
         try:
@@ -33,6 +41,28 @@ class ErrorHandlerMiddleware(BaseHTTPMiddleware):
                     "request_id": request_id
                 }
             )
+        except DeadlineExceededError as e:
+            # Request budget exhausted → 504
+            request_id = getattr(request.state, "request_id", "unknown")
+            return JSONResponse(
+                status_code=504,
+                content={
+                    "error": "deadline_exceeded",
+                    "message": str(e),
+                    "request_id": request_id
+                }
+            )
+        except SessionNotFoundError as e:
+            # Session ids are issued by the server → 404
+            request_id = getattr(request.state, "request_id", "unknown")
+            return JSONResponse(
+                status_code=404,
+                content={
+                    "error": "session_not_found",
+                    "message": str(e),
+                    "request_id": request_id
+                }
+            )
         except RateLimitError as e:
             # Rate limit errors → 429 (usually handled by middleware directly)
             request_id = getattr(request.state, "request_id", "unknown")
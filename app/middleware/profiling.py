@@ -0,0 +1,70 @@
+"""Profiling middleware capturing per-request timing breakdowns"""
+
+import random
+import secrets
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.core.profiling import finish_profile, get_profile_store, start_profile
+from app.core.tracing import span
+
+
+class ProfilingMiddleware:
+    """
+    Time every request and keep the breakdown of interesting ones
+
+    Phases are recorded for all requests (a few clock reads each). A
+    profile is kept in the ring buffer when the request carried
+    ``X-Profile: <admin token>``, was picked by `sample_ratio`, or took at
+    least `slow_threshold_ms`. The total runs until the response has been
+    sent, streamed bodies included.
+    """
+    
+    def __init__(
+        self,
+        app: ASGIApp,
+        sample_ratio: float = 0.0,
+        slow_threshold_ms: float = 10_000.0,
+        token: str = "",
+    ):
+        self.app = app
+        self.sample_ratio = sample_ratio
+        self.slow_threshold_ms = slow_threshold_ms
+        self.token = token
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Process request inside a profile"""
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        with span("middleware.profiling"):
+            reason = ""
+            header = Headers(scope=scope).get("X-Profile")
+            if header and self.token and secrets.compare_digest(header, self.token):
+                reason = "header"
+            elif self.sample_ratio > 0 and random.random() < self.sample_ratio:
+                reason = "sampled"
+            
+            response_start: Message = {}
+            
+            async def send_profiled(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    response_start.update(message)
+                await send(message)
+            
+            profile, token = start_profile(scope["method"], scope["path"])
+            try:
+                await self.app(scope, receive, send_profiled)
+            finally:
+                finish_profile(profile, token)
+            
+            if not reason and profile.total_ms >= self.slow_threshold_ms:
+                reason = "slow"
+            if reason and response_start:
+                profile.reason = reason
+                profile.status_code = response_start["status"]
+                headers = Headers(raw=response_start.get("headers", []))
+                profile.request_id = headers.get("X-Request-ID") or scope.get(
+                    "state", {}
+                ).get("request_id", "")
+                get_profile_store().add(profile)
@@ -1,12 +1,42 @@
 """Rate limiting middleware using sliding window algorithm"""
 
+import hmac
 import time
 from collections import defaultdict
+from functools import lru_cache
 from typing import Dict, List
 from fastapi import Request
 from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import HTTPConnection
 from starlette.responses import JSONResponse
+from app.core.config import get_settings
 from app.core.exceptions import RateLimitError
+from app.core.tracing import traced
+
+
+def get_client_ip(request: HTTPConnection) -> str:
+    """Client IP address (supports X-Forwarded-For for proxies)"""
+    client_ip = request.headers.get("X-Forwarded-For", "").split(",")[0].strip()
+    if not client_ip:
+        client_ip = request.client.host if request.client else "unknown"
+    return client_ip
+
+
+def get_client_key(request: HTTPConnection) -> str:
+    """
+    Client identity for fair scheduling: a configured API key if sent,
+    else IP address
+
+    Unknown keys fall back to the IP, so rotating made-up keys does not
+    give a client a fresh identity per request.
+    """
+    api_key = request.headers.get("X-API-Key", "")
+    if api_key and any(
+        hmac.compare_digest(api_key.encode(), known.encode())
+        for known in get_settings().api_keys
+    ):
+        return f"key:{api_key}"
+    return f"ip:{get_client_ip(request)}"
 
 
 class SlidingWindowRateLimiter:
@@ -53,19 +83,25 @@ class SlidingWindowRateLimiter:
         return True, 0
 
 
+@lru_cache
+def get_rate_limiter() -> SlidingWindowRateLimiter:
+    """Dependency injection factory for the limiter shared by HTTP and WebSocket chat"""
+    return SlidingWindowRateLimiter(rpm=get_settings().rate_limit_rpm)
+
+
 class RateLimiterMiddleware(BaseHTTPMiddleware):
     """Middleware for rate limiting by IP address"""
     
-    def __init__(self, app, rpm: int = 60):
+    def __init__(
+        self, app, rpm: int = 60, limiter: SlidingWindowRateLimiter | None = None
+    ):
         super().__init__(app)
-        self.limiter = SlidingWindowRateLimiter(rpm=rpm)
+        self.limiter = limiter or SlidingWindowRateLimiter(rpm=rpm)
     
+    @traced("middleware.rate_limiter")
     async def dispatch(self, request: Request, call_next):
         """Process request with rate limiting"""
-        # Get client IP (support X-Forwarded-For for proxies)
-        client_ip = request.headers.get("X-Forwarded-For", "").split(",")[0].strip()
-        if not client_ip:
-            client_ip = request.client.host if request.client else "unknown"
+        client_ip = get_client_ip(request)
         
         # Check rate limit
         allowed, retry_after = self.limiter.is_allowed(client_ip)
@@ -0,0 +1,168 @@
+"""Traffic recorder middleware for record-and-replay load tests"""
+
+import hashlib
+import json
+import os
+import re
+import secrets
+import threading
+import time
+from pathlib import Path
+from typing import Any
+from starlette.requests import HTTPConnection
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.core.serialization import dumps
+from app.core.tracing import span
+from app.middleware.rate_limiter import get_client_key
+
+RECORDED_PATHS = frozenset({"/api/chat", "/api/chat/batch"})
+
+# Personal data replaced before a prompt is written
+_EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+_IP_RE = re.compile(r"\b(?:\d{1,3}\.){3}\d{1,3}\b")
+_NUMBER_RE = re.compile(r"\+?\d[\d\s().-]{7,}\d")
+_TOKEN_RE = re.compile(r"\b[A-Za-z0-9_-]{32,}\b")
+
+
+def _redact_number(match: re.Match) -> str:
+    # Phone and card numbers; short runs such as "2023-2024" are kept
+    digits = sum(c.isdigit() for c in match.group())
+    return "<number>" if digits >= 9 else match.group()
+
+
+def sanitize_text(text: str) -> str:
+    """Replace e-mail addresses, IPs, phone/card numbers and secrets in a prompt"""
+    text = _EMAIL_RE.sub("<email>", text)
+    text = _IP_RE.sub("<ip>", text)
+    text = _NUMBER_RE.sub(_redact_number, text)
+    return _TOKEN_RE.sub("<token>", text)
+
+
+class TrafficRecorder:
+    """
+    Append-only JSON-lines log of chat requests
+
+    Each record is written with a single ``write`` on a file opened with
+    O_APPEND, so lines from several workers never interleave. Client keys
+    and session ids are replaced by salted hashes: repetition and
+    conversation structure survive, identities do not.
+    """
+
+    def __init__(self, path: str | Path, salt: str = ""):
+        """
+        Initialize recorder
+
+        Args:
+            path: File records are appended to
+            salt: Hash salt; a random one makes hashes unlinkable across restarts
+        """
+        self.path = Path(path)
+        self.salt = (salt or secrets.token_hex(16)).encode()
+        self._fd: int | None = None
+        self._lock = threading.Lock()
+
+    def pseudonym(self, value: str) -> str:
+        return hashlib.blake2b(value.encode(), key=self.salt, digest_size=8).hexdigest()
+
+    def sanitize_body(self, path: str, body: dict[str, Any]) -> dict[str, Any] | None:
+        """Keep only the fields replay needs, with prompts sanitized"""
+        if path == "/api/chat" and isinstance(body.get("message"), str):
+            record = {"message": sanitize_text(body["message"])}
+            if isinstance(body.get("session_id"), str):
+                record["session_id"] = self.pseudonym(body["session_id"])
+            return record
+        if path == "/api/chat/batch" and isinstance(body.get("messages"), list):
+            return {
+                "messages": [
+                    sanitize_text(m) if isinstance(m, str) else m
+                    for m in body["messages"]
+                ],
+                "stream": bool(body.get("stream", False)),
+            }
+        return None
+
+    def write(self, record: dict[str, Any]) -> None:
+        if self._fd is None:
+            with self._lock:
+                if self._fd is None:
+                    self._fd = os.open(
+                        self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600
+                    )
+        os.write(self._fd, dumps(record) + b"\n")
+
+    def close(self) -> None:
+        with self._lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+
+class TrafficRecorderMiddleware:
+    """Record chat requests with their status and latency"""
+
+    def __init__(self, app: ASGIApp, recorder: TrafficRecorder):
+        self.app = app
+        self.recorder = recorder
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Process request and append its sanitized record"""
+        if (
+            scope["type"] != "http"
+            or scope["method"] != "POST"
+            or scope["path"] not in RECORDED_PATHS
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        with span("middleware.recorder"):
+            received_at = time.time()
+            started = time.monotonic()
+
+            # Read the body up front and hand it on unchanged
+            messages: list[Message] = []
+            chunks: list[bytes] = []
+            while True:
+                message = await receive()
+                messages.append(message)
+                if message["type"] != "http.request":
+                    break
+                chunks.append(message.get("body", b""))
+                if not message.get("more_body"):
+                    break
+
+            async def replay() -> Message:
+                return messages.pop(0) if messages else await receive()
+
+            status = 500
+
+            async def send_recorded(message: Message) -> None:
+                nonlocal status
+                if message["type"] == "http.response.start":
+                    status = message["status"]
+                await send(message)
+
+            try:
+                body = json.loads(b"".join(chunks))
+            except ValueError:
+                body = None
+
+            await self.app(scope, replay, send_recorded)
+
+            sanitized = (
+                self.recorder.sanitize_body(scope["path"], body)
+                if isinstance(body, dict)
+                else None
+            )
+            if sanitized is not None:
+                self.recorder.write(
+                    {
+                        "ts": round(received_at, 3),
+                        "path": scope["path"],
+                        "client": self.recorder.pseudonym(
+                            get_client_key(HTTPConnection(scope))
+                        ),
+                        "body": sanitized,
+                        "status": status,
+                        "ms": round((time.monotonic() - started) * 1000, 1),
+                    }
+                )
@@ -4,11 +4,13 @@ import uuid
 from fastapi import Request
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.responses import Response
+from app.core.tracing import traced
 
 
 class RequestIDMiddleware(BaseHTTPMiddleware):
     """Add X-Request-ID header to all requests and responses"""
     
+    @traced("middleware.request_id")
     async def dispatch(self, request: Request, call_next) -> Response:
         """Process request and add request ID"""
         # Generate request ID if not present
@@ -0,0 +1,47 @@
+"""Tracing middleware opening the root span of each request"""
+
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.core.tracing import start_trace
+
+
+class TracingMiddleware:
+    """
+    Start a trace per request (outermost middleware)
+
+    Continues an incoming W3C ``traceparent`` and samples with
+    `sample_ratio`; the caller's sampled flag is only followed with
+    `trust_incoming`. Unsampled requests only pay for no-op spans and
+    pass the caller's trace on to Ollama unsampled.
+    """
+    
+    def __init__(
+        self, app: ASGIApp, sample_ratio: float = 0.0, trust_incoming: bool = False
+    ):
+        self.app = app
+        self.sample_ratio = sample_ratio
+        self.trust_incoming = trust_incoming
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Process request inside its root span"""
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        with start_trace(
+            f"{scope['method']} {scope['path']}",
+            Headers(scope=scope).get("traceparent"),
+            self.sample_ratio,
+            self.trust_incoming,
+            **{"http.method": scope["method"], "http.target": scope["path"]},
+        ) as root:
+            async def send_traced(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    headers = Headers(raw=message["headers"])
+                    root.set_attribute("http.status_code", message["status"])
+                    root.set_attribute(
+                        "http.request_id", headers.get("X-Request-ID", "")
+                    )
+                await send(message)
+            
+            await self.app(scope, receive, send_traced)
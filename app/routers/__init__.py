@@ -1,5 +1,5 @@
 """API routers"""
 
-from . import chat
+from . import admin, chat, ws
 
-__all__ = ["chat"]
+__all__ = ["admin", "chat", "ws"]
@@ -0,0 +1,40 @@
+"""Admin router - diagnostics guarded by the admin token"""
+
+import secrets
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from app.core.config import get_settings
+from app.core.profiling import ProfileStore, get_profile_store
+
+
+def require_admin(x_admin_token: str | None = Header(default=None)) -> None:
+    """Allow only requests with the configured X-Admin-Token"""
+    token = get_settings().admin_token
+    if not token:
+        # Admin endpoints do not exist without a token
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_admin_token or not secrets.compare_digest(x_admin_token, token):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+router = APIRouter(tags=["admin"], dependencies=[Depends(require_admin)])
+
+
+@router.get("/profiles")
+async def list_profiles(
+    limit: int = Query(default=50, ge=1, le=1000),
+    store: ProfileStore = Depends(get_profile_store),
+):
+    """Most recently captured request profiles"""
+    return {"profiles": [profile.to_dict() for profile in store.recent(limit)]}
+
+
+@router.get("/profiles/{request_id}")
+async def get_profile(
+    request_id: str,
+    store: ProfileStore = Depends(get_profile_store),
+):
+    """Timing breakdown captured for one X-Request-ID"""
+    profile = store.get(request_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="No profile for this request id")
+    return profile.to_dict()
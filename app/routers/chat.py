@@ -1,40 +1,113 @@
 """Chat router - thin layer with no business logic"""
 
+import time
 from fastapi import APIRouter, Depends, Request
-from app.schemas.request import ChatRequest
-from app.schemas.response import ChatResponse
-from app.services.llm_service import OllamaService, get_llm_service
-from app.core.guardrails import validate_input, validate_output
+from fastapi.responses import StreamingResponse
+from app.core.config import get_settings
+from app.core.profiling import phase
+from app.core.serialization import FastJSONResponse
+from app.schemas.request import BatchChatRequest, ChatRequest
+from app.schemas.response import BatchChatResponse, ChatResponse
+from app.middleware.rate_limiter import get_client_key
+from app.services.context_cache import ContextCache, get_session_context_cache
+from app.services.faq import FAQTable, get_faq_table
+from app.services.llm_service import LLMService, get_llm_service
+from app.services.scheduler import FairScheduler, get_scheduler
+from app.services.semantic_cache import SemanticCache, get_semantic_cache
+from app.services.session_store import SessionStore, get_session_store
+from app.usecases.chat import (
+    ChatPipeline,
+    batch_chat_usecase,
+    chat_usecase,
+    iter_batch_chat,
+)
 
 router = APIRouter(tags=["chat"])
 
 
+def get_chat_pipeline(
+    llm_service: LLMService = Depends(get_llm_service),
+    scheduler: FairScheduler = Depends(get_scheduler),
+    session_store: SessionStore = Depends(get_session_store),
+    semantic_cache: SemanticCache | None = Depends(get_semantic_cache),
+    faq: FAQTable | None = Depends(get_faq_table),
+    context_cache: ContextCache | None = Depends(get_session_context_cache),
+) -> ChatPipeline:
+    """Dependency injection factory for the chat pipeline"""
+    return ChatPipeline(
+        llm_service=llm_service,
+        scheduler=scheduler,
+        session_store=session_store,
+        semantic_cache=semantic_cache,
+        faq=faq,
+        context_cache=context_cache,
+    )
+
+
 @router.post("/chat", response_model=ChatResponse)
 async def chat(
     request: Request,
     chat_request: ChatRequest,
-    llm_service: OllamaService = Depends(get_llm_service)
-) -> ChatResponse:
+    pipeline: ChatPipeline = Depends(get_chat_pipeline),
+) -> FastJSONResponse:
     """
     Chat endpoint with LLM
-    
-    - Validates input with guardrails
-    - Calls LLM service
-    - Validates and returns response
+
+    - Continues the conversation identified by `session_id`
+      (a new session is started when it is omitted; ids the server did not
+      issue, or that expired, get 404)
+    - See `chat_usecase` for the processing steps
     """
     # Get request ID from middleware
     request_id = getattr(request.state, "request_id", "unknown")
-    
-    # Validate input
-    validated_input = validate_input(chat_request.message)
-    
-    # Call LLM service
-    llm_response = await llm_service.generate(validated_input)
-    
-    # Validate output
-    validated_output = validate_output(llm_response)
-    
-    return ChatResponse(
-        response=validated_output,
-        request_id=request_id
-    )
+
+    # The usecase builds a valid ChatResponse; returning it wrapped skips
+    # FastAPI's response_model re-validation
+    with phase("endpoint"):
+        chat_response = await chat_usecase(
+            chat_request,
+            request_id,
+            pipeline,
+            get_client_key(request),
+            getattr(request.state, "deadline", None),
+        )
+    return FastJSONResponse(chat_response)
+
+
+@router.post("/chat/batch", response_model=BatchChatResponse)
+async def chat_batch(
+    request: Request,
+    batch_request: BatchChatRequest,
+    pipeline: ChatPipeline = Depends(get_chat_pipeline),
+):
+    """
+    Batch chat endpoint for bulk/offline evaluation
+
+    - Each message is answered independently (no session)
+    - Scheduled in the batch lane so interactive chat keeps priority
+    - Failures are reported per item instead of failing the batch
+    - With `stream: true`, items are returned as NDJSON in completion order
+    - Has its own budget instead of the interactive X-Request-Timeout:
+      BATCH_TIMEOUT_SECONDS for the whole batch and
+      BATCH_ITEM_TIMEOUT_SECONDS per item once it starts
+    """
+    settings = get_settings()
+    request_id = getattr(request.state, "request_id", "unknown")
+    client_key = get_client_key(request)
+    deadline = time.monotonic() + settings.batch_timeout_seconds
+    item_timeout = settings.batch_item_timeout_seconds
+
+    if batch_request.stream:
+        async def ndjson():
+            async for item in iter_batch_chat(
+                batch_request, pipeline, client_key, deadline, item_timeout
+            ):
+                yield item.model_dump_json(exclude_none=True) + "\n"
+
+        return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+    with phase("endpoint"):
+        batch_response = await batch_chat_usecase(
+            batch_request, request_id, pipeline, client_key, deadline, item_timeout
+        )
+    return FastJSONResponse(batch_response)
@@ -0,0 +1,309 @@
+"""WebSocket chat router - one connection per visitor, messages multiplexed by id"""
+
+import asyncio
+import json
+import time
+import uuid
+
+from fastapi import APIRouter, Depends, WebSocket
+from pydantic import ValidationError as PydanticValidationError
+from starlette.websockets import WebSocketDisconnect, WebSocketState
+
+from app.core.config import get_settings
+from app.core.metrics import metrics
+from app.middleware.rate_limiter import (
+    SlidingWindowRateLimiter,
+    get_client_ip,
+    get_client_key,
+    get_rate_limiter,
+)
+from app.routers.chat import get_chat_pipeline
+from app.schemas.request import ChatRequest, WSChatMessage
+from app.schemas.response import WSChatEvent
+from app.usecases.chat import ChatPipeline, chat_usecase, describe_error
+
+router = APIRouter(tags=["chat"])
+
+# Close codes (RFC 6455)
+CLOSE_NORMAL = 1000
+CLOSE_POLICY_VIOLATION = 1008
+CLOSE_TOO_BIG = 1009
+
+
+class SlowConsumerError(Exception):
+    """The client is reading events slower than its answer produces them"""
+
+
+class ChatConnection:
+    """
+    One visitor's chat socket
+
+    Messages are answered concurrently, each in its own task, and every
+    event carries the id of the message it answers. An idle connection is
+    just the receive loop: no tasks, no buffers. Inbound messages are
+    capped in size and in number in flight; a connection that sends
+    nothing for `idle_timeout` seconds is closed.
+
+    Generation never waits on the socket: tokens go through a bounded
+    queue per message and a separate task writes them out. A message whose
+    queue overflows is cancelled, so a client that stops reading cannot
+    hold a scheduler slot, and one whose events are still unsent at the
+    deadline closes the connection.
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        pipeline: ChatPipeline,
+        limiter: SlidingWindowRateLimiter,
+        max_in_flight: int = 4,
+        max_message_bytes: int = 8192,
+        idle_timeout: float = 300.0,
+        request_timeout: float = 30.0,
+        max_queued_events: int = 64,
+    ):
+        self.websocket = websocket
+        self.pipeline = pipeline
+        self.limiter = limiter
+        self.max_in_flight = max_in_flight
+        self.max_message_bytes = max_message_bytes
+        self.idle_timeout = idle_timeout
+        self.request_timeout = request_timeout
+        self.max_queued_events = max_queued_events
+        self.client_ip = get_client_ip(websocket)
+        self.client_key = get_client_key(websocket)
+        self._in_flight: dict[str, asyncio.Task] = {}
+        self._send_lock = asyncio.Lock()
+
+    async def run(self) -> None:
+        """Serve the connection until the client leaves or a limit closes it"""
+        await self.websocket.accept()
+        metrics.incr("ws.connections")
+        try:
+            while True:
+                try:
+                    async with asyncio.timeout(self.idle_timeout):
+                        frame = await self.websocket.receive()
+                except TimeoutError:
+                    if self._in_flight:
+                        continue
+                    metrics.incr("ws.closed.idle")
+                    await self.websocket.close(CLOSE_NORMAL, "Idle timeout")
+                    return
+                if frame["type"] == "websocket.disconnect":
+                    return
+
+                raw = frame.get("text")
+                if raw is None:
+                    raw = (frame.get("bytes") or b"").decode("utf-8", "replace")
+                if len(raw.encode()) > self.max_message_bytes:
+                    metrics.incr("ws.closed.too_big")
+                    await self.websocket.close(CLOSE_TOO_BIG, "Message too big")
+                    return
+                await self._dispatch(raw)
+        except WebSocketDisconnect:
+            pass
+        finally:
+            for task in self._in_flight.values():
+                task.cancel()
+            await asyncio.gather(*self._in_flight.values(), return_exceptions=True)
+
+    async def _dispatch(self, raw: str) -> None:
+        try:
+            data = json.loads(raw)
+        except ValueError:
+            data = None
+        try:
+            message = WSChatMessage.model_validate(data)
+        except PydanticValidationError:
+            message_id = data.get("id") if isinstance(data, dict) else None
+            await self._error(
+                message_id if isinstance(message_id, str) else None,
+                "validation_error",
+                "Expected {\"id\": str, \"message\": str, \"session_id\"?: str}",
+            )
+            return
+
+        if message.id in self._in_flight:
+            await self._error(message.id, "duplicate_id", "A message with this id is in flight")
+            return
+        if len(self._in_flight) >= self.max_in_flight:
+            await self._error(
+                message.id,
+                "too_many_in_flight",
+                f"At most {self.max_in_flight} messages may be in flight per connection",
+            )
+            return
+        allowed, retry_after = self.limiter.is_allowed(self.client_ip)
+        if not allowed:
+            await self._error(
+                message.id,
+                "rate_limit_exceeded",
+                f"Rate limit exceeded. Retry after {retry_after} seconds.",
+            )
+            return
+
+        metrics.incr("ws.messages")
+        task = asyncio.create_task(self._answer(message))
+        self._in_flight[message.id] = task
+        task.add_done_callback(lambda done: self._forget(message.id, done))
+
+    def _forget(self, message_id: str, task: asyncio.Task) -> None:
+        if self._in_flight.get(message_id) is task:
+            del self._in_flight[message_id]
+
+    async def _answer(self, message: WSChatMessage) -> None:
+        """Stream the answer to one message, ending with a done or error event"""
+        request_id = str(uuid.uuid4())
+        deadline = time.monotonic() + self.request_timeout
+        events: asyncio.Queue[WSChatEvent | None] = asyncio.Queue(self.max_queued_events)
+        sending = False
+
+        async def deliver() -> None:
+            nonlocal sending
+            while (event := await events.get()) is not None:
+                sending = True
+                await self._send(event)
+                sending = False
+
+        async def on_token(text: str) -> None:
+            try:
+                events.put_nowait(WSChatEvent(id=message.id, type="token", text=text))
+            except asyncio.QueueFull:
+                raise SlowConsumerError from None
+
+        sender = asyncio.create_task(deliver())
+        try:
+            async with asyncio.timeout(deadline - time.monotonic()):
+                try:
+                    chat_response = await chat_usecase(
+                        ChatRequest(message=message.message, session_id=message.session_id),
+                        request_id,
+                        self.pipeline,
+                        self.client_key,
+                        deadline,
+                        on_token=on_token,
+                    )
+                    final = WSChatEvent(
+                        id=message.id,
+                        type="done",
+                        response=chat_response.response,
+                        request_id=request_id,
+                        session_id=chat_response.session_id,
+                    )
+                except SlowConsumerError:
+                    # Tokens the client has not read are dropped with the answer
+                    while not events.empty():
+                        events.get_nowait()
+                    final = self._error_event(
+                        message.id,
+                        "slow_consumer",
+                        "Answer cancelled: events were not read fast enough",
+                        request_id,
+                    )
+                except Exception as e:
+                    error = describe_error(e)
+                    final = self._error_event(
+                        message.id, error.error, error.message, request_id
+                    )
+                await events.put(final)
+                await events.put(None)
+                await sender
+        except TimeoutError:
+            sender.cancel()
+            if sending or not events.empty():
+                metrics.incr("ws.closed.slow_consumer")
+                await self._close(CLOSE_POLICY_VIOLATION, "Client not reading")
+            else:
+                await self._send(
+                    self._error_event(
+                        message.id,
+                        "deadline_exceeded",
+                        "Request deadline exceeded",
+                        request_id,
+                    )
+                )
+        finally:
+            sender.cancel()
+
+    async def _error(
+        self,
+        message_id: str | None,
+        code: str,
+        message: str,
+        request_id: str | None = None,
+    ) -> None:
+        await self._send(self._error_event(message_id, code, message, request_id))
+
+    @staticmethod
+    def _error_event(
+        message_id: str | None,
+        code: str,
+        message: str,
+        request_id: str | None = None,
+    ) -> WSChatEvent:
+        metrics.incr(f"ws.errors.{code}")
+        return WSChatEvent(
+            id=message_id,
+            type="error",
+            error=code,
+            message=message,
+            request_id=request_id,
+        )
+
+    async def _close(self, code: int, reason: str) -> None:
+        if self.websocket.application_state != WebSocketState.CONNECTED:
+            return
+        try:
+            await self.websocket.close(code, reason)
+        except RuntimeError:
+            pass
+
+    async def _send(self, event: WSChatEvent) -> None:
+        # Answers finishing after the client left are dropped
+        if self.websocket.application_state != WebSocketState.CONNECTED:
+            return
+        async with self._send_lock:
+            try:
+                await self.websocket.send_text(event.model_dump_json(exclude_none=True))
+            except (WebSocketDisconnect, RuntimeError):
+                pass
+
+
+def _origin_allowed(websocket: WebSocket, allowed_origins: list[str]) -> bool:
+    # CORS does not cover WebSockets, so browsers' Origin is checked here
+    origin = websocket.headers.get("origin")
+    return origin is None or "*" in allowed_origins or origin in allowed_origins
+
+
+@router.websocket("/ws/chat")
+async def ws_chat(
+    websocket: WebSocket,
+    pipeline: ChatPipeline = Depends(get_chat_pipeline),
+):
+    """
+    WebSocket chat endpoint
+
+    - Client sends `{"id", "message", "session_id"?}`; several messages may
+      be in flight at once
+    - Server streams `{"id", "type": "token", "text"}` events and ends each
+      message with `type: "done"` (full response, session_id) or
+      `type: "error"`
+    - Rate limit and guardrails apply to every message
+    """
+    settings = get_settings()
+    if not _origin_allowed(websocket, settings.allowed_origins):
+        metrics.incr("ws.rejected.origin")
+        await websocket.close(CLOSE_POLICY_VIOLATION)
+        return
+
+    await ChatConnection(
+        websocket,
+        pipeline,
+        get_rate_limiter(),
+        max_in_flight=settings.ws_max_in_flight,
+        max_message_bytes=settings.ws_max_message_bytes,
+        idle_timeout=settings.ws_idle_timeout_seconds,
+        request_timeout=settings.request_timeout_default_seconds,
+        max_queued_events=settings.ws_max_queued_events,
+    ).run()
@@ -1,4 +1,16 @@
-from app.schemas.request import ChatRequest
-from app.schemas.response import ChatResponse
+from app.schemas.request import BatchChatRequest, ChatRequest
+from app.schemas.response import (
+    BatchChatItem,
+    BatchChatResponse,
+    BatchItemError,
+    ChatResponse,
+)
 
-__all__ = ["ChatRequest", "ChatResponse"]
+__all__ = [
+    "BatchChatItem",
+    "BatchChatRequest",
+    "BatchChatResponse",
+    "BatchItemError",
+    "ChatRequest",
+    "ChatResponse",
+]
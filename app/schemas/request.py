@@ -3,6 +3,10 @@ from pydantic import BaseModel, ConfigDict, Field, field_validator
 
 class ChatRequest(BaseModel):
     message: str = Field(..., min_length=1, max_length=1000)
+    # Issued by the server in the first response; unknown ids are rejected
+    session_id: str | None = Field(
+        default=None, min_length=1, max_length=64, pattern=r"^[A-Za-z0-9_-]+$"
+    )
 
     model_config = ConfigDict(str_strip_whitespace=True)
 
@@ -12,3 +16,14 @@ class ChatRequest(BaseModel):
         if not v.strip():
             raise ValueError("message must not be blank")
         return v
+
+
+class WSChatMessage(ChatRequest):
+    # Chosen by the client and echoed on every event answering this message
+    id: str = Field(..., min_length=1, max_length=64)
+
+
+class BatchChatRequest(BaseModel):
+    # Items are validated individually so one bad message does not fail the batch
+    messages: list[str] = Field(..., min_length=1, max_length=500)
+    stream: bool = False
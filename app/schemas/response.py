@@ -4,3 +4,31 @@ from pydantic import BaseModel
 class ChatResponse(BaseModel):
     response: str
     request_id: str
+    session_id: str | None = None
+
+
+class BatchItemError(BaseModel):
+    error: str
+    message: str
+
+
+class BatchChatItem(BaseModel):
+    index: int
+    response: str | None = None
+    error: BatchItemError | None = None
+
+
+class BatchChatResponse(BaseModel):
+    results: list[BatchChatItem]
+    request_id: str
+
+
+class WSChatEvent(BaseModel):
+    id: str | None = None  # None for errors not tied to a message
+    type: str  # "token", "done" or "error"
+    text: str | None = None
+    response: str | None = None
+    request_id: str | None = None
+    session_id: str | None = None
+    error: str | None = None
+    message: str | None = None
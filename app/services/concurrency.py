@@ -0,0 +1,104 @@
+"""Adaptive concurrency limit for the LLM backend"""
+
+import math
+
+from app.core.metrics import metrics
+
+
+class AdaptiveLimit:
+    """
+    Gradient-style concurrency limit driven by observed latency
+
+    Keeps a moving average of recent round-trip times and a no-load
+    baseline: the minimum RTT seen under concurrency, re-learned from
+    unloaded calls (at ``min_limit``) so it can also rise after a model or
+    hardware change. While recent latency stays within ``tolerance`` of the
+    baseline the limit grows by about sqrt(limit) per sample; when the
+    backend starts queueing internally, latency rises, the gradient
+    ``tolerance * baseline / recent`` drops below 1 and the limit shrinks
+    proportionally. Failed calls shrink it multiplicatively.
+    """
+
+    def __init__(
+        self,
+        initial: int = 4,
+        min_limit: int = 1,
+        max_limit: int = 16,
+        tolerance: float = 1.5,
+        smoothing: float = 0.2,
+        recent_window: int = 10,
+        baseline_window: int = 20,
+        backoff: float = 0.9,
+    ):
+        """
+        Initialize adaptive limit
+
+        Args:
+            initial: Starting limit
+            min_limit: Lower bound of the limit
+            max_limit: Upper bound of the limit
+            tolerance: Accepted ratio of recent to baseline latency
+            smoothing: Weight of each new limit estimate
+            recent_window: Samples averaged for the recent latency
+            baseline_window: Unloaded samples averaged to re-learn the baseline
+            backoff: Multiplicative decrease applied on failed calls
+        """
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.tolerance = tolerance
+        self.smoothing = smoothing
+        self.backoff = backoff
+        self._recent_alpha = 2 / (recent_window + 1)
+        self._baseline_alpha = 2 / (baseline_window + 1)
+        self._estimate = float(initial)
+        self.recent_rtt = 0.0
+        self.baseline_rtt = 0.0
+
+    @property
+    def limit(self) -> int:
+        """Current limit as a whole number of concurrent calls"""
+        return max(self.min_limit, min(self.max_limit, int(self._estimate)))
+
+    def on_sample(self, rtt: float, in_flight: int, dropped: bool = False) -> int:
+        """
+        Update the limit from one completed call
+
+        Args:
+            rtt: Seconds the call held its slot
+            in_flight: Concurrent calls when this one started
+            dropped: Whether the call failed (timeout or backend error)
+
+        Returns:
+            New limit
+        """
+        if dropped:
+            self._estimate = max(self.min_limit, self._estimate * self.backoff)
+            self._publish()
+            return self.limit
+
+        if self.baseline_rtt == 0.0:
+            self.recent_rtt = self.baseline_rtt = rtt
+        else:
+            self.recent_rtt += self._recent_alpha * (rtt - self.recent_rtt)
+            if in_flight <= self.min_limit:
+                # Unloaded call: a true no-load sample, may move either way
+                self.baseline_rtt += self._baseline_alpha * (rtt - self.baseline_rtt)
+            else:
+                self.baseline_rtt = min(self.baseline_rtt, rtt)
+
+        gradient = max(
+            0.5, min(1.0, self.tolerance * self.baseline_rtt / self.recent_rtt)
+        )
+        new_estimate = self._estimate * gradient + math.sqrt(self._estimate)
+        if new_estimate > self._estimate and in_flight < self._estimate / 2:
+            # App-limited: too little traffic to justify probing higher
+            new_estimate = self._estimate
+        self._estimate += self.smoothing * (new_estimate - self._estimate)
+        self._estimate = max(self.min_limit, min(self.max_limit, self._estimate))
+        self._publish()
+        return self.limit
+
+    def _publish(self) -> None:
+        metrics.set_gauge("concurrency.limit", self.limit)
+        metrics.set_gauge("concurrency.rtt_recent_ms", self.recent_rtt * 1000)
+        metrics.set_gauge("concurrency.rtt_baseline_ms", self.baseline_rtt * 1000)
@@ -0,0 +1,91 @@
+"""Per-session cache of Ollama KV context token arrays"""
+
+from array import array
+from collections import OrderedDict
+from functools import lru_cache
+
+from app.core.config import get_settings
+
+
+class ContextCache:
+    """
+    Bounded LRU cache of the `context` arrays returned by Ollama
+
+    Passing the previous `context` back to `/api/generate` lets Ollama skip
+    re-evaluating the whole conversation. Token ids are stored as
+    ``array('i')`` (4 bytes per token instead of a boxed int per token).
+
+    Each context records how many turns of the session it covers and is
+    only reused for a prompt built on exactly that many. Turns this process
+    did not generate (answered by another worker sharing the session store,
+    or without the LLM) make it stale, and the next turn sends the full
+    prompt instead.
+    """
+    
+    def __init__(self, max_sessions: int = 1000, max_tokens: int = 8192):
+        """
+        Initialize context cache
+        
+        Args:
+            max_sessions: Sessions kept before the least recently used is dropped
+            max_tokens: Longest context kept per session; longer contexts are
+                discarded and the next turn falls back to the full prompt
+        """
+        self.max_sessions = max_sessions
+        self.max_tokens = max_tokens
+        self._entries: OrderedDict[str, tuple[str, int, array]] = OrderedDict()
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def get(self, session_id: str, model: str, turns: int) -> array | None:
+        """
+        Return the cached context for a session
+        
+        Args:
+            session_id: Session identifier
+            model: Model the caller is about to use
+            turns: Number of history turns the caller's prompt is built on
+            
+        Returns:
+            Token array, or None if missing, produced by another model or
+            covering a different number of turns
+        """
+        entry = self._entries.get(session_id)
+        if entry is None:
+            return None
+        if entry[0] != model or entry[1] != turns:
+            # Contexts are model specific and must match the stored history
+            del self._entries[session_id]
+            return None
+        self._entries.move_to_end(session_id)
+        return entry[2]
+    
+    def put(self, session_id: str, model: str, context: list[int], turns: int) -> None:
+        """Store the context returned for a session's latest turn (its `turns`-th)"""
+        if len(context) > self.max_tokens:
+            self._entries.pop(session_id, None)
+            return
+        self._entries[session_id] = (model, turns, array("i", context))
+        self._entries.move_to_end(session_id)
+        while len(self._entries) > self.max_sessions:
+            self._entries.popitem(last=False)
+    
+    def discard(self, session_id: str) -> None:
+        """Forget a session's context (e.g. a turn was answered without the LLM)"""
+        self._entries.pop(session_id, None)
+
+
+@lru_cache
+def get_context_cache() -> ContextCache:
+    """Process-wide context cache shared by all requests"""
+    settings = get_settings()
+    return ContextCache(
+        max_sessions=settings.ollama_context_cache_sessions,
+        max_tokens=settings.ollama_context_max_tokens,
+    )
+
+
+def get_session_context_cache() -> ContextCache | None:
+    """The shared context cache, or None with OLLAMA_CONTEXT_REUSE off"""
+    return get_context_cache() if get_settings().ollama_context_reuse else None
@@ -0,0 +1,165 @@
+"""Micro-batching of concurrent embedding requests into one Ollama call"""
+
+import asyncio
+import time
+from collections.abc import AsyncIterator, Awaitable, Callable
+from typing import TYPE_CHECKING
+
+from app.core.exceptions import DeadlineExceededError
+from app.core.metrics import metrics
+from app.services.generation import GenerationOutcome
+
+if TYPE_CHECKING:
+    from app.services.llm_service import LLMService
+
+EmbedFn = Callable[..., Awaitable[list[list[float]]]]
+
+
+class EmbeddingBatcher:
+    """
+    Collects embedding requests for up to `max_wait` seconds or
+    `max_batch_size` texts and sends them as one call
+
+    Each caller awaits a future resolved with its own vectors; identical
+    texts in a batch are embedded once. A batch is sent with the latest
+    deadline among its callers, and each caller stops waiting at its own.
+    Metrics: `embed_batch.fill_ratio` (texts sent / max_batch_size per
+    batch) and counters for batches, requests and texts.
+    """
+
+    def __init__(self, embed: EmbedFn, max_batch_size: int = 32, max_wait: float = 0.005):
+        """
+        Initialize batcher
+
+        Args:
+            embed: Batch embedding call, `embed(texts, deadline=...)`
+            max_batch_size: Texts that trigger an immediate send
+            max_wait: Seconds the first request of a batch waits for company
+        """
+        self._embed = embed
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._pending: list[tuple[list[str], float | None, asyncio.Future]] = []
+        self._pending_texts = 0
+        self._timer: asyncio.TimerHandle | None = None
+        self._sending: set[asyncio.Task] = set()
+
+    async def embed(
+        self, texts: list[str], *, deadline: float | None = None
+    ) -> list[list[float]]:
+        """Embed texts as part of the next batch"""
+        if not texts:
+            return []
+        loop = asyncio.get_running_loop()
+        if self._pending_texts + len(texts) > self.max_batch_size:
+            self._flush()
+        future = loop.create_future()
+        self._pending.append((texts, deadline, future))
+        self._pending_texts += len(texts)
+        metrics.incr("embed_batch.requests")
+        if self._pending_texts >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+
+        if deadline is None:
+            return await future
+        try:
+            # Cancels the future on timeout, so the batch skips this caller
+            return await asyncio.wait_for(future, deadline - time.monotonic())
+        except TimeoutError:
+            raise DeadlineExceededError("Request deadline exceeded during embedding")
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        batch, self._pending, self._pending_texts = self._pending, [], 0
+        task = asyncio.create_task(self._send(batch))
+        self._sending.add(task)
+        task.add_done_callback(self._sending.discard)
+
+    async def _send(self, batch: list[tuple[list[str], float | None, asyncio.Future]]) -> None:
+        unique = list(dict.fromkeys(text for texts, _, _ in batch for text in texts))
+        deadlines = [deadline for _, deadline, _ in batch]
+        deadline = None if None in deadlines else max(deadlines)
+
+        metrics.incr("embed_batch.batches")
+        metrics.incr("embed_batch.texts", len(unique))
+        metrics.observe("embed_batch.fill_ratio", len(unique) / self.max_batch_size)
+        try:
+            vectors = await self._embed(unique, deadline=deadline)
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        by_text = dict(zip(unique, vectors))
+        for texts, _, future in batch:
+            if not future.done():
+                future.set_result([by_text[text] for text in texts])
+
+
+class BatchedEmbeddingService:
+    """
+    LLM service whose embedding calls go through a shared EmbeddingBatcher
+
+    Generations pass straight through to the wrapped service.
+    """
+
+    def __init__(self, inner: "LLMService", batcher: EmbeddingBatcher):
+        """
+        Initialize batched service
+
+        Args:
+            inner: Service generating answers
+            batcher: Process-wide batcher embedding texts
+        """
+        self.inner = inner
+        self.batcher = batcher
+
+    async def generate(
+        self,
+        prompt: str,
+        *,
+        session_id: str | None = None,
+        turn_prompt: str | None = None,
+        history_turns: int = 0,
+        deadline: float | None = None,
+        outcome: GenerationOutcome | None = None,
+    ) -> str:
+        return await self.inner.generate(
+            prompt,
+            session_id=session_id,
+            turn_prompt=turn_prompt,
+            history_turns=history_turns,
+            deadline=deadline,
+            outcome=outcome,
+        )
+
+    def generate_stream(
+        self,
+        prompt: str,
+        *,
+        session_id: str | None = None,
+        turn_prompt: str | None = None,
+        history_turns: int = 0,
+        deadline: float | None = None,
+        outcome: GenerationOutcome | None = None,
+    ) -> AsyncIterator[str]:
+        return self.inner.generate_stream(
+            prompt,
+            session_id=session_id,
+            turn_prompt=turn_prompt,
+            history_turns=history_turns,
+            deadline=deadline,
+            outcome=outcome,
+        )
+
+    async def embed(
+        self, texts: list[str], *, deadline: float | None = None
+    ) -> list[list[float]]:
+        return await self.batcher.embed(texts, deadline=deadline)
@@ -0,0 +1,239 @@
+"""Precomputed FAQ answers served without the LLM"""
+
+import asyncio
+import json
+import logging
+import os
+import re
+import threading
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from app.core.config import get_settings
+from app.core.guardrails import validate_output
+from app.core.metrics import metrics
+from app.services.generation import GenerationOutcome
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, run a single worker
+    fcntl = None
+
+if TYPE_CHECKING:
+    from app.services.llm_service import LLMService
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def normalise(text: str) -> tuple[str, ...]:
+    """Lowercase word tokens of a question (punctuation and spacing ignored)"""
+    return tuple(_TOKEN_RE.findall(text.lower()))
+
+
+@dataclass(frozen=True, slots=True)
+class FAQEntry:
+    """One curated intent with its sample questions and precomputed answer"""
+
+    id: str
+    questions: tuple[str, ...]
+    answer: str
+
+
+class FAQTable:
+    """
+    Matcher for curated FAQ questions
+
+    Built once at startup. An exact lookup on the normalised question covers
+    most repeats; otherwise candidates sharing a token are scored by token
+    Jaccard similarity through an inverted index, so a match costs a few
+    dict lookups rather than a scan of every question.
+    """
+
+    def __init__(self, entries: list[FAQEntry], min_similarity: float = 0.8):
+        """
+        Initialize FAQ table
+
+        Args:
+            entries: Entries with answers (entries without one are skipped)
+            min_similarity: Minimum token Jaccard similarity for a fuzzy match
+        """
+        self.min_similarity = min_similarity
+        self.entries = [entry for entry in entries if entry.answer]
+        self._exact: dict[tuple[str, ...], FAQEntry] = {}
+        self._token_sets: list[tuple[frozenset[str], FAQEntry]] = []
+        self._index: dict[str, list[int]] = {}
+
+        for entry in self.entries:
+            for question in entry.questions:
+                tokens = normalise(question)
+                if not tokens:
+                    continue
+                self._exact.setdefault(tokens, entry)
+                position = len(self._token_sets)
+                self._token_sets.append((frozenset(tokens), entry))
+                for token in set(tokens):
+                    self._index.setdefault(token, []).append(position)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def match(self, text: str) -> FAQEntry | None:
+        """
+        Find the FAQ entry for a validated user message
+
+        Args:
+            text: User message
+
+        Returns:
+            Matching entry, or None to fall through to the LLM
+        """
+        tokens = normalise(text)
+        if not tokens:
+            return None
+        entry = self._exact.get(tokens)
+        if entry is not None:
+            return entry
+
+        query = frozenset(tokens)
+        best, best_score = None, self.min_similarity
+        seen: set[int] = set()
+        for token in query:
+            for position in self._index.get(token, ()):
+                if position in seen:
+                    continue
+                seen.add(position)
+                candidate, candidate_entry = self._token_sets[position]
+                score = len(query & candidate) / len(query | candidate)
+                if score >= best_score:
+                    best, best_score = candidate_entry, score
+        return best
+
+    def answer(self, text: str) -> str | None:
+        """Return the precomputed answer for a message and record the lookup"""
+        entry = self.match(text)
+        metrics.incr("faq.lookups")
+        if entry is not None:
+            metrics.incr("faq.hits")
+            metrics.incr(f"faq.hits.{entry.id}")
+        metrics.set_gauge("faq.traffic_share", metrics.ratio("faq.hits", "chat.messages"))
+        return entry.answer if entry is not None else None
+
+
+def load_faq_entries(path: str | Path) -> list[FAQEntry]:
+    """
+    Load curated FAQ entries from a JSON file
+
+    Expected format: ``{"entries": [{"id", "questions": [...], "answer"}]}``;
+    ``answer`` may be null until written by hand or generated by
+    ``generate_missing_answers``.
+    """
+    data = json.loads(Path(path).read_text(encoding="utf-8"))
+    return [
+        FAQEntry(
+            id=item["id"],
+            questions=tuple(item["questions"]),
+            answer=item.get("answer") or "",
+        )
+        for item in data["entries"]
+    ]
+
+
+@asynccontextmanager
+async def _file_lock(path: Path) -> AsyncIterator[None]:
+    """Exclusive lock on ``<path>.lock``, shared by every worker process"""
+    with open(path.with_suffix(path.suffix + ".lock"), "a") as lock_file:
+        if fcntl is not None:
+            await asyncio.to_thread(fcntl.flock, lock_file, fcntl.LOCK_EX)
+        yield  # closing the file releases the lock
+
+
+async def generate_missing_answers(path: str | Path, llm_service: "LLMService") -> int:
+    """
+    Generate answers for entries without one and write them back to the file
+
+    Each entry is answered from its first question. Answers that did not
+    finish (e.g. hit num_predict) are left null rather than stored cut off.
+    Workers sharing the file take turns: the first fills it, the others
+    then find nothing left to generate.
+
+    Returns:
+        Number of answers filled in
+    """
+    path = Path(path)
+    async with _file_lock(path):
+        data = json.loads(path.read_text(encoding="utf-8"))
+        filled = 0
+        for item in data["entries"]:
+            if item.get("answer"):
+                continue
+            outcome = GenerationOutcome()
+            text = await llm_service.generate(item["questions"][0], outcome=outcome)
+            if not outcome.complete:
+                logger.warning("FAQ answer for %s was cut short; left empty", item["id"])
+                continue
+            item["answer"] = validate_output(text)
+            filled += 1
+
+        if filled:
+            # Replace atomically so a crash never leaves a half-written file
+            tmp = path.with_suffix(path.suffix + ".tmp")
+            tmp.write_text(
+                json.dumps(data, ensure_ascii=False, indent=2) + "\n", encoding="utf-8"
+            )
+            os.replace(tmp, path)
+    return filled
+
+
+async def fill_faq_table(llm_service: "LLMService") -> None:
+    """Generate missing answers once and rebuild the table to serve them"""
+    filled = await generate_missing_answers(get_settings().faq_path, llm_service)
+    logger.info("Generated %d FAQ answers", filled)
+    # Rebuilt even when nothing was filled here: another worker may have
+    # filled the file while this one waited for the lock
+    clear_faq_table()
+    await asyncio.to_thread(get_faq_table)
+
+
+_table_lock = threading.Lock()
+
+
+def get_faq_table() -> FAQTable | None:
+    """
+    Dependency injection factory for the FAQ table (None when disabled)
+
+    Built once: requests arriving while the startup check is still loading
+    the table wait for it instead of building their own.
+    """
+    with _table_lock:
+        return _load_faq_table()
+
+
+def clear_faq_table() -> None:
+    """Forget the built table; the next get_faq_table() call reloads the file"""
+    with _table_lock:
+        _load_faq_table.cache_clear()
+
+
+@lru_cache
+def _load_faq_table() -> FAQTable | None:
+    settings = get_settings()
+    if not settings.faq_enabled or not Path(settings.faq_path).is_file():
+        return None
+    table = FAQTable(
+        load_faq_entries(settings.faq_path),
+        min_similarity=settings.faq_min_similarity,
+    )
+    metrics.set_gauge("faq.entries", len(table))
+    if not len(table):
+        logger.warning(
+            "FAQ table %s has no answers; every message goes to the LLM "
+            "(fill them in or set FAQ_GENERATE_MISSING=true)",
+            settings.faq_path,
+        )
+    return table
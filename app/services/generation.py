@@ -0,0 +1,24 @@
+"""How an LLM generation ended, reported alongside its text"""
+
+from dataclasses import dataclass
+
+
+@dataclass(slots=True)
+class GenerationOutcome:
+    """
+    Filled in by the service that ran a generation
+
+    Callers pass an instance as `outcome=` and read it once the call (or
+    the whole stream) has finished. Ollama reports `done_reason` "stop"
+    when the model ended the answer itself and "length" when it ran into
+    num_predict; an abandoned stream leaves it unset.
+    """
+
+    done_reason: str | None = None
+    # num_predict was lowered below the configured maximum to fit the deadline
+    deadline_capped: bool = False
+
+    @property
+    def complete(self) -> bool:
+        """Whether the answer is whole and may be reused for other requests"""
+        return self.done_reason == "stop" and not self.deadline_capped
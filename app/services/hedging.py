@@ -0,0 +1,263 @@
+"""Hedged requests across several LLM backends"""
+
+import asyncio
+import random
+import time
+from collections import deque
+from collections.abc import AsyncIterator, Awaitable, Callable, Mapping, Sequence
+from functools import lru_cache
+from typing import TYPE_CHECKING, TypeVar
+
+from app.core.config import get_settings
+from app.core.metrics import metrics
+from app.services.generation import GenerationOutcome
+
+if TYPE_CHECKING:
+    from app.services.context_cache import ContextCache
+    from app.services.llm_service import LLMService
+
+T = TypeVar("T")
+
+# Calls are hedged against the latency of their own kind: generations and
+# embeddings differ by orders of magnitude
+CALL_TYPES = ("generate", "embed")
+
+
+class LatencyTracker:
+    """Rolling window of primary response latencies"""
+
+    def __init__(self, window: int = 1000, min_samples: int = 20):
+        """
+        Initialize latency tracker
+
+        Args:
+            window: Number of most recent latencies kept
+            min_samples: Samples needed before percentiles are trusted
+        """
+        self.min_samples = min_samples
+        self._samples: deque[float] = deque(maxlen=window)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def percentile(self, p: float) -> float | None:
+        """Latency at percentile `p` (0-100), or None with too few samples"""
+        if len(self._samples) < self.min_samples:
+            return None
+        ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(len(ordered) * p / 100))
+        return ordered[index]
+
+
+class HedgeBudget:
+    """
+    Token bucket capping hedges to a share of traffic
+
+    Every request deposits ``percent / 100`` of a token and every hedge
+    spends a whole one, so over time at most ``percent``% of requests are
+    duplicated. ``burst`` bounds how many hedges an idle period can save up.
+    """
+
+    def __init__(self, percent: float = 5.0, burst: float = 10.0):
+        self.rate = percent / 100
+        self.burst = burst
+        self._tokens = 0.0
+
+    def deposit(self) -> None:
+        self._tokens = min(self.burst, self._tokens + self.rate)
+
+    def try_spend(self) -> bool:
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+
+class HedgedLLMService:
+    """
+    LLM service that duplicates slow calls to a second backend
+
+    Calls go to the primary backend first. If it has not answered after the
+    ``percentile`` latency of recent primary calls of the same type
+    (``initial_delay`` until enough calls were seen) and the budget allows,
+    the same call is sent to
+    a randomly chosen secondary. The first successful answer wins and the
+    other call is cancelled, which closes its connection so Ollama stops
+    generating. Responses are not streamed, so "first byte" is the whole
+    answer.
+
+    Only the primary reads and stores the session's KV context. When a
+    secondary wins, whatever the primary stored is discarded, since it
+    belongs to an answer the user never saw.
+    """
+
+    def __init__(
+        self,
+        backends: Sequence["LLMService"],
+        trackers: Mapping[str, LatencyTracker],
+        budget: HedgeBudget,
+        percentile: float = 95.0,
+        initial_delay: float = 2.0,
+        context_cache: "ContextCache | None" = None,
+    ):
+        """
+        Initialize hedged service
+
+        Args:
+            backends: Primary backend followed by one or more secondaries
+            trackers: Shared latency windows of the primary backend, one per
+                call type in CALL_TYPES
+            budget: Shared hedge budget
+            percentile: Primary latency percentile used as the hedge delay
+            initial_delay: Hedge delay used until the tracker has enough samples
+            context_cache: Session KV contexts the primary backend stores into
+        """
+        if len(backends) < 2:
+            raise ValueError("Hedging needs at least two backends")
+        self.backends = list(backends)
+        self.trackers = trackers
+        self.budget = budget
+        self.percentile = percentile
+        self.initial_delay = initial_delay
+        self.context_cache = context_cache
+
+    def hedge_delay(self, call_type: str = "generate") -> float:
+        """Seconds to wait on the primary before hedging a call of this type"""
+        delay = self.trackers[call_type].percentile(self.percentile)
+        return self.initial_delay if delay is None else delay
+
+    async def generate(
+        self,
+        prompt: str,
+        *,
+        session_id: str | None = None,
+        turn_prompt: str | None = None,
+        history_turns: int = 0,
+        deadline: float | None = None,
+        outcome: GenerationOutcome | None = None,
+    ) -> str:
+        """Generate a response, hedging to a secondary backend when slow"""
+
+        primary = self.backends[0]
+
+        async def call(
+            backend: "LLMService",
+        ) -> tuple[str, GenerationOutcome, "LLMService"]:
+            # Each backend reports its own outcome; only the winner's is kept
+            own = GenerationOutcome()
+            text = await backend.generate(
+                prompt,
+                session_id=session_id if backend is primary else None,
+                turn_prompt=turn_prompt,
+                history_turns=history_turns,
+                deadline=deadline,
+                outcome=own,
+            )
+            return text, own, backend
+
+        text, own, winner = await self._hedged("generate", call)
+        # The losing primary may have finished (and stored its context) in
+        # the same loop iteration; _hedged has awaited it by now
+        if (
+            winner is not primary
+            and session_id is not None
+            and self.context_cache is not None
+        ):
+            self.context_cache.discard(session_id)
+        if outcome is not None:
+            outcome.done_reason = own.done_reason
+            outcome.deadline_capped = own.deadline_capped
+        return text
+
+    def generate_stream(
+        self,
+        prompt: str,
+        *,
+        session_id: str | None = None,
+        turn_prompt: str | None = None,
+        history_turns: int = 0,
+        deadline: float | None = None,
+        outcome: GenerationOutcome | None = None,
+    ) -> AsyncIterator[str]:
+        """
+        Stream a response from the primary backend
+
+        Streams are not hedged: by the time the first chunk is late, the
+        client is already watching the response arrive.
+        """
+        return self.backends[0].generate_stream(
+            prompt,
+            session_id=session_id,
+            turn_prompt=turn_prompt,
+            history_turns=history_turns,
+            deadline=deadline,
+            outcome=outcome,
+        )
+
+    async def embed(
+        self, texts: list[str], *, deadline: float | None = None
+    ) -> list[list[float]]:
+        """Embed texts, hedging to a secondary backend when slow"""
+        return await self._hedged(
+            "embed", lambda backend: backend.embed(texts, deadline=deadline)
+        )
+
+    async def _hedged(
+        self, call_type: str, call: Callable[["LLMService"], Awaitable[T]]
+    ) -> T:
+        self.budget.deposit()
+        tracker = self.trackers[call_type]
+        started = time.monotonic()
+        primary = asyncio.ensure_future(call(self.backends[0]))
+        tasks = {primary}
+        error: BaseException | None = None
+
+        delay = self.hedge_delay(call_type)
+        metrics.set_gauge(f"llm.hedge.delay_ms.{call_type}", delay * 1000)
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done:
+                if self.budget.try_spend():
+                    secondary = random.choice(self.backends[1:])
+                    tasks.add(asyncio.ensure_future(call(secondary)))
+                    metrics.incr("llm.hedge.sent")
+                else:
+                    metrics.incr("llm.hedge.budget_exhausted")
+
+            while tasks:
+                done, tasks = await asyncio.wait(
+                    tasks, return_when=asyncio.FIRST_COMPLETED
+                )
+                succeeded = []
+                for task in done:
+                    if task.exception() is not None:
+                        error = error or task.exception()
+                    else:
+                        succeeded.append(task)
+                if not succeeded:
+                    continue
+                winner = primary if primary in succeeded else succeeded[0]
+                if winner is not primary:
+                    metrics.incr("llm.hedge.won")
+                # Only the primary's latency is tracked; when it loses, it
+                # took at least this long. A failed primary is not sampled.
+                if winner is primary or primary in tasks:
+                    tracker.record(time.monotonic() - started)
+                return winner.result()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+
+@lru_cache
+def get_hedge_state() -> tuple[dict[str, LatencyTracker], HedgeBudget]:
+    """Latency windows and budget shared by all hedged calls of the process"""
+    settings = get_settings()
+    trackers = {call_type: LatencyTracker() for call_type in CALL_TYPES}
+    return trackers, HedgeBudget(percent=settings.llm_hedge_budget_percent)
@@ -1,6 +1,26 @@
+import asyncio
+import json
+import time
+from array import array
+from collections.abc import AsyncIterator
+from functools import lru_cache
 from typing import Protocol
 import httpx
-from app.core.config import get_settings
+from app.core.config import Settings, get_settings
+from app.core.exceptions import DeadlineExceededError
+from app.core.metrics import metrics
+from app.core.tracing import KIND_CLIENT, current_traceparent, span
+from app.services.context_cache import ContextCache, get_session_context_cache
+from app.services.embedding_batcher import BatchedEmbeddingService, EmbeddingBatcher
+from app.services.generation import GenerationOutcome
+from app.services.hedging import HedgedLLMService, get_hedge_state
+from app.services.response_cache import CachedLLMService, get_response_cache
+
+
+def _trace_headers() -> dict[str, str]:
+    """W3C trace context for an outgoing Ollama call"""
+    traceparent = current_traceparent()
+    return {"traceparent": traceparent} if traceparent is not None else {}
 
 
 class LLMServiceError(Exception):
@@ -10,46 +30,424 @@ class LLMServiceError(Exception):
 
 class LLMService(Protocol):
     """Protocol for LLM service implementations"""
-    
-    async def generate(self, prompt: str) -> str:
+
+    async def generate(
+        self,
+        prompt: str,
+        *,
+        session_id: str | None = None,
+        turn_prompt: str | None = None,
+        history_turns: int = 0,
+        deadline: float | None = None,
+        outcome: GenerationOutcome | None = None,
+    ) -> str:
         """Generate response from LLM"""
         ...
 
+    def generate_stream(
+        self,
+        prompt: str,
+        *,
+        session_id: str | None = None,
+        turn_prompt: str | None = None,
+        history_turns: int = 0,
+        deadline: float | None = None,
+        outcome: GenerationOutcome | None = None,
+    ) -> AsyncIterator[str]:
+        """Generate response from LLM as a stream of text chunks"""
+        ...
+
+    async def embed(
+        self, texts: list[str], *, deadline: float | None = None
+    ) -> list[list[float]]:
+        """Embed texts into vectors"""
+        ...
+
 
 class OllamaService:
     """Ollama LLM service implementation"""
-    
-    def __init__(self, base_url: str, model_name: str, timeout: float = 30.0):
+
+    def __init__(
+        self,
+        base_url: str,
+        model_name: str,
+        timeout: float = 30.0,
+        embedding_model: str = "nomic-embed-text",
+        context_cache: ContextCache | None = None,
+        min_budget: float = 0.5,
+        tokens_per_second: float = 0.0,
+        max_predict: int = 1024,
+        min_predict: int = 0,
+        system_prompt: str = "",
+    ):
         self.base_url = base_url
         self.model_name = model_name
         self.timeout = timeout
-    
-    async def generate(self, prompt: str) -> str:
-        """Generate response from Ollama"""
+        self.embedding_model = embedding_model
+        self.context_cache = context_cache
+        self.min_budget = min_budget
+        self.tokens_per_second = tokens_per_second
+        self.max_predict = max_predict
+        self.min_predict = min_predict
+        self.system_prompt = system_prompt
+
+    def _generate_request(
+        self,
+        prompt: str,
+        session_id: str | None,
+        turn_prompt: str | None,
+        history_turns: int,
+        deadline: float | None,
+        stream: bool,
+        outcome: GenerationOutcome | None,
+    ) -> tuple[dict, float, array | None]:
+        """Payload, HTTP timeout and reused KV context for /api/generate"""
+        timeout = self.timeout
+        options = {}
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            if remaining < self.min_budget:
+                raise DeadlineExceededError(
+                    "Request deadline exceeded before LLM generation could start"
+                )
+            timeout = min(timeout, remaining)
+            if self.tokens_per_second > 0:
+                num_predict = int(remaining * self.tokens_per_second)
+                if num_predict < self.min_predict:
+                    # Too little time left for a useful answer
+                    raise DeadlineExceededError(
+                        "Request deadline too short for an LLM answer"
+                    )
+                options["num_predict"] = min(self.max_predict, num_predict)
+                if outcome is not None:
+                    outcome.deadline_capped = num_predict < self.max_predict
+
+        context = None
+        if self.context_cache is not None and session_id and turn_prompt is not None:
+            context = self.context_cache.get(
+                session_id, self.model_name, history_turns
+            )
+
+        payload = {
+            "model": self.model_name,
+            "prompt": prompt if context is None else turn_prompt,
+            "stream": stream,
+        }
+        if self.system_prompt:
+            payload["system"] = self.system_prompt
+        if context is not None:
+            payload["context"] = context.tolist()
+        if options:
+            payload["options"] = options
+        return payload, timeout, context
+
+    async def generate(
+        self,
+        prompt: str,
+        *,
+        session_id: str | None = None,
+        turn_prompt: str | None = None,
+        history_turns: int = 0,
+        deadline: float | None = None,
+        outcome: GenerationOutcome | None = None,
+    ) -> str:
+        """
+        Generate response from Ollama
+
+        Args:
+            prompt: Full prompt including any conversation history
+            session_id: Session whose KV context may be reused
+            turn_prompt: Prompt for the newest turn only; sent together with
+                the cached context instead of `prompt` when one is available
+            history_turns: Turns of session history `prompt` is built on; a
+                cached context covering a different number is not reused
+            deadline: `time.monotonic()` by which the request must finish;
+                bounds the HTTP timeout and the number of generated tokens
+            outcome: Filled in with how the generation ended (done_reason,
+                and whether num_predict was cut to fit the deadline)
+
+        Raises:
+            DeadlineExceededError: If too little of the budget is left for a
+                minimum-length answer
+            LLMServiceError: If the Ollama call fails
+        """
+        payload, timeout, context = self._generate_request(
+            prompt,
+            session_id,
+            turn_prompt,
+            history_turns,
+            deadline,
+            stream=False,
+            outcome=outcome,
+        )
+
+        with span(
+            "llm.generate",
+            KIND_CLIENT,
+            **{
+                "llm.model": self.model_name,
+                "llm.base_url": self.base_url,
+                "llm.prompt_chars": len(payload["prompt"]),
+                "llm.context_reuse": context is not None,
+            },
+        ):
+            try:
+                async with httpx.AsyncClient(timeout=timeout) as client:
+                    response = await client.post(
+                        f"{self.base_url}/api/generate",
+                        json=payload,
+                        headers=_trace_headers(),
+                    )
+                    response.raise_for_status()
+                    data = response.json()
+                    text = data["response"]
+            except httpx.TimeoutException as e:
+                if timeout < self.timeout:
+                    raise DeadlineExceededError(f"Request deadline exceeded: {str(e)}")
+                raise LLMServiceError(f"LLM service timeout: {str(e)}")
+            except (httpx.ConnectError, httpx.RequestError) as e:
+                raise LLMServiceError(f"Failed to connect to LLM service: {str(e)}")
+            except Exception as e:
+                raise LLMServiceError(f"LLM service error: {str(e)}")
+
+        self._finish_generate(
+            data, session_id, history_turns, context is not None, outcome
+        )
+        return text
+
+    async def generate_stream(
+        self,
+        prompt: str,
+        *,
+        session_id: str | None = None,
+        turn_prompt: str | None = None,
+        history_turns: int = 0,
+        deadline: float | None = None,
+        outcome: GenerationOutcome | None = None,
+    ) -> AsyncIterator[str]:
+        """
+        Generate a response from Ollama, yielding text chunks as they arrive
+
+        Takes the same arguments and raises the same errors as `generate`;
+        `outcome` is filled in once the final chunk has been read.
+        """
+        payload, timeout, context = self._generate_request(
+            prompt,
+            session_id,
+            turn_prompt,
+            history_turns,
+            deadline,
+            stream=True,
+            outcome=outcome,
+        )
+
+        with span(
+            "llm.generate",
+            KIND_CLIENT,
+            **{
+                "llm.model": self.model_name,
+                "llm.base_url": self.base_url,
+                "llm.prompt_chars": len(payload["prompt"]),
+                "llm.context_reuse": context is not None,
+                "llm.stream": True,
+            },
+        ):
+            data: dict = {}
+            try:
+                async with httpx.AsyncClient(timeout=timeout) as client:
+                    async with client.stream(
+                        "POST",
+                        f"{self.base_url}/api/generate",
+                        json=payload,
+                        headers=_trace_headers(),
+                    ) as response:
+                        response.raise_for_status()
+                        async for line in response.aiter_lines():
+                            if not line:
+                                continue
+                            data = json.loads(line)
+                            if "error" in data:
+                                raise LLMServiceError(data["error"])
+                            if data.get("response"):
+                                yield data["response"]
+            except httpx.TimeoutException as e:
+                if timeout < self.timeout:
+                    raise DeadlineExceededError(f"Request deadline exceeded: {str(e)}")
+                raise LLMServiceError(f"LLM service timeout: {str(e)}")
+            except (httpx.ConnectError, httpx.RequestError) as e:
+                raise LLMServiceError(f"Failed to connect to LLM service: {str(e)}")
+            except LLMServiceError:
+                raise
+            except Exception as e:
+                raise LLMServiceError(f"LLM service error: {str(e)}")
+
+        # The final line carries the KV context, done_reason and counters
+        self._finish_generate(
+            data, session_id, history_turns, context is not None, outcome
+        )
+
+    def _finish_generate(
+        self,
+        data: dict,
+        session_id: str | None,
+        history_turns: int,
+        reused: bool,
+        outcome: GenerationOutcome | None,
+    ) -> None:
+        if self.context_cache is not None and session_id:
+            if isinstance(data.get("context"), list):
+                self.context_cache.put(
+                    session_id, self.model_name, data["context"], history_turns + 1
+                )
+            else:
+                self.context_cache.discard(session_id)
+        self._record_prompt_eval(data, reused=reused)
+
+        done_reason = data.get("done_reason")
+        if done_reason == "length":
+            metrics.incr("llm.generate.truncated")
+        if outcome is not None:
+            outcome.done_reason = done_reason
+
+    async def warm_up(self) -> None:
+        """Load the model into Ollama's memory (a generate call without prompt)"""
         try:
             async with httpx.AsyncClient(timeout=self.timeout) as client:
                 response = await client.post(
-                    f"{self.base_url}/api/generate",
-                    json={
-                        "model": self.model_name,
-                        "prompt": prompt,
-                        "stream": False
-                    }
+                    f"{self.base_url}/api/generate", json={"model": self.model_name}
+                )
+                response.raise_for_status()
+        except httpx.HTTPError as e:
+            raise LLMServiceError(f"Model warm-up failed: {str(e)}")
+
+    async def embed(
+        self, texts: list[str], *, deadline: float | None = None
+    ) -> list[list[float]]:
+        """
+        Embed texts with Ollama's embedding model
+
+        Args:
+            texts: Texts to embed (sent as one /api/embed call)
+            deadline: `time.monotonic()` bounding the HTTP timeout
+
+        Returns:
+            One vector per input text, in order
+        """
+        timeout = self.timeout
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise DeadlineExceededError("Request deadline exceeded before embedding")
+            timeout = min(timeout, remaining)
+
+        try:
+            async with httpx.AsyncClient(timeout=timeout) as client:
+                response = await client.post(
+                    f"{self.base_url}/api/embed",
+                    json={"model": self.embedding_model, "input": texts},
+                    headers=_trace_headers(),
                 )
                 response.raise_for_status()
-                return response.json()["response"]
+                embeddings = response.json()["embeddings"]
         except httpx.TimeoutException as e:
-            raise LLMServiceError(f"LLM service timeout: {str(e)}")
+            raise LLMServiceError(f"Embedding timeout: {str(e)}")
         except (httpx.ConnectError, httpx.RequestError) as e:
             raise LLMServiceError(f"Failed to connect to LLM service: {str(e)}")
         except Exception as e:
-            raise LLMServiceError(f"LLM service error: {str(e)}")
+            raise LLMServiceError(f"Embedding error: {str(e)}")
+
+        if not isinstance(embeddings, list) or len(embeddings) != len(texts):
+            raise LLMServiceError("Embedding response does not match input count")
+        return embeddings
+
+    @staticmethod
+    def _record_prompt_eval(data: dict, reused: bool) -> None:
+        """Record Ollama's prompt evaluation cost, split by context reuse"""
+        duration_ns = data.get("prompt_eval_duration")
+        if not isinstance(duration_ns, (int, float)):
+            return
+        kind = "context_reuse" if reused else "full_prompt"
+        metrics.incr(f"llm.generate.{kind}")
+        metrics.observe(f"llm.prompt_eval_ms.{kind}", duration_ns / 1e6)
+        if isinstance(data.get("prompt_eval_count"), (int, float)):
+            metrics.observe(f"llm.prompt_eval_tokens.{kind}", data["prompt_eval_count"])
+
+
+def _backend_service(settings: Settings) -> LLMService:
+    """Ollama backend(s) as one service, hedged when secondaries are configured"""
+    context_cache = get_session_context_cache()
+    backends = [
+        OllamaService(
+            base_url=url,
+            model_name=settings.model_name,
+            embedding_model=settings.embedding_model,
+            context_cache=context_cache,
+            timeout=settings.request_timeout_max_seconds,
+            min_budget=settings.llm_min_budget_seconds,
+            tokens_per_second=settings.llm_tokens_per_second,
+            max_predict=settings.llm_max_predict,
+            min_predict=settings.llm_min_predict,
+            system_prompt=settings.system_prompt,
+        )
+        for url in [settings.ollama_url, *settings.ollama_hedge_urls]
+    ]
+    if len(backends) == 1:
+        return backends[0]
+    trackers, budget = get_hedge_state()
+    return HedgedLLMService(
+        backends,
+        trackers,
+        budget,
+        percentile=settings.llm_hedge_percentile,
+        initial_delay=settings.llm_hedge_initial_delay_seconds,
+        context_cache=context_cache,
+    )
+
+
+@lru_cache
+def get_embedding_batcher() -> EmbeddingBatcher:
+    """Process-wide embedding batcher shared by every request's LLM service"""
+    settings = get_settings()
+    return EmbeddingBatcher(
+        _backend_service(settings).embed,
+        max_batch_size=settings.embed_batch_max_size,
+        max_wait=settings.embed_batch_max_wait_ms / 1000,
+    )
+
+
+def get_llm_service() -> LLMService:
+    """
+    Dependency injection factory for LLM service
+
+    With OLLAMA_HEDGE_URLS set, calls are hedged from OLLAMA_URL to those
+    backends; concurrent embedding calls are micro-batched (unless
+    EMBED_BATCH_MAX_SIZE=1); with RESPONSE_CACHE_ENABLED, repeated prompts
+    are answered from the persistent response cache.
+    """
+    settings = get_settings()
+    service = _backend_service(settings)
+    if settings.embed_batch_max_size > 1:
+        service = BatchedEmbeddingService(service, get_embedding_batcher())
+    if settings.response_cache_enabled:
+        service = CachedLLMService(
+            service,
+            get_response_cache(),
+            settings.model_name,
+            options={"max_predict": settings.llm_max_predict},
+        )
+    return service
 
 
-def get_llm_service() -> OllamaService:
-    """Dependency injection factory for LLM service"""
+async def warm_up_models() -> None:
+    """Load the chat model on every configured Ollama backend"""
     settings = get_settings()
-    return OllamaService(
-        base_url=settings.ollama_url,
-        model_name=settings.model_name
+    await asyncio.gather(
+        *(
+            OllamaService(
+                base_url=url,
+                model_name=settings.model_name,
+                timeout=settings.request_timeout_max_seconds,
+            ).warm_up()
+            for url in [settings.ollama_url, *settings.ollama_hedge_urls]
+        )
     )
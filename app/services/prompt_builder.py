@@ -0,0 +1,31 @@
+"""Prompt construction from conversation history"""
+
+from app.services.session_store import SessionHistory
+
+
+def format_turn(message: str) -> str:
+    """Render the newest user message as an open conversation turn"""
+    return f"User: {message}\nAssistant:"
+
+
+def build_prompt(message: str, history: SessionHistory | None = None) -> str:
+    """
+    Build the LLM prompt for a message in the context of a session
+
+    Args:
+        message: Validated user message
+        history: Session history (summary and recent turns)
+
+    Returns:
+        Prompt text; the bare message when there is no history
+    """
+    if history is None or (not history.turns and not history.summary):
+        return message
+
+    parts = []
+    if history.summary:
+        parts.append(f"Summary of the earlier conversation:\n{history.summary}\n")
+    for turn in history.turns:
+        parts.append(f"User: {turn.user}\nAssistant: {turn.assistant}")
+    parts.append(format_turn(message))
+    return "\n".join(parts)
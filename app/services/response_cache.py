@@ -0,0 +1,384 @@
+"""Persistent LLM response cache shared by workers and across restarts"""
+
+import asyncio
+import contextlib
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections.abc import AsyncIterator
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any
+
+from app.core.config import get_settings
+from app.core.metrics import metrics
+from app.services.generation import GenerationOutcome
+
+if TYPE_CHECKING:
+    from app.services.llm_service import LLMService
+
+
+def cache_key(model: str, prompt: str, options: dict[str, Any] | None = None) -> bytes:
+    """16-byte key for a generation: hash of model, prompt and options"""
+    material = json.dumps(
+        {"model": model, "prompt": prompt, "options": options or {}},
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.blake2b(material.encode(), digest_size=16).digest()
+
+
+def cache_fingerprint(model: str, system_prompt: str) -> str:
+    """Identifies the configuration cached answers were generated under"""
+    material = f"{model}\0{system_prompt}".encode()
+    return hashlib.blake2b(material, digest_size=16).hexdigest()
+
+
+class ResponseCache:
+    """
+    Disk-backed cache of generated answers
+
+    A SQLite database in WAL mode, so every uvicorn worker on the host
+    reads and writes the same entries and they survive deploys when the
+    file is on a volume. Entries older than `ttl_seconds` are misses. The
+    size cap is enforced by a compaction thread that also drops expired
+    rows, evicts least recently used ones and returns free pages to the
+    filesystem; it runs every `compact_interval` seconds, or sooner once a
+    tenth of the cap has been written. All entries are dropped when the
+    configuration fingerprint (model and system prompt) changes.
+
+    Methods block on SQLite; call them from a thread, not the event loop.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        fingerprint: str = "",
+        max_bytes: int = 64 * 1024 * 1024,
+        ttl_seconds: float = 7 * 24 * 3600,
+        compact_interval: float = 300.0,
+    ):
+        """
+        Initialize response cache
+
+        Args:
+            path: SQLite database file
+            fingerprint: Configuration fingerprint; a different stored one
+                invalidates the cache
+            max_bytes: Cap on the total size of cached answers
+            ttl_seconds: Age after which an entry no longer matches
+            compact_interval: Seconds between background compactions
+        """
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.compact_interval = compact_interval
+        self._path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5.0)
+        # Only takes effect on a new database (before the first table)
+        self._conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key BLOB PRIMARY KEY,
+                response TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created REAL NOT NULL,
+                last_used REAL NOT NULL
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS responses_last_used
+                ON responses (last_used);
+            CREATE TABLE IF NOT EXISTS meta (
+                name TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+            """
+        )
+        self._conn.commit()
+        self._invalidate_if_changed(fingerprint)
+
+        self._written = 0
+        self._wake = threading.Event()
+        self._stopped = False
+        self._thread: threading.Thread | None = None
+
+    def get(self, key: bytes) -> str | None:
+        """Return the cached answer for a key, or None on a miss"""
+        now = time.time()
+        try:
+            with self._lock, self._conn:
+                row = self._conn.execute(
+                    "SELECT response FROM responses WHERE key = ? AND created >= ?",
+                    (key, now - self.ttl_seconds),
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        "UPDATE responses SET last_used = ? WHERE key = ?", (now, key)
+                    )
+        except sqlite3.Error:
+            # A locked or broken cache is a miss, never a failed request
+            metrics.incr("response_cache.errors")
+            row = None
+
+        metrics.incr("response_cache.lookups")
+        if row is not None:
+            metrics.incr("response_cache.hits")
+        metrics.set_gauge(
+            "response_cache.hit_rate",
+            metrics.ratio("response_cache.hits", "response_cache.lookups"),
+        )
+        return row[0] if row is not None else None
+
+    def put(self, key: bytes, response: str) -> None:
+        """Cache an answer"""
+        size = len(response.encode())
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        try:
+            with self._lock, self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO responses "
+                    "(key, response, size, created, last_used) VALUES (?, ?, ?, ?, ?)",
+                    (key, response, size, now, now),
+                )
+        except sqlite3.Error:
+            metrics.incr("response_cache.errors")
+            return
+
+        self._start_compactor()
+        self._written += size
+        if self._written > self.max_bytes // 10:
+            self._wake.set()
+
+    def compact(self) -> int:
+        """
+        Drop expired entries, evict least recently used ones down to the
+        size cap, and return free pages to the filesystem
+
+        Returns:
+            Number of entries removed
+        """
+        now = time.time()
+        with self._lock:
+            with self._conn:
+                removed = self._conn.execute(
+                    "DELETE FROM responses WHERE created < ?",
+                    (now - self.ttl_seconds,),
+                ).rowcount
+                total = self._conn.execute(
+                    "SELECT COALESCE(SUM(size), 0) FROM responses"
+                ).fetchone()[0]
+                if total > self.max_bytes:
+                    evict = []
+                    for key, size in self._conn.execute(
+                        "SELECT key, size FROM responses ORDER BY last_used"
+                    ):
+                        evict.append((key,))
+                        total -= size
+                        if total <= self.max_bytes:
+                            break
+                    self._conn.executemany("DELETE FROM responses WHERE key = ?", evict)
+                    removed += len(evict)
+            self._written = 0
+
+        # Page-by-page work that lookups need not wait for, on its own
+        # connection so it does not hold the lock shared with get and put
+        with contextlib.closing(sqlite3.connect(self._path, timeout=5.0)) as conn:
+            # Frees one page per step, so it has to be read to the end
+            conn.execute("PRAGMA incremental_vacuum").fetchall()
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+        metrics.incr("response_cache.evicted", removed)
+        metrics.set_gauge("response_cache.bytes", total)
+        return removed
+
+    def clear(self) -> None:
+        """Drop all cached entries"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM responses")
+
+    def close(self) -> None:
+        """Stop the compaction thread and close the database"""
+        self._stopped = True
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        with self._lock:
+            self._conn.close()
+
+    def _invalidate_if_changed(self, fingerprint: str) -> None:
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT value FROM meta WHERE name = 'fingerprint'"
+            ).fetchone()
+            if row is not None and row[0] == fingerprint:
+                return
+            if row is not None:
+                self._conn.execute("DELETE FROM responses")
+                metrics.incr("response_cache.invalidations")
+            self._conn.execute(
+                "INSERT OR REPLACE INTO meta (name, value) VALUES ('fingerprint', ?)",
+                (fingerprint,),
+            )
+
+    def _start_compactor(self) -> None:
+        if self._thread is None and not self._stopped:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(
+                        target=self._run_compactor,
+                        name="response-cache-compactor",
+                        daemon=True,
+                    )
+                    self._thread.start()
+
+    def _run_compactor(self) -> None:
+        while True:
+            self._wake.wait(self.compact_interval)
+            self._wake.clear()
+            if self._stopped:
+                return
+            try:
+                self.compact()
+            except sqlite3.Error:
+                metrics.incr("response_cache.errors")
+
+
+class CachedLLMService:
+    """
+    LLM service answering repeated prompts from a ResponseCache
+
+    Only self-contained generations are cached. Follow-up turns depend on
+    the session's KV context, so they always go to the wrapped service,
+    and answers that did not end on their own (see GenerationOutcome) are
+    served once and not stored.
+    """
+
+    def __init__(
+        self,
+        inner: "LLMService",
+        cache: ResponseCache,
+        model: str,
+        options: dict[str, Any] | None = None,
+    ):
+        """
+        Initialize cached service
+
+        Args:
+            inner: Service generating on a miss
+            cache: Persistent response cache
+            model: Model name, part of every key
+            options: Generation options that change answers, part of every key
+        """
+        self.inner = inner
+        self.cache = cache
+        self.model = model
+        self.options = options or {}
+
+    async def generate(
+        self,
+        prompt: str,
+        *,
+        session_id: str | None = None,
+        turn_prompt: str | None = None,
+        history_turns: int = 0,
+        deadline: float | None = None,
+        outcome: GenerationOutcome | None = None,
+    ) -> str:
+        """Return the cached answer, or generate and cache one"""
+        if turn_prompt is not None:
+            return await self.inner.generate(
+                prompt,
+                session_id=session_id,
+                turn_prompt=turn_prompt,
+                history_turns=history_turns,
+                deadline=deadline,
+                outcome=outcome,
+            )
+        key = cache_key(self.model, prompt, self.options)
+        cached = await asyncio.to_thread(self.cache.get, key)
+        if cached is not None:
+            _mark_complete(outcome)
+            return cached
+        outcome = outcome if outcome is not None else GenerationOutcome()
+        text = await self.inner.generate(
+            prompt, session_id=session_id, deadline=deadline, outcome=outcome
+        )
+        await self._store(key, text, outcome)
+        return text
+
+    async def generate_stream(
+        self,
+        prompt: str,
+        *,
+        session_id: str | None = None,
+        turn_prompt: str | None = None,
+        history_turns: int = 0,
+        deadline: float | None = None,
+        outcome: GenerationOutcome | None = None,
+    ) -> AsyncIterator[str]:
+        """Stream the cached answer as one chunk, or stream and cache a new one"""
+        if turn_prompt is not None:
+            async for chunk in self.inner.generate_stream(
+                prompt,
+                session_id=session_id,
+                turn_prompt=turn_prompt,
+                history_turns=history_turns,
+                deadline=deadline,
+                outcome=outcome,
+            ):
+                yield chunk
+            return
+
+        key = cache_key(self.model, prompt, self.options)
+        cached = await asyncio.to_thread(self.cache.get, key)
+        if cached is not None:
+            _mark_complete(outcome)
+            yield cached
+            return
+        outcome = outcome if outcome is not None else GenerationOutcome()
+        chunks = []
+        async for chunk in self.inner.generate_stream(
+            prompt, session_id=session_id, deadline=deadline, outcome=outcome
+        ):
+            chunks.append(chunk)
+            yield chunk
+        await self._store(key, "".join(chunks), outcome)
+
+    async def embed(
+        self, texts: list[str], *, deadline: float | None = None
+    ) -> list[list[float]]:
+        return await self.inner.embed(texts, deadline=deadline)
+
+    async def _store(self, key: bytes, text: str, outcome: GenerationOutcome) -> None:
+        # An answer cut off by num_predict, or by a budget sized to one
+        # request's deadline, would be replayed to requests that had time
+        # for all of it
+        if not outcome.complete:
+            metrics.incr("response_cache.skipped_incomplete")
+            return
+        await asyncio.to_thread(self.cache.put, key, text)
+
+
+def _mark_complete(outcome: GenerationOutcome | None) -> None:
+    # Only complete answers are stored, so a hit is one
+    if outcome is not None:
+        outcome.done_reason = "stop"
+
+
+@lru_cache
+def get_response_cache() -> ResponseCache:
+    """Dependency injection factory for the persistent response cache"""
+    settings = get_settings()
+    return ResponseCache(
+        settings.response_cache_path,
+        fingerprint=cache_fingerprint(settings.model_name, settings.system_prompt),
+        max_bytes=int(settings.response_cache_max_mb * 1024 * 1024),
+        ttl_seconds=settings.response_cache_ttl_seconds,
+        compact_interval=settings.response_cache_compact_interval_seconds,
+    )
@@ -0,0 +1,237 @@
+"""Fair scheduling of LLM generations across clients and priority lanes"""
+
+import asyncio
+import heapq
+import itertools
+import time
+from contextlib import asynccontextmanager
+from collections.abc import AsyncIterator
+from dataclasses import dataclass, field
+from enum import IntEnum
+from functools import lru_cache
+
+from app.core.config import get_settings
+from app.core.exceptions import DeadlineExceededError
+from app.core.metrics import metrics
+from app.core.profiling import phase
+from app.services.concurrency import AdaptiveLimit
+from app.services.llm_service import LLMServiceError
+
+
+# Clients whose tags are behind the virtual time are pruned past this size
+_MAX_TRACKED_CLIENTS = 10_000
+
+
+class Lane(IntEnum):
+    """Priority lanes; lower value is served first"""
+
+    INTERACTIVE = 0
+    BATCH = 1
+
+
+@dataclass(order=True, slots=True)
+class _Ticket:
+    finish: float
+    seq: int
+    start: float = field(compare=False)
+    waiter: asyncio.Future = field(compare=False)
+
+
+@dataclass(slots=True)
+class _LaneQueue:
+    heap: list[_Ticket] = field(default_factory=list)
+    virtual_time: float = 0.0
+    # Finish tag of each client's last queued request
+    finish_tags: dict[str, float] = field(default_factory=dict)
+    in_flight: int = 0
+
+
+class FairScheduler:
+    """
+    Weighted fair queuing in front of the LLM backend
+
+    Within a lane, each request gets a virtual finish tag
+    ``max(lane virtual time, client's previous tag) + 1 / weight`` and
+    requests are dispatched in tag order, so a client that floods the queue
+    only delays its own later requests. Lanes are served strictly by
+    priority; the batch lane may additionally hold at most ``batch_share`` of
+    the slots so interactive traffic always finds capacity quickly.
+
+    With an AdaptiveLimit, ``limit`` is retuned after every completed call
+    from the time the call held its slot. Only LLMServiceError (timeouts,
+    5xx, refused connections) counts as a drop; calls ending in a deadline,
+    validation error or cancellation are not sampled, since they say nothing
+    about backend capacity.
+    """
+
+    def __init__(
+        self,
+        limit: int = 4,
+        batch_share: float = 0.5,
+        client_weights: dict[str, float] | None = None,
+        adaptive: AdaptiveLimit | None = None,
+    ):
+        """
+        Initialize scheduler
+
+        Args:
+            limit: Maximum concurrent generations across all lanes
+            batch_share: Fraction of `limit` the batch lane may occupy
+            client_weights: Per-client weights (default 1.0); a client with
+                weight 2 gets twice the share of a default client
+            adaptive: Adaptive limit that replaces the fixed `limit`
+        """
+        self.adaptive = adaptive
+        self.limit = adaptive.limit if adaptive is not None else limit
+        self.batch_share = batch_share
+        self.client_weights = client_weights or {}
+        self._lanes = {lane: _LaneQueue() for lane in Lane}
+        self._seq = itertools.count()
+
+    @property
+    def in_flight(self) -> int:
+        return sum(queue.in_flight for queue in self._lanes.values())
+
+    def queued(self, lane: Lane | None = None) -> int:
+        """Number of waiting requests (optionally for one lane)"""
+        lanes = [self._lanes[lane]] if lane is not None else self._lanes.values()
+        return sum(
+            1 for queue in lanes for ticket in queue.heap if not ticket.waiter.done()
+        )
+
+    @asynccontextmanager
+    async def slot(
+        self,
+        client_key: str,
+        lane: Lane = Lane.INTERACTIVE,
+        deadline: float | None = None,
+    ) -> AsyncIterator[None]:
+        """
+        Hold one generation slot for the duration of the block
+
+        Args:
+            client_key: Client identity used for fairness (IP or API key)
+            lane: Priority lane of the request
+            deadline: `time.monotonic()` after which waiting is pointless
+
+        Raises:
+            DeadlineExceededError: If the deadline passes while queued
+        """
+        with phase("scheduler.wait"):
+            await self.acquire(client_key, lane, deadline)
+        in_flight = self.in_flight
+        started = time.monotonic()
+        dropped = False
+        try:
+            yield
+        except LLMServiceError:
+            dropped = True
+            raise
+        except BaseException:
+            # Client deadline, invalid input or disconnect: not a backend signal
+            started = None
+            raise
+        finally:
+            if self.adaptive is not None and started is not None:
+                self.limit = self.adaptive.on_sample(
+                    time.monotonic() - started, in_flight, dropped
+                )
+            self.release(lane)
+
+    async def acquire(
+        self,
+        client_key: str,
+        lane: Lane = Lane.INTERACTIVE,
+        deadline: float | None = None,
+    ) -> None:
+        """Wait until the request is scheduled (or its deadline passes)"""
+        queue = self._lanes[lane]
+        weight = self.client_weights.get(client_key, 1.0)
+        start = max(queue.virtual_time, queue.finish_tags.get(client_key, 0.0))
+        finish = start + 1.0 / weight
+        queue.finish_tags[client_key] = finish
+
+        waiter = asyncio.get_running_loop().create_future()
+        heapq.heappush(queue.heap, _Ticket(finish, next(self._seq), start, waiter))
+        enqueued = time.monotonic()
+        self._dispatch()
+        try:
+            if deadline is None or waiter.done():
+                await waiter
+            else:
+                await asyncio.wait_for(waiter, deadline - time.monotonic())
+        except asyncio.TimeoutError:
+            if waiter.done() and not waiter.cancelled():
+                # Granted in the same loop iteration as the timeout (wait_for
+                # on 3.12 still raises); the slot is ours, so give it back
+                self.release(lane)
+            else:
+                # wait_for cancelled the ticket, so dispatch will skip it
+                waiter.cancel()
+            metrics.incr(f"scheduler.deadline_dropped.{lane.name.lower()}")
+            raise DeadlineExceededError("Request deadline exceeded while queued")
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Slot was granted just before cancellation; give it back
+                self.release(lane)
+            else:
+                waiter.cancel()
+            raise
+        metrics.observe(
+            f"scheduler.wait_ms.{lane.name.lower()}",
+            (time.monotonic() - enqueued) * 1000,
+        )
+
+    def release(self, lane: Lane = Lane.INTERACTIVE) -> None:
+        """Free a slot held in `lane` and dispatch waiting requests"""
+        self._lanes[lane].in_flight -= 1
+        self._dispatch()
+
+    def _lane_capacity(self, lane: Lane) -> int:
+        if lane is Lane.BATCH:
+            return max(1, int(self.limit * self.batch_share))
+        return self.limit
+
+    def _dispatch(self) -> None:
+        for lane in Lane:
+            queue = self._lanes[lane]
+            while (
+                queue.heap
+                and self.in_flight < self.limit
+                and queue.in_flight < self._lane_capacity(lane)
+            ):
+                ticket = heapq.heappop(queue.heap)
+                if ticket.waiter.done():
+                    continue  # Cancelled while waiting
+                queue.virtual_time = max(queue.virtual_time, ticket.start)
+                queue.in_flight += 1
+                ticket.waiter.set_result(None)
+            if not queue.heap:
+                # Idle lane: tags of past requests give no advantage any more
+                queue.finish_tags.clear()
+            elif len(queue.finish_tags) > _MAX_TRACKED_CLIENTS:
+                queue.finish_tags = {
+                    key: tag
+                    for key, tag in queue.finish_tags.items()
+                    if tag > queue.virtual_time
+                }
+        metrics.set_gauge("scheduler.in_flight", self.in_flight)
+
+
+@lru_cache
+def get_scheduler() -> FairScheduler:
+    """Dependency injection factory for the shared LLM scheduler"""
+    settings = get_settings()
+    adaptive = None
+    if settings.llm_adaptive_concurrency:
+        adaptive = AdaptiveLimit(
+            initial=settings.llm_max_concurrency,
+            min_limit=settings.llm_concurrency_min,
+            max_limit=settings.llm_concurrency_max,
+        )
+    return FairScheduler(
+        limit=settings.llm_max_concurrency,
+        batch_share=settings.scheduler_batch_share,
+        client_weights=settings.scheduler_client_weights,
+        adaptive=adaptive,
+    )
@@ -0,0 +1,157 @@
+"""Semantic answer cache using nearest-neighbour search on prompt embeddings"""
+
+import time
+from functools import lru_cache
+from typing import TYPE_CHECKING
+
+from app.core.config import get_settings
+from app.core.metrics import metrics
+
+if TYPE_CHECKING:
+    import numpy as np
+
+
+def _numpy():
+    # numpy is only imported once the (optional) cache is built
+    import numpy
+
+    return numpy
+
+
+class SemanticCache:
+    """
+    Bounded cache of answers keyed by prompt embedding
+
+    Cached prompt vectors are L2-normalised rows of one preallocated float32
+    matrix, so a lookup is a single matrix-vector product (cosine similarity
+    against every row) followed by an argmax. When the matrix is full, an
+    expired row is reused if there is one, otherwise the least recently
+    used row.
+    """
+
+    def __init__(
+        self,
+        capacity: int = 2048,
+        threshold: float = 0.92,
+        ttl_seconds: float = 3600,
+    ):
+        """
+        Initialize semantic cache
+
+        Args:
+            capacity: Maximum number of cached prompts (matrix rows)
+            threshold: Minimum cosine similarity for a hit
+            ttl_seconds: Age after which a row no longer matches
+        """
+        np = _numpy()
+
+        self.capacity = capacity
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self._vectors: np.ndarray | None = None  # allocated on first add
+        self._answers: list[str | None] = [None] * capacity
+        self._inserted = np.full(capacity, -np.inf)
+        self._last_used = np.full(capacity, -np.inf)
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def lookup(self, vector: list[float]) -> str | None:
+        """
+        Return the answer cached for the most similar prompt
+
+        Args:
+            vector: Embedding of the incoming prompt
+
+        Returns:
+            Cached answer, or None if no live row reaches the threshold
+        """
+        answer = self._lookup(vector)
+        metrics.incr("semantic_cache.lookups")
+        if answer is not None:
+            metrics.incr("semantic_cache.hits")
+        metrics.set_gauge(
+            "semantic_cache.hit_rate",
+            metrics.ratio("semantic_cache.hits", "semantic_cache.lookups"),
+        )
+        return answer
+
+    def add(self, vector: list[float], answer: str) -> None:
+        """Cache the answer generated for a prompt embedding"""
+        np = _numpy()
+
+        query = self._normalise(vector)
+        if query is None:
+            return
+        if self._vectors is None:
+            self._vectors = np.zeros((self.capacity, query.shape[0]), dtype=np.float32)
+        elif query.shape[0] != self._vectors.shape[1]:
+            # Embedding model changed; start over with the new dimension
+            self.clear()
+            self._vectors = np.zeros((self.capacity, query.shape[0]), dtype=np.float32)
+
+        now = time.monotonic()
+        if self._size < self.capacity:
+            row = self._size
+            self._size += 1
+        else:
+            expired = np.flatnonzero(self._inserted < now - self.ttl_seconds)
+            row = int(expired[0]) if expired.size else int(np.argmin(self._last_used))
+
+        self._vectors[row] = query
+        self._answers[row] = answer
+        self._inserted[row] = now
+        self._last_used[row] = now
+        metrics.set_gauge("semantic_cache.size", self._size)
+
+    def clear(self) -> None:
+        """Drop all cached rows"""
+        np = _numpy()
+
+        self._vectors = None
+        self._answers = [None] * self.capacity
+        self._inserted.fill(-np.inf)
+        self._last_used.fill(-np.inf)
+        self._size = 0
+
+    def _lookup(self, vector: list[float]) -> str | None:
+        np = _numpy()
+
+        if self._vectors is None or self._size == 0:
+            return None
+        query = self._normalise(vector)
+        if query is None or query.shape[0] != self._vectors.shape[1]:
+            return None
+
+        now = time.monotonic()
+        similarities = self._vectors[: self._size] @ query
+        similarities[self._inserted[: self._size] < now - self.ttl_seconds] = -np.inf
+        row = int(np.argmax(similarities))
+        if similarities[row] < self.threshold:
+            return None
+        self._last_used[row] = now
+        return self._answers[row]
+
+    @staticmethod
+    def _normalise(vector: list[float]) -> "np.ndarray | None":
+        np = _numpy()
+
+        query = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if query.ndim != 1 or norm == 0:
+            return None
+        return query / norm
+
+
+@lru_cache
+def get_semantic_cache() -> SemanticCache | None:
+    """Dependency injection factory for the semantic cache (None when disabled)"""
+    settings = get_settings()
+    if not settings.semantic_cache_enabled:
+        return None
+    return SemanticCache(
+        capacity=settings.semantic_cache_capacity,
+        threshold=settings.semantic_cache_threshold,
+        ttl_seconds=settings.semantic_cache_ttl_seconds,
+    )
@@ -0,0 +1,379 @@
+"""Conversation session stores with bounded per-session history"""
+
+import asyncio
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Protocol
+
+from app.core.config import get_settings
+
+
+@dataclass(frozen=True, slots=True)
+class Turn:
+    """One user/assistant exchange"""
+
+    user: str
+    assistant: str
+
+    def __len__(self) -> int:
+        return len(self.user) + len(self.assistant)
+
+
+@dataclass(slots=True)
+class SessionHistory:
+    """Recent turns of a session plus a summary of older ones"""
+
+    turns: list[Turn] = field(default_factory=list)
+    summary: str = ""
+
+
+class SessionStore(Protocol):
+    """Protocol for session store implementations"""
+
+    async def get_history(self, session_id: str) -> SessionHistory:
+        """Return the stored history (empty if the session is unknown)"""
+        ...
+
+    async def append_turn(self, session_id: str, turn: Turn) -> None:
+        """Record a completed turn"""
+        ...
+
+    async def delete(self, session_id: str) -> None:
+        """Forget a session"""
+        ...
+
+
+def new_session_id() -> str:
+    """Generate an opaque session identifier"""
+    return uuid.uuid4().hex
+
+
+def summarize_turn(summary: str, turn: Turn, max_chars: int) -> str:
+    """
+    Fold a turn that fell out of the ring buffer into the running summary
+
+    Extractive and cheap: keeps the question and the first sentence of the
+    answer, and trims the oldest part of the summary to stay within max_chars.
+
+    Args:
+        summary: Current summary text
+        turn: Turn being evicted from the recent history
+        max_chars: Maximum summary length (0 disables summarisation)
+
+    Returns:
+        Updated summary
+    """
+    if max_chars <= 0:
+        return ""
+
+    answer = turn.assistant.split("\n", 1)[0]
+    end = answer.find(". ")
+    if end != -1:
+        answer = answer[: end + 1]
+    line = f"- User asked: {turn.user} / Answer: {answer}"
+
+    combined = f"{summary}\n{line}" if summary else line
+    if len(combined) > max_chars:
+        combined = combined[-max_chars:]
+        # Drop the partial first line left by the cut
+        newline = combined.find("\n")
+        if newline != -1:
+            combined = combined[newline + 1:]
+    return combined
+
+
+@dataclass(slots=True)
+class _Session:
+    turns: deque
+    summary: str = ""
+    chars: int = 0
+    last_access: float = 0.0
+
+
+class InMemorySessionStore:
+    """
+    Per-process session store
+
+    Runs entirely on the event loop, so operations never interleave. Each
+    session keeps a ring buffer of its last ``max_turns`` turns. Sessions
+    are kept in LRU order so idle sessions (older than ``ttl_seconds``) and,
+    when the global ``max_total_chars`` budget is exceeded, the least recently
+    used sessions are evicted from the front in O(1) per session.
+    """
+
+    def __init__(
+        self,
+        max_turns: int = 10,
+        ttl_seconds: float = 1800,
+        max_total_chars: int = 2_000_000,
+        summary_max_chars: int = 1000,
+    ):
+        """
+        Initialize session store
+
+        Args:
+            max_turns: Turns kept verbatim per session
+            ttl_seconds: Idle time after which a session is evicted
+            max_total_chars: Global cap on stored characters across sessions
+            summary_max_chars: Summary length per session (0 disables)
+        """
+        if max_turns < 1:
+            raise ValueError("max_turns must be at least 1")
+        self.max_turns = max_turns
+        self.ttl_seconds = ttl_seconds
+        self.max_total_chars = max_total_chars
+        self.summary_max_chars = summary_max_chars
+        self.total_chars = 0
+        self._sessions: OrderedDict[str, _Session] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    async def get_history(self, session_id: str) -> SessionHistory:
+        """Return recent turns and summary for a session"""
+        self._evict_expired(time.monotonic())
+        session = self._sessions.get(session_id)
+        if session is None:
+            return SessionHistory()
+        return SessionHistory(turns=list(session.turns), summary=session.summary)
+
+    async def append_turn(self, session_id: str, turn: Turn) -> None:
+        """Append a turn, summarising and evicting as needed"""
+        now = time.monotonic()
+        self._evict_expired(now)
+
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = _Session(turns=deque(maxlen=self.max_turns))
+            self._sessions[session_id] = session
+        else:
+            self._sessions.move_to_end(session_id)
+        session.last_access = now
+
+        if len(session.turns) == session.turns.maxlen:
+            evicted = session.turns[0]
+            self._resize(session, -len(evicted))
+            self._set_summary(
+                session,
+                summarize_turn(session.summary, evicted, self.summary_max_chars),
+            )
+        session.turns.append(turn)
+        self._resize(session, len(turn))
+
+        # Enforce the global budget, never evicting the session just written
+        while self.total_chars > self.max_total_chars and len(self._sessions) > 1:
+            _, oldest = self._sessions.popitem(last=False)
+            self.total_chars -= oldest.chars
+
+    async def delete(self, session_id: str) -> None:
+        """Forget a session"""
+        session = self._sessions.pop(session_id, None)
+        if session is not None:
+            self.total_chars -= session.chars
+
+    def _set_summary(self, session: _Session, summary: str) -> None:
+        self._resize(session, len(summary) - len(session.summary))
+        session.summary = summary
+
+    def _resize(self, session: _Session, delta: int) -> None:
+        session.chars += delta
+        self.total_chars += delta
+
+    def _evict_expired(self, now: float) -> None:
+        cutoff = now - self.ttl_seconds
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if session.last_access >= cutoff:
+                break
+            del self._sessions[session_id]
+            self.total_chars -= session.chars
+
+
+class SQLiteSessionStore:
+    """
+    Session store shared by all workers on a host
+
+    Backed by a SQLite database in WAL mode so uvicorn workers can read
+    concurrently while one writes. Applies the same ring-buffer, TTL and
+    global size rules as InMemorySessionStore. Queries run in a worker
+    thread so a busy database never blocks the event loop.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_turns: int = 10,
+        ttl_seconds: float = 1800,
+        max_total_chars: int = 2_000_000,
+        summary_max_chars: int = 1000,
+    ):
+        """
+        Initialize session store
+
+        Args:
+            path: SQLite database file
+            max_turns: Turns kept verbatim per session
+            ttl_seconds: Idle time after which a session is evicted
+            max_total_chars: Global cap on stored characters across sessions
+            summary_max_chars: Summary length per session (0 disables)
+        """
+        if max_turns < 1:
+            raise ValueError("max_turns must be at least 1")
+        self.max_turns = max_turns
+        self.ttl_seconds = ttl_seconds
+        self.max_total_chars = max_total_chars
+        self.summary_max_chars = summary_max_chars
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS sessions (
+                id TEXT PRIMARY KEY,
+                summary TEXT NOT NULL DEFAULT '',
+                chars INTEGER NOT NULL DEFAULT 0,
+                last_access REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS sessions_last_access
+                ON sessions (last_access);
+            CREATE TABLE IF NOT EXISTS turns (
+                session_id TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                user TEXT NOT NULL,
+                assistant TEXT NOT NULL,
+                PRIMARY KEY (session_id, seq)
+            );
+            """
+        )
+        self._conn.commit()
+
+    async def get_history(self, session_id: str) -> SessionHistory:
+        """Return recent turns and summary for a session"""
+        return await asyncio.to_thread(self._get_history, session_id)
+
+    async def append_turn(self, session_id: str, turn: Turn) -> None:
+        """Append a turn, summarising and evicting as needed"""
+        await asyncio.to_thread(self._append_turn, session_id, turn)
+
+    async def delete(self, session_id: str) -> None:
+        """Forget a session"""
+        await asyncio.to_thread(self._delete, session_id)
+
+    def _get_history(self, session_id: str) -> SessionHistory:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT summary, last_access FROM sessions WHERE id = ?",
+                (session_id,),
+            ).fetchone()
+            if row is None or row[1] < time.time() - self.ttl_seconds:
+                return SessionHistory()
+            turns = [
+                Turn(user, assistant)
+                for user, assistant in self._conn.execute(
+                    "SELECT user, assistant FROM turns "
+                    "WHERE session_id = ? ORDER BY seq",
+                    (session_id,),
+                )
+            ]
+            return SessionHistory(turns=turns, summary=row[0])
+
+    def _append_turn(self, session_id: str, turn: Turn) -> None:
+        now = time.time()
+        with self._lock, self._conn:
+            conn = self._conn
+            conn.execute(
+                "DELETE FROM turns WHERE session_id IN "
+                "(SELECT id FROM sessions WHERE last_access < ?)",
+                (now - self.ttl_seconds,),
+            )
+            conn.execute(
+                "DELETE FROM sessions WHERE last_access < ?",
+                (now - self.ttl_seconds,),
+            )
+
+            row = conn.execute(
+                "SELECT summary FROM sessions WHERE id = ?", (session_id,)
+            ).fetchone()
+            summary = row[0] if row else ""
+            next_seq = conn.execute(
+                "SELECT COALESCE(MAX(seq), 0) + 1 FROM turns WHERE session_id = ?",
+                (session_id,),
+            ).fetchone()[0]
+            conn.execute(
+                "INSERT INTO turns (session_id, seq, user, assistant) "
+                "VALUES (?, ?, ?, ?)",
+                (session_id, next_seq, turn.user, turn.assistant),
+            )
+
+            # Ring buffer: fold turns beyond max_turns into the summary
+            overflow = conn.execute(
+                "SELECT seq, user, assistant FROM turns "
+                "WHERE session_id = ? AND seq <= ? ORDER BY seq",
+                (session_id, next_seq - self.max_turns),
+            ).fetchall()
+            for _, user, assistant in overflow:
+                summary = summarize_turn(
+                    summary, Turn(user, assistant), self.summary_max_chars
+                )
+            if overflow:
+                conn.execute(
+                    "DELETE FROM turns WHERE session_id = ? AND seq <= ?",
+                    (session_id, overflow[-1][0]),
+                )
+
+            chars = conn.execute(
+                "SELECT COALESCE(SUM(LENGTH(user) + LENGTH(assistant)), 0) "
+                "FROM turns WHERE session_id = ?",
+                (session_id,),
+            ).fetchone()[0] + len(summary)
+            conn.execute(
+                "INSERT INTO sessions (id, summary, chars, last_access) "
+                "VALUES (?, ?, ?, ?) ON CONFLICT(id) DO UPDATE SET "
+                "summary = excluded.summary, chars = excluded.chars, "
+                "last_access = excluded.last_access",
+                (session_id, summary, chars, now),
+            )
+
+            self._enforce_budget(session_id)
+
+    def _delete(self, session_id: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM turns WHERE session_id = ?", (session_id,))
+            self._conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+
+    def _enforce_budget(self, current_id: str) -> None:
+        total = self._conn.execute(
+            "SELECT COALESCE(SUM(chars), 0) FROM sessions"
+        ).fetchone()[0]
+        if total <= self.max_total_chars:
+            return
+        for session_id, chars in self._conn.execute(
+            "SELECT id, chars FROM sessions WHERE id != ? ORDER BY last_access",
+            (current_id,),
+        ).fetchall():
+            self._conn.execute("DELETE FROM turns WHERE session_id = ?", (session_id,))
+            self._conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+            total -= chars
+            if total <= self.max_total_chars:
+                break
+
+
+@lru_cache
+def get_session_store() -> SessionStore:
+    """Dependency injection factory for the process-wide session store"""
+    settings = get_settings()
+    options = dict(
+        max_turns=settings.session_max_turns,
+        ttl_seconds=settings.session_ttl_seconds,
+        max_total_chars=settings.session_max_total_chars,
+        summary_max_chars=settings.session_summary_max_chars,
+    )
+    if settings.session_store_backend == "sqlite":
+        return SQLiteSessionStore(settings.session_store_path, **options)
+    return InMemorySessionStore(**options)
@@ -0,0 +1 @@
+"""Usecases - orchestration between routers and services"""
@@ -0,0 +1,308 @@
+"""Chat usecase - orchestrates guardrails, precomputed answers, sessions and the LLM"""
+
+import asyncio
+import time
+from collections.abc import AsyncIterator, Awaitable, Callable
+from dataclasses import dataclass
+
+from app.core.exceptions import (
+    DeadlineExceededError,
+    SessionNotFoundError,
+    ValidationError,
+)
+from app.core.guardrails import (
+    validate_input_async,
+    validate_inputs_async,
+    validate_output,
+)
+from app.core.metrics import metrics
+from app.core.profiling import phase
+from app.schemas.request import BatchChatRequest, ChatRequest
+from app.schemas.response import (
+    BatchChatItem,
+    BatchChatResponse,
+    BatchItemError,
+    ChatResponse,
+)
+from app.services.context_cache import ContextCache
+from app.services.faq import FAQTable
+from app.services.generation import GenerationOutcome
+from app.services.llm_service import LLMService, LLMServiceError
+from app.services.prompt_builder import build_prompt
+from app.services.scheduler import FairScheduler, Lane
+from app.services.semantic_cache import SemanticCache
+from app.services.session_store import SessionStore, Turn, new_session_id
+
+# Same per-message limit as ChatRequest.message
+BATCH_MESSAGE_MAX_LENGTH = 1000
+
+
+@dataclass(slots=True)
+class ChatPipeline:
+    """Services a chat message flows through, shared by all requests"""
+
+    llm_service: LLMService
+    scheduler: FairScheduler
+    session_store: SessionStore
+    semantic_cache: SemanticCache | None = None
+    faq: FAQTable | None = None
+    context_cache: ContextCache | None = None
+
+
+async def _precomputed_answer(
+    text: str, pipeline: ChatPipeline, deadline: float | None
+) -> tuple[str | None, list[float] | None]:
+    """
+    Look for an answer that needs no generation
+
+    Returns:
+        (answer, prompt embedding); the embedding is returned on a semantic
+        cache miss so the generated answer can be added under it
+    """
+    if pipeline.faq is not None:
+        answer = pipeline.faq.answer(text)
+        if answer is not None:
+            return answer, None
+
+    if pipeline.semantic_cache is None:
+        return None, None
+    try:
+        vector = (await pipeline.llm_service.embed([text], deadline=deadline))[0]
+    except (LLMServiceError, DeadlineExceededError):
+        # Embedding failures are a miss, never a failed request
+        metrics.incr("semantic_cache.errors")
+        return None, None
+    return pipeline.semantic_cache.lookup(vector), vector
+
+
+async def chat_usecase(
+    chat_request: ChatRequest,
+    request_id: str,
+    pipeline: ChatPipeline,
+    client_key: str,
+    deadline: float | None = None,
+    on_token: Callable[[str], Awaitable[None]] | None = None,
+) -> ChatResponse:
+    """
+    Answer one chat message within its session
+
+    - Validates input with guardrails
+    - Serves first turns from the FAQ table or the semantic cache when
+      possible
+    - Rejects a `session_id` the server did not issue (or that expired)
+    - Builds the prompt from the session history
+    - Calls LLM service (scheduled in the interactive lane)
+    - Validates the response and records the turn
+
+    With `on_token`, the answer is also passed on in chunks as it is
+    generated (a precomputed answer arrives as a single chunk).
+    """
+    session_id = chat_request.session_id or new_session_id()
+    session_store = pipeline.session_store
+
+    with phase("guardrails.input"):
+        validated_input = await validate_input_async(chat_request.message)
+    metrics.incr("chat.messages")
+
+    with phase("session.load"):
+        history = await session_store.get_history(session_id)
+    # Ids are only issued by the server: an unknown or expired one would
+    # otherwise start a session anyone choosing the same id could join
+    if chat_request.session_id is not None and not history.turns:
+        raise SessionNotFoundError(
+            "Unknown or expired session_id; omit it to start a new session"
+        )
+
+    # Follow-ups depend on the conversation, so only first turns are served
+    # without the LLM
+    vector = None
+    if not history.turns:
+        with phase("precomputed"):
+            answer, vector = await _precomputed_answer(
+                validated_input, pipeline, deadline
+            )
+        if answer is not None:
+            await session_store.append_turn(session_id, Turn(validated_input, answer))
+            # The session's KV context (if any) no longer matches its history
+            if pipeline.context_cache is not None:
+                pipeline.context_cache.discard(session_id)
+            if on_token is not None:
+                await on_token(answer)
+            return ChatResponse(
+                response=answer, request_id=request_id, session_id=session_id
+            )
+
+    prompt = build_prompt(validated_input, history)
+
+    # With prior turns, Ollama can continue from the cached KV context and
+    # only needs the new message
+    outcome = GenerationOutcome()
+    async with pipeline.scheduler.slot(client_key, Lane.INTERACTIVE, deadline):
+        with phase("llm.generate"):
+            options = {
+                "session_id": session_id,
+                "turn_prompt": validated_input if history.turns else None,
+                "history_turns": len(history.turns),
+                "deadline": deadline,
+                "outcome": outcome,
+            }
+            if on_token is None:
+                llm_response = await pipeline.llm_service.generate(prompt, **options)
+            else:
+                chunks = []
+                async for chunk in pipeline.llm_service.generate_stream(
+                    prompt, **options
+                ):
+                    chunks.append(chunk)
+                    await on_token(chunk)
+                llm_response = "".join(chunks)
+
+    with phase("guardrails.output"):
+        validated_output = validate_output(llm_response)
+
+    # Answers cut short (e.g. sized to a short deadline) are not reused
+    if vector is not None and outcome.complete:
+        pipeline.semantic_cache.add(vector, validated_output)
+    with phase("session.save"):
+        await session_store.append_turn(
+            session_id, Turn(validated_input, validated_output)
+        )
+
+    return ChatResponse(
+        response=validated_output,
+        request_id=request_id,
+        session_id=session_id,
+    )
+
+
+def _item_deadline(deadline: float | None, item_timeout: float | None) -> float | None:
+    """Deadline of one batch item starting now, within the batch's own"""
+    if item_timeout is None:
+        return deadline
+    item_deadline = time.monotonic() + item_timeout
+    return item_deadline if deadline is None else min(deadline, item_deadline)
+
+
+async def _answer(
+    prompt: str,
+    pipeline: ChatPipeline,
+    client_key: str,
+    deadline: float | None,
+    item_timeout: float | None = None,
+) -> str:
+    answer, vector = await _precomputed_answer(
+        prompt, pipeline, _item_deadline(deadline, item_timeout)
+    )
+    if answer is not None:
+        return answer
+    outcome = GenerationOutcome()
+    # Waiting for the batch lane is bounded by the batch's deadline; the
+    # item's own budget starts once it gets a slot
+    async with pipeline.scheduler.slot(client_key, Lane.BATCH, deadline):
+        llm_response = await pipeline.llm_service.generate(
+            prompt, deadline=_item_deadline(deadline, item_timeout), outcome=outcome
+        )
+    answer = validate_output(llm_response)
+    if vector is not None and outcome.complete:
+        pipeline.semantic_cache.add(vector, answer)
+    return answer
+
+
+def describe_error(error: Exception) -> BatchItemError:
+    """Error code and client-safe message for a failed message"""
+    if isinstance(error, ValidationError):
+        code = "validation_error"
+        message = str(error)
+    elif isinstance(error, DeadlineExceededError):
+        code = "deadline_exceeded"
+        message = str(error)
+    elif isinstance(error, SessionNotFoundError):
+        code = "session_not_found"
+        message = str(error)
+    elif isinstance(error, LLMServiceError):
+        code = "service_unavailable"
+        message = "LLM service is temporarily unavailable"
+    else:
+        code = "internal_server_error"
+        message = "An unexpected error occurred"
+    return BatchItemError(error=code, message=message)
+
+
+def _error_item(index: int, error: Exception) -> BatchChatItem:
+    return BatchChatItem(index=index, error=describe_error(error))
+
+
+async def iter_batch_chat(
+    batch_request: BatchChatRequest,
+    pipeline: ChatPipeline,
+    client_key: str,
+    deadline: float | None = None,
+    item_timeout: float | None = None,
+) -> AsyncIterator[BatchChatItem]:
+    """
+    Answer a batch of independent messages, yielding items as they complete
+
+    - Validates all messages in one guardrails pass (off the event loop for
+      large batches); invalid ones become per-item errors without an LLM call
+    - Identical prompts are generated once and fanned out to every index;
+      FAQ intents and paraphrases may be served without generation
+    - Generations run concurrently in the scheduler's batch lane
+    - `deadline` bounds the whole batch: items that cannot start before it
+      fail with deadline_exceeded. With `item_timeout`, each item also gets
+      that many seconds from the moment it starts, so a batch far larger
+      than the lane's capacity is not held to one interactive budget
+    """
+    validated = await validate_inputs_async(
+        batch_request.messages, max_length=BATCH_MESSAGE_MAX_LENGTH
+    )
+
+    indices_by_prompt: dict[str, list[int]] = {}
+    for index, result in enumerate(validated):
+        if isinstance(result, ValidationError):
+            yield _error_item(index, result)
+        else:
+            metrics.incr("chat.messages")
+            indices_by_prompt.setdefault(result, []).append(index)
+
+    tasks = {
+        asyncio.ensure_future(
+            _answer(prompt, pipeline, client_key, deadline, item_timeout)
+        ): indices
+        for prompt, indices in indices_by_prompt.items()
+    }
+    pending = set(tasks)
+    try:
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                error = task.exception()
+                for index in tasks[task]:
+                    if error is None:
+                        yield BatchChatItem(index=index, response=task.result())
+                    else:
+                        yield _error_item(index, error)
+    finally:
+        # Client went away or the generator was closed early
+        for task in pending:
+            task.cancel()
+
+
+async def batch_chat_usecase(
+    batch_request: BatchChatRequest,
+    request_id: str,
+    pipeline: ChatPipeline,
+    client_key: str,
+    deadline: float | None = None,
+    item_timeout: float | None = None,
+) -> BatchChatResponse:
+    """Answer a batch of messages and return all results in input order"""
+    results = [
+        item
+        async for item in iter_batch_chat(
+            batch_request, pipeline, client_key, deadline, item_timeout
+        )
+    ]
+    results.sort(key=lambda item: item.index)
+    return BatchChatResponse(results=results, request_id=request_id)
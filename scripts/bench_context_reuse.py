@@ -0,0 +1,71 @@
+"""
+Measure Ollama prompt evaluation time per turn with and without KV context reuse
+
+Requires a running Ollama (OLLAMA_URL / MODEL_NAME from settings).
+
+    python -m scripts.bench_context_reuse --turns 6
+"""
+
+import argparse
+import asyncio
+
+from app.core.config import get_settings
+from app.core.metrics import metrics
+from app.services.context_cache import ContextCache
+from app.services.llm_service import OllamaService
+from app.services.prompt_builder import build_prompt
+from app.services.session_store import InMemorySessionStore, Turn
+
+QUESTIONS = [
+    "Introduce yourself in two sentences.",
+    "Which projects have you built?",
+    "What was the hardest part of the first one?",
+    "Which technologies did you use there?",
+    "How would you improve it today?",
+    "What are you learning at the moment?",
+]
+
+
+def _prompt_eval_ms() -> float:
+    summaries = metrics.snapshot()["summaries"]
+    return sum(
+        summaries.get(f"llm.prompt_eval_ms.{kind}", {}).get("sum", 0.0)
+        for kind in ("full_prompt", "context_reuse")
+    )
+
+
+async def run_conversation(service: OllamaService, turns: int) -> list[float]:
+    """Run one conversation and return prompt eval milliseconds per turn"""
+    store = InMemorySessionStore(max_turns=turns)
+    timings = []
+    for i in range(turns):
+        message = QUESTIONS[i % len(QUESTIONS)]
+        history = await store.get_history("bench")
+        before = _prompt_eval_ms()
+        answer = await service.generate(
+            build_prompt(message, history),
+            session_id="bench",
+            turn_prompt=message if history.turns else None,
+            history_turns=len(history.turns),
+        )
+        timings.append(_prompt_eval_ms() - before)
+        await store.append_turn("bench", Turn(message, answer))
+    return timings
+
+
+async def main(turns: int) -> None:
+    settings = get_settings()
+    base = dict(base_url=settings.ollama_url, model_name=settings.model_name, timeout=300)
+    full = await run_conversation(OllamaService(**base), turns)
+    reuse = await run_conversation(OllamaService(**base, context_cache=ContextCache()), turns)
+
+    print(f"{'turn':>4} {'full prompt ms':>15} {'context reuse ms':>17} {'saved':>7}")
+    for n, (a, b) in enumerate(zip(full, reuse), start=1):
+        saved = (1 - b / a) * 100 if a else 0.0
+        print(f"{n:>4} {a:>15.1f} {b:>17.1f} {saved:>6.0f}%")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--turns", type=int, default=6)
+    asyncio.run(main(parser.parse_args().turns))
@@ -0,0 +1,80 @@
+"""
+Measure JSON serialization cost per chat request
+
+Compares FastAPI's default path for a returned ChatResponse (re-validate
+against response_model, then encode) with FastJSONResponse, and stdlib
+json.dumps with the fast serializer for one structured log record.
+
+    python -m scripts.bench_serialization --answer-chars 1500
+"""
+
+import argparse
+import json
+import logging
+import timeit
+
+from fastapi.encoders import jsonable_encoder
+from starlette.responses import JSONResponse
+
+from app.core.logging import JsonFormatter
+from app.core.serialization import JSON_BACKEND, FastJSONResponse, dumps_str
+from app.schemas.response import ChatResponse
+
+
+def default_path(model: ChatResponse) -> bytes:
+    """What FastAPI does for `response_model=ChatResponse` and a model return"""
+    validated = ChatResponse.model_validate(model.model_dump())
+    return JSONResponse(jsonable_encoder(validated)).body
+
+
+def fast_path(model: ChatResponse) -> bytes:
+    return FastJSONResponse(model).body
+
+
+def _log_record() -> logging.LogRecord:
+    record = logging.LogRecord(
+        "security", logging.WARNING, __file__, 1, "Security Event: rate_limit", None, None
+    )
+    record.request_id = "0f8fad5b-d9cb-469f-a165-70867728950e"
+    record.user_ip = "203.0.113.7"
+    record.event_type = "rate_limit"
+    return record
+
+
+def _per_call_us(func, number: int) -> float:
+    return min(timeit.repeat(func, number=number, repeat=5)) / number * 1e6
+
+
+def main(answer_chars: int, number: int) -> None:
+    model = ChatResponse(
+        response="가나다 abc " * (answer_chars // 8),
+        request_id="0f8fad5b-d9cb-469f-a165-70867728950e",
+        session_id="a1b2c3d4e5f6",
+    )
+    assert json.loads(default_path(model)) == json.loads(fast_path(model))
+
+    record = _log_record()
+    formatter = JsonFormatter()
+    log_data = json.loads(formatter.format(record))
+
+    rows = [
+        ("response: FastAPI default", _per_call_us(lambda: default_path(model), number)),
+        ("response: FastJSONResponse", _per_call_us(lambda: fast_path(model), number)),
+        ("log dumps: json.dumps", _per_call_us(lambda: json.dumps(log_data), number)),
+        (
+            f"log dumps: {JSON_BACKEND}",
+            _per_call_us(lambda: dumps_str(log_data, default=str), number),
+        ),
+        ("log line: JsonFormatter", _per_call_us(lambda: formatter.format(record), number)),
+    ]
+    print(f"serializer backend: {JSON_BACKEND}, answer {len(model.response)} chars")
+    for name, us in rows:
+        print(f"{name:<28} {us:>8.2f} us")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--answer-chars", type=int, default=1500)
+    parser.add_argument("--number", type=int, default=20000)
+    args = parser.parse_args()
+    main(args.answer_chars, args.number)
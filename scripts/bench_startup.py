@@ -0,0 +1,115 @@
+"""
+Measure server startup: import footprint, time to healthy and time to ready
+
+Runs `python -X importtime` over building the app (`create_app()`) and
+prints the slowest imports (cumulative), then starts uvicorn several times
+and polls /health (liveness) and /ready (readiness gate) until they answer
+200.
+
+    python -m scripts.bench_startup --runs 5
+    python -m scripts.bench_startup --top 30 --runs 0
+"""
+
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+
+def import_times(
+    code: str = "from app.main import create_app; create_app()",
+) -> list[tuple[str, int, int]]:
+    """(module, self µs, cumulative µs) for every import `code` triggers"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        if not self_us.strip().isdigit():
+            continue  # header line
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def time_to_ready(timeout: float = 60.0) -> tuple[float, float]:
+    """Seconds from process start until /health and /ready return 200"""
+    port = _free_port()
+    started = time.monotonic()
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "app.main:create_app",
+            "--factory",
+            "--port",
+            str(port),
+        ],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        env={**os.environ, "LOG_LEVEL": "WARNING"},
+    )
+    healthy = ready = None
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=1.0) as client:
+            while ready is None and time.monotonic() - started < timeout:
+                for path in ("/health", "/ready"):
+                    try:
+                        ok = client.get(path).status_code == 200
+                    except httpx.TransportError:
+                        ok = False
+                    if ok and path == "/health" and healthy is None:
+                        healthy = time.monotonic() - started
+                    if ok and path == "/ready":
+                        ready = time.monotonic() - started
+                time.sleep(0.005)
+    finally:
+        server.terminate()
+        server.wait()
+    if healthy is None or ready is None:
+        raise SystemExit(f"Server was not ready within {timeout} s")
+    return healthy, ready
+
+
+def main(args: argparse.Namespace) -> None:
+    rows = import_times()
+    total_ms = sum(self_us for _, self_us, _ in rows) / 1000
+    print(f"imports while building the app: {total_ms:.1f} ms")
+    print(f"{'module':<50} {'self ms':>9} {'cumul ms':>9}")
+    for name, self_us, cumulative_us in sorted(rows, key=lambda r: -r[2])[: args.top]:
+        print(f"{name:<50} {self_us / 1000:>9.1f} {cumulative_us / 1000:>9.1f}")
+    own = [row for row in rows if row[0].startswith("app")]
+    print(f"\napp modules (self): {sum(r[1] for r in own) / 1000:.1f} ms")
+
+    if args.runs:
+        samples = [time_to_ready() for _ in range(args.runs)]
+        healthy = statistics.median(h for h, _ in samples)
+        ready = statistics.median(r for _, r in samples)
+        print(
+            f"\nover {args.runs} runs (median): healthy {healthy * 1000:.0f} ms, "
+            f"ready {ready * 1000:.0f} ms"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--top", type=int, default=20, help="Slowest imports to list")
+    parser.add_argument("--runs", type=int, default=3, help="uvicorn starts to time (0 skips)")
+    main(parser.parse_args())
@@ -0,0 +1,61 @@
+"""
+Validate the curated FAQ file and optionally precompute missing answers
+
+    python -m scripts.build_faq              # check entries and matcher
+    python -m scripts.build_faq --generate   # fill null answers via Ollama
+
+Generated answers are written back to the FAQ file for review before commit.
+"""
+
+import argparse
+import asyncio
+import time
+from pathlib import Path
+
+from app.core.config import get_settings
+from app.services.faq import FAQTable, generate_missing_answers, load_faq_entries
+from app.services.llm_service import OllamaService
+
+
+async def generate_missing(path: Path) -> int:
+    """Generate answers for entries without one; returns the number filled"""
+    settings = get_settings()
+    service = OllamaService(
+        base_url=settings.ollama_url,
+        model_name=settings.model_name,
+        timeout=300,
+        system_prompt=settings.system_prompt,
+    )
+    filled = await generate_missing_answers(path, service)
+    print(f"generated {filled} answers")
+    return filled
+
+
+def check(path: Path) -> None:
+    """Build the table and report coverage and match latency"""
+    entries = load_faq_entries(path)
+    table = FAQTable(entries, min_similarity=get_settings().faq_min_similarity)
+    missing = [entry.id for entry in entries if not entry.answer]
+    print(f"{len(table)} of {len(entries)} entries have answers")
+    if missing:
+        print(f"without answer (not served): {', '.join(missing)}")
+
+    questions = [q for entry in entries for q in entry.questions]
+    rounds = 1000
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for question in questions:
+            table.match(question)
+    per_match_us = (time.perf_counter() - started) / (rounds * len(questions)) * 1e6
+    print(f"match latency: {per_match_us:.1f} us")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--path", default=get_settings().faq_path)
+    parser.add_argument("--generate", action="store_true")
+    args = parser.parse_args()
+
+    if args.generate:
+        asyncio.run(generate_missing(Path(args.path)))
+    check(Path(args.path))
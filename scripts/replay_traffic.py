@@ -0,0 +1,230 @@
+"""
+Replay recorded chat traffic against the app and report latency, cache hits and errors
+
+Reads a file written with TRAFFIC_RECORD_ENABLED=true and re-sends every
+request at its original offset (divided by --speed; 0 sends them all at
+once). By default the app runs in-process with a fake LLM whose latency
+grows with prompt length; --real-llm uses OLLAMA_URL instead, and --url
+drives an already running server.
+
+    python -m scripts.replay_traffic traffic.jsonl --speed 10
+    python -m scripts.replay_traffic traffic.jsonl --output after.json --baseline before.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import statistics
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any
+
+import httpx
+
+CACHE_COUNTERS = {
+    "faq": ("faq.hits", "faq.lookups"),
+    "semantic_cache": ("semantic_cache.hits", "semantic_cache.lookups"),
+    "response_cache": ("response_cache.hits", "response_cache.lookups"),
+}
+
+
+class FakeLLMService:
+    """Stand-in for Ollama: fixed overhead plus time per prompt character"""
+
+    def __init__(self, base_seconds: float = 0.05, seconds_per_char: float = 0.0002):
+        self.base_seconds = base_seconds
+        self.seconds_per_char = seconds_per_char
+
+    async def generate(self, prompt: str, outcome=None, **kwargs) -> str:
+        await asyncio.sleep(self.base_seconds + len(prompt) * self.seconds_per_char)
+        if outcome is not None:
+            outcome.done_reason = "stop"  # whole answers, so they can be cached
+        return f"Replayed answer ({len(prompt)} prompt chars)"
+
+    async def embed(self, texts: list[str], **kwargs) -> list[list[float]]:
+        await asyncio.sleep(self.base_seconds / 5)
+        # Bag-of-characters vectors: similar prompts land close together
+        vectors = []
+        for text in texts:
+            vector = [0.0] * 64
+            for char in text.lower():
+                vector[ord(char) % 64] += 1.0
+            vectors.append(vector)
+        return vectors
+
+
+def load_records(path: Path) -> list[dict[str, Any]]:
+    """Recorded requests in arrival order (malformed lines are skipped)"""
+    records = []
+    for line in path.read_text(encoding="utf-8").splitlines():
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue
+        if isinstance(record, dict) and "ts" in record and "body" in record:
+            records.append(record)
+    return sorted(records, key=lambda record: record["ts"])
+
+
+def percentile(ordered: list[float], p: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+def _cache_rates(before: dict, after: dict) -> dict[str, float]:
+    counters_before = before.get("counters", {})
+    counters_after = after.get("counters", {})
+    rates = {}
+    for name, (hits, lookups) in CACHE_COUNTERS.items():
+        delta_lookups = counters_after.get(lookups, 0) - counters_before.get(lookups, 0)
+        delta_hits = counters_after.get(hits, 0) - counters_before.get(hits, 0)
+        rates[name] = delta_hits / delta_lookups if delta_lookups else 0.0
+    return rates
+
+
+async def _send(client: httpx.AsyncClient, record: dict[str, Any]) -> tuple[float, str]:
+    started = time.monotonic()
+    try:
+        response = await client.post(
+            record["path"],
+            json=record["body"],
+            # Keeps recorded clients apart for rate limiting and fair scheduling
+            headers={"X-Forwarded-For": record.get("client", "replay")},
+        )
+        await response.aread()
+        outcome = str(response.status_code)
+    except httpx.HTTPError as e:
+        outcome = type(e).__name__
+    return (time.monotonic() - started) * 1000, outcome
+
+
+async def replay(
+    client: httpx.AsyncClient, records: list[dict[str, Any]], speed: float
+) -> dict[str, Any]:
+    """Send records with their (scaled) original timing and summarise the run"""
+    before = (await client.get("/metrics")).json()
+    start = time.monotonic()
+    first_ts = records[0]["ts"] if records else 0.0
+
+    async def scheduled(record):
+        if speed > 0:
+            delay = (record["ts"] - first_ts) / speed - (time.monotonic() - start)
+            if delay > 0:
+                await asyncio.sleep(delay)
+        return await _send(client, record)
+
+    results = await asyncio.gather(*(scheduled(record) for record in records))
+    duration = time.monotonic() - start
+    after = (await client.get("/metrics")).json()
+
+    latencies = sorted(ms for ms, _ in results)
+    outcomes = Counter(outcome for _, outcome in results)
+    errors = sum(count for outcome, count in outcomes.items() if outcome != "200")
+    return {
+        "requests": len(results),
+        "duration_s": round(duration, 3),
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50), 1),
+            "p90": round(percentile(latencies, 90), 1),
+            "p99": round(percentile(latencies, 99), 1),
+            "max": round(latencies[-1], 1) if latencies else 0.0,
+            "mean": round(statistics.fmean(latencies), 1) if latencies else 0.0,
+        },
+        "error_rate": round(errors / len(results), 4) if results else 0.0,
+        "outcomes": dict(outcomes),
+        "cache_hit_rate": {
+            name: round(rate, 4) for name, rate in _cache_rates(before, after).items()
+        },
+    }
+
+
+def _lookup(summary: dict[str, Any], keys: tuple[str, ...]) -> Any:
+    value: Any = summary
+    for key in keys:
+        value = value.get(key) if isinstance(value, dict) else None
+    return value
+
+
+def print_summary(summary: dict[str, Any], baseline: dict[str, Any] | None) -> None:
+    rows = [(f"latency {key} ms", ("latency_ms", key)) for key in ("p50", "p90", "p99", "max")]
+    rows.append(("error rate", ("error_rate",)))
+    rows += [
+        (f"{name} hit rate", ("cache_hit_rate", name)) for name in summary["cache_hit_rate"]
+    ]
+
+    print(
+        f"{summary['requests']} requests in {summary['duration_s']} s, "
+        f"outcomes {summary['outcomes']}"
+    )
+    for label, keys in rows:
+        value = _lookup(summary, keys)
+        line = f"{label:<26} {value:>10}"
+        old = _lookup(baseline, keys) if baseline is not None else None
+        if isinstance(old, (int, float)):
+            line += f"   baseline {old:>10}   delta {value - old:>+10.4g}"
+        print(line)
+
+
+async def main(args: argparse.Namespace) -> None:
+    records = load_records(Path(args.file))
+    if args.limit:
+        records = records[: args.limit]
+    if not records:
+        raise SystemExit("No records to replay")
+
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout) as client:
+            summary = await replay(client, records, args.speed)
+    else:
+        from app.core.config import get_settings
+        from app.main import create_app
+        from app.services.llm_service import get_llm_service
+        from app.services.response_cache import CachedLLMService, get_response_cache
+
+        app = create_app()
+
+        # One INFO line per replayed request would drown the summary
+        logging.getLogger("httpx").setLevel(logging.WARNING)
+
+        if not args.real_llm:
+            fake = FakeLLMService(args.fake_latency, args.fake_seconds_per_char)
+            settings = get_settings()
+            if settings.response_cache_enabled:
+                # Same wrapping as get_llm_service, so the hit rate is real
+                fake = CachedLLMService(
+                    fake,
+                    get_response_cache(),
+                    settings.model_name,
+                    options={"max_predict": settings.llm_max_predict},
+                )
+            app.dependency_overrides[get_llm_service] = lambda: fake
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://replay", timeout=args.timeout
+        ) as client:
+            summary = await replay(client, records, args.speed)
+
+    baseline = json.loads(Path(args.baseline).read_text()) if args.baseline else None
+    print_summary(summary, baseline)
+    if args.output:
+        Path(args.output).write_text(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("file", help="Recorded traffic (JSON lines)")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="Time acceleration; 0 sends everything at once")
+    parser.add_argument("--limit", type=int, default=0, help="Replay only the first N records")
+    parser.add_argument("--url", help="Drive a running server instead of the in-process app")
+    parser.add_argument("--real-llm", action="store_true",
+                        help="In-process app calls OLLAMA_URL instead of the fake LLM")
+    parser.add_argument("--fake-latency", type=float, default=0.05)
+    parser.add_argument("--fake-seconds-per-char", type=float, default=0.0002)
+    parser.add_argument("--timeout", type=float, default=300.0)
+    parser.add_argument("--output", help="Write the summary as JSON")
+    parser.add_argument("--baseline", help="Summary JSON of a previous build to compare with")
+    asyncio.run(main(parser.parse_args()))
@@ -7,5 +7,11 @@ from app.services.llm_service import OllamaService
 def mock_llm_service():
     """Mock LLM service for testing"""
     service = AsyncMock(spec=OllamaService)
-    service.generate = AsyncMock(return_value="Mocked LLM response")
+
+    async def generate(prompt, *, outcome=None, **kwargs):
+        if outcome is not None:
+            outcome.done_reason = "stop"
+        return "Mocked LLM response"
+
+    service.generate = AsyncMock(side_effect=generate)
     return service
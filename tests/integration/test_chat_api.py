@@ -1,9 +1,30 @@
 """Integration tests for chat API"""
 
+import asyncio
+import json
 import pytest
 from unittest.mock import AsyncMock, MagicMock, patch
+from fastapi import FastAPI
 from fastapi.testclient import TestClient
-from app.main import app
+from app.core import tracing
+from app.core.config import get_settings
+from app.core.metrics import metrics
+from app.core.profiling import get_profile_store, phase
+from app.main import create_app
+from app.middleware import tracing as tracing_middleware
+from app.middleware.deadline import DeadlineMiddleware
+from app.middleware.profiling import ProfilingMiddleware
+from app.middleware.recorder import TrafficRecorder, TrafficRecorderMiddleware
+from app.middleware.rate_limiter import SlidingWindowRateLimiter
+from app.middleware.request_id import RequestIDMiddleware
+from app.middleware.tracing import TracingMiddleware
+from app.routers import admin, ws
+from app.services.faq import get_faq_table
+from app.services.llm_service import get_llm_service
+from app.services.semantic_cache import get_semantic_cache
+from starlette.websockets import WebSocketDisconnect
+
+app = create_app()
 
 
 @pytest.fixture
@@ -56,6 +77,80 @@ class TestChatEndpoint:
         assert "request_id" in data
         assert "X-Request-ID" in response.headers
     
+    @patch("app.services.llm_service.httpx.AsyncClient")
+    def test_chat_session_follow_up(self, mock_client_class, client):
+        """Test follow-up in the same session sends the earlier turn"""
+        mock_client = AsyncMock()
+        mock_response = MagicMock()
+        mock_response.json.return_value = {"response": "I built ClipPro."}
+        mock_response.raise_for_status.return_value = None
+        mock_client.post = AsyncMock(return_value=mock_response)
+        mock_client.__aenter__.return_value = mock_client
+        mock_client.__aexit__.return_value = None
+        mock_client_class.return_value = mock_client
+        
+        first = client.post("/api/chat", json={"message": "What did you build?"})
+        session_id = first.json()["session_id"]
+        assert session_id
+        
+        second = client.post(
+            "/api/chat",
+            json={"message": "Which stack?", "session_id": session_id}
+        )
+        
+        assert second.status_code == 200
+        assert second.json()["session_id"] == session_id
+        prompt = mock_client.post.call_args.kwargs["json"]["prompt"]
+        assert "What did you build?" in prompt
+        assert "I built ClipPro." in prompt
+        assert prompt.endswith("User: Which stack?\nAssistant:")
+    
+    @patch("app.services.llm_service.httpx.AsyncClient")
+    def test_chat_unknown_session_rejected(self, mock_client_class, client):
+        """Test a session id the server never issued is refused, not created"""
+        response = client.post(
+            "/api/chat", json={"message": "Hello", "session_id": "test"}
+        )
+        
+        assert response.status_code == 404
+        assert response.json()["error"] == "session_not_found"
+        mock_client_class.assert_not_called()
+    
+    @patch("app.services.llm_service.httpx.AsyncClient")
+    def test_chat_request_timeout_header(self, mock_client_class, client):
+        """Test X-Request-Timeout bounds the LLM call timeout"""
+        mock_client = AsyncMock()
+        mock_response = MagicMock()
+        mock_response.json.return_value = {"response": "Hello!"}
+        mock_client.post = AsyncMock(return_value=mock_response)
+        mock_client.__aenter__.return_value = mock_client
+        mock_client.__aexit__.return_value = None
+        mock_client_class.return_value = mock_client
+        
+        response = client.post(
+            "/api/chat",
+            json={"message": "Hello"},
+            headers={"X-Request-Timeout": "5"}
+        )
+        
+        assert response.status_code == 200
+        assert mock_client_class.call_args.kwargs["timeout"] <= 5
+    
+    def test_chat_exhausted_budget_returns_504(self, client):
+        """Test a budget too small to generate returns 504"""
+        response = client.post(
+            "/api/chat",
+            json={"message": "Hello"},
+            headers={"X-Request-Timeout": "0.01"}
+        )
+        assert response.status_code == 504
+        assert response.json()["error"] == "deadline_exceeded"
+    
+    def test_deadline_wraps_every_layer_but_tracing(self):
+        """Test the budget starts before the recorder and profiler run"""
+        outermost = [middleware.cls for middleware in app.user_middleware][:2]
+        assert outermost == [TracingMiddleware, DeadlineMiddleware]
+    
     def test_chat_empty_message(self, client):
         """Test chat with empty message"""
         response = client.post(
@@ -101,6 +196,59 @@ class TestChatEndpoint:
         assert "X-Request-ID" in response.headers
 
 
+class TestChatBatchEndpoint:
+    """Batch chat endpoint tests"""
+    
+    @pytest.fixture
+    def mock_client(self):
+        with patch("app.services.llm_service.httpx.AsyncClient") as mock_client_class:
+            mock_client = AsyncMock()
+            mock_response = MagicMock()
+            mock_response.json.return_value = {"response": "Batch answer"}
+            mock_response.raise_for_status.return_value = None
+            mock_client.post = AsyncMock(return_value=mock_response)
+            mock_client.__aenter__.return_value = mock_client
+            mock_client.__aexit__.return_value = None
+            mock_client_class.return_value = mock_client
+            yield mock_client
+    
+    def test_batch_success(self, mock_client, client):
+        """Test batch returns a result per message with per-item errors"""
+        response = client.post(
+            "/api/chat/batch",
+            json={"messages": ["Hi", "Hi", "<script>x</script>"]}
+        )
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert "request_id" in data
+        results = data["results"]
+        assert [item["index"] for item in results] == [0, 1, 2]
+        assert results[0]["response"] == "Batch answer"
+        assert results[1]["response"] == "Batch answer"
+        assert results[2]["error"]["error"] == "validation_error"
+        # Duplicate prompt generated once
+        assert mock_client.post.await_count == 1
+    
+    def test_batch_stream_ndjson(self, mock_client, client):
+        """Test streamed batch returns one JSON line per message"""
+        response = client.post(
+            "/api/chat/batch",
+            json={"messages": ["Hi", "Bye"], "stream": True}
+        )
+        
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert sorted(item["index"] for item in lines) == [0, 1]
+        assert all(item["response"] == "Batch answer" for item in lines)
+    
+    def test_batch_empty_rejected(self, client):
+        """Test empty batch is rejected"""
+        response = client.post("/api/chat/batch", json={"messages": []})
+        assert response.status_code == 422
+
+
 class TestRateLimiting:
     """Rate limiting functionality tests"""
     
@@ -149,3 +297,395 @@ class TestCORSHeaders:
         """Test health endpoint is accessible"""
         response = client.get("/health")
         assert response.status_code == 200
+
+
+class TestProfiling:
+    """Profiling middleware and admin endpoint tests"""
+    
+    @pytest.fixture
+    def profiled_client(self, monkeypatch):
+        """App with the profiling middleware, a slow route and the admin router"""
+        monkeypatch.setattr(get_settings(), "admin_token", "secret")
+        get_profile_store.cache_clear()
+        
+        test_app = FastAPI()
+        test_app.add_middleware(RequestIDMiddleware)
+        test_app.add_middleware(
+            ProfilingMiddleware, slow_threshold_ms=50, token="secret"
+        )
+        test_app.include_router(admin.router, prefix="/admin")
+        
+        @test_app.get("/work")
+        async def work(delay: float = 0.0):
+            with phase("endpoint"):
+                with phase("llm.generate"):
+                    await asyncio.sleep(delay)
+            return {"ok": True}
+        
+        yield TestClient(test_app)
+        get_profile_store.cache_clear()
+    
+    def test_fast_request_not_captured(self, profiled_client):
+        """Test ordinary fast requests are not kept"""
+        response = profiled_client.get("/work")
+        request_id = response.headers["X-Request-ID"]
+        
+        profile = profiled_client.get(
+            f"/admin/profiles/{request_id}", headers={"X-Admin-Token": "secret"}
+        )
+        assert profile.status_code == 404
+    
+    def test_header_captures_profile(self, profiled_client):
+        """Test X-Profile with the admin token captures the breakdown"""
+        response = profiled_client.get(
+            "/work", headers={"X-Profile": "secret", "X-Request-ID": "req-42"}
+        )
+        assert response.status_code == 200
+        
+        profile = profiled_client.get(
+            "/admin/profiles/req-42", headers={"X-Admin-Token": "secret"}
+        ).json()
+        assert profile["reason"] == "header"
+        assert profile["status_code"] == 200
+        assert [p["name"] for p in profile["phases"]] == ["endpoint", "llm.generate"]
+    
+    def test_wrong_profile_header_ignored(self, profiled_client):
+        """Test X-Profile without the right token is not privileged"""
+        profiled_client.get("/work", headers={"X-Profile": "guess", "X-Request-ID": "r1"})
+        
+        listing = profiled_client.get(
+            "/admin/profiles", headers={"X-Admin-Token": "secret"}
+        ).json()
+        assert listing["profiles"] == []
+    
+    def test_slow_request_captured(self, profiled_client):
+        """Test requests over the threshold are captured automatically"""
+        response = profiled_client.get("/work", params={"delay": 0.1})
+        request_id = response.headers["X-Request-ID"]
+        
+        profile = profiled_client.get(
+            f"/admin/profiles/{request_id}", headers={"X-Admin-Token": "secret"}
+        ).json()
+        assert profile["reason"] == "slow"
+        assert profile["total_ms"] >= 100
+        assert profile["phases"][1]["duration_ms"] >= 100
+    
+    def test_admin_requires_token(self, profiled_client):
+        """Test admin endpoints reject a missing or wrong token"""
+        assert profiled_client.get("/admin/profiles").status_code == 403
+        response = profiled_client.get(
+            "/admin/profiles", headers={"X-Admin-Token": "nope"}
+        )
+        assert response.status_code == 403
+    
+    def test_admin_disabled_without_token(self, client):
+        """Test admin endpoints do not exist when no token is configured"""
+        response = client.get("/admin/profiles", headers={"X-Admin-Token": ""})
+        assert response.status_code == 404
+
+
+class TestTracing:
+    """Tracing across middleware, guardrails and the LLM call"""
+    
+    @patch("app.services.llm_service.httpx.AsyncClient")
+    def test_sampled_request_traced_end_to_end(
+        self, mock_client_class, client, monkeypatch
+    ):
+        """Test one trace covers every layer and reaches Ollama"""
+        spans = []
+        monkeypatch.setattr(
+            tracing, "get_span_exporter", lambda: MagicMock(export=spans.append)
+        )
+        # As behind a gateway whose sampling decision is trusted
+        monkeypatch.setattr(
+            tracing_middleware,
+            "start_trace",
+            lambda name, traceparent, ratio, trust, **attributes: tracing.start_trace(
+                name, traceparent, ratio, True, **attributes
+            ),
+        )
+        mock_client = AsyncMock()
+        mock_response = MagicMock()
+        mock_response.json.return_value = {"response": "Traced!"}
+        mock_client.post = AsyncMock(return_value=mock_response)
+        mock_client.__aenter__.return_value = mock_client
+        mock_client.__aexit__.return_value = None
+        mock_client_class.return_value = mock_client
+        trace_id = "4bf92f3577b34da6a3ce929d0e0e4736"
+        
+        response = client.post(
+            "/api/chat",
+            json={"message": "Tell me something unusual about tracing"},
+            headers={"traceparent": f"00-{trace_id}-00f067aa0ba902b7-01"},
+        )
+        
+        assert response.status_code == 200
+        names = {span.name for span in spans}
+        assert {
+            "POST /api/chat",
+            "middleware.deadline",
+            "middleware.profiling",
+            "middleware.request_id",
+            "middleware.rate_limiter",
+            "middleware.error_handler",
+            "guardrails.validate_input",
+            "guardrails.validate_output",
+            "llm.generate",
+        } <= names
+        assert {span.trace_id for span in spans} == {trace_id}
+        llm_span = next(span for span in spans if span.name == "llm.generate")
+        headers = mock_client.post.call_args.kwargs["headers"]
+        assert headers["traceparent"] == llm_span.traceparent
+    
+    def test_unsampled_request_not_traced(self, client, monkeypatch):
+        """Test requests without a sampled traceparent export nothing"""
+        spans = []
+        monkeypatch.setattr(
+            tracing, "get_span_exporter", lambda: MagicMock(export=spans.append)
+        )
+        
+        client.get("/health")
+        
+        assert spans == []
+
+
+class TestTrafficRecorder:
+    """Traffic recorder middleware tests"""
+    
+    @pytest.fixture
+    def recorded(self, tmp_path):
+        """App with the recorder around a stub chat route; yields client and file"""
+        path = tmp_path / "traffic.jsonl"
+        test_app = FastAPI()
+        test_app.add_middleware(
+            TrafficRecorderMiddleware, recorder=TrafficRecorder(path, salt="test")
+        )
+        
+        @test_app.post("/api/chat")
+        async def chat(body: dict):
+            return {"echo": body["message"]}
+        
+        @test_app.get("/health")
+        async def health():
+            return {"status": "ok"}
+        
+        return TestClient(test_app), path
+    
+    def test_chat_request_recorded(self, recorded):
+        """Test a chat request is written sanitized with status and latency"""
+        client, path = recorded
+        
+        response = client.post(
+            "/api/chat", json={"message": "I am bob@example.com", "session_id": "s1"}
+        )
+        
+        assert response.json() == {"echo": "I am bob@example.com"}
+        (record,) = [json.loads(line) for line in path.read_text().splitlines()]
+        assert record["path"] == "/api/chat"
+        assert record["body"]["message"] == "I am <email>"
+        assert record["body"]["session_id"] != "s1"
+        assert record["client"] != "ip:testclient"
+        assert record["status"] == 200
+        assert record["ms"] >= 0
+    
+    def test_other_requests_not_recorded(self, recorded):
+        """Test only chat POSTs are recorded"""
+        client, path = recorded
+        
+        client.get("/health")
+        
+        assert not path.exists()
+
+
+class StreamingLLM:
+    """Fake LLM streaming a fixed answer in chunks"""
+    
+    def __init__(self, chunks=("Hello", ", ", "visitor"), delay=0.0):
+        self.chunks = chunks
+        self.delay = delay
+    
+    async def generate(self, prompt, **kwargs):
+        return "".join(self.chunks)
+    
+    async def generate_stream(self, prompt, **kwargs):
+        for chunk in self.chunks:
+            await asyncio.sleep(self.delay)
+            yield chunk
+    
+    async def embed(self, texts, **kwargs):
+        return [[1.0, 0.0] for _ in texts]
+
+
+class TestWebSocketChat:
+    """WebSocket chat endpoint tests"""
+    
+    @pytest.fixture
+    def ws_client(self, monkeypatch):
+        """Client with a streaming fake LLM and no precomputed answers"""
+        llm = StreamingLLM()
+        limiter = SlidingWindowRateLimiter(rpm=60)
+        monkeypatch.setattr(ws, "get_rate_limiter", lambda: limiter)
+        app.dependency_overrides[get_llm_service] = lambda: llm
+        app.dependency_overrides[get_semantic_cache] = lambda: None
+        app.dependency_overrides[get_faq_table] = lambda: None
+        yield TestClient(app), llm, limiter
+        app.dependency_overrides.clear()
+    
+    @staticmethod
+    def _events_until_done(websocket, ids):
+        """Events by message id until every id has finished"""
+        events = {message_id: [] for message_id in ids}
+        pending = set(ids)
+        while pending:
+            event = websocket.receive_json()
+            events[event["id"]].append(event)
+            if event["type"] in ("done", "error"):
+                pending.discard(event["id"])
+        return events
+    
+    def test_streams_tokens_per_message(self, ws_client):
+        """Test concurrent messages stream tokens tagged with their id"""
+        client, llm, _ = ws_client
+        llm.delay = 0.01
+        
+        with client.websocket_connect("/api/ws/chat") as websocket:
+            websocket.send_json({"id": "a", "message": "Tell me about projects"})
+            websocket.send_json({"id": "b", "message": "Tell me about skills"})
+            events = self._events_until_done(websocket, ["a", "b"])
+        
+        for message_id in ("a", "b"):
+            *tokens, done = events[message_id]
+            assert [event["type"] for event in tokens] == ["token"] * 3
+            assert "".join(event["text"] for event in tokens) == "Hello, visitor"
+            assert done["type"] == "done"
+            assert done["response"] == "Hello, visitor"
+            assert done["session_id"]
+            assert done["request_id"]
+    
+    def test_guardrails_per_message(self, ws_client):
+        """Test a rejected message fails alone and the connection stays open"""
+        client, _, _ = ws_client
+        
+        with client.websocket_connect("/api/ws/chat") as websocket:
+            websocket.send_json({"id": "bad", "message": "<script>alert(1)</script>"})
+            (error,) = self._events_until_done(websocket, ["bad"])["bad"]
+            websocket.send_json({"id": "good", "message": "Tell me about projects"})
+            events = self._events_until_done(websocket, ["good"])
+        
+        assert error["error"] == "validation_error"
+        assert events["good"][-1]["type"] == "done"
+    
+    def test_malformed_message(self, ws_client):
+        """Test invalid JSON and missing fields are reported without closing"""
+        client, _, _ = ws_client
+        
+        with client.websocket_connect("/api/ws/chat") as websocket:
+            websocket.send_text("not json")
+            first = websocket.receive_json()
+            websocket.send_json({"id": "x"})
+            second = websocket.receive_json()
+        
+        assert first["type"] == "error" and "id" not in first
+        assert second["id"] == "x"
+        assert second["error"] == "validation_error"
+    
+    def test_rate_limit_per_message(self, ws_client):
+        """Test each message counts against the client's rate limit"""
+        client, _, limiter = ws_client
+        limiter.rpm = 1
+        
+        with client.websocket_connect("/api/ws/chat") as websocket:
+            websocket.send_json({"id": "1", "message": "Tell me about projects"})
+            self._events_until_done(websocket, ["1"])
+            websocket.send_json({"id": "2", "message": "Tell me about skills"})
+            (error,) = self._events_until_done(websocket, ["2"])["2"]
+        
+        assert error["error"] == "rate_limit_exceeded"
+    
+    def test_in_flight_limit(self, ws_client, monkeypatch):
+        """Test messages over the per-connection in-flight limit are refused"""
+        client, llm, _ = ws_client
+        llm.delay = 0.05
+        monkeypatch.setattr(get_settings(), "ws_max_in_flight", 1)
+        
+        with client.websocket_connect("/api/ws/chat") as websocket:
+            websocket.send_json({"id": "1", "message": "Tell me about projects"})
+            websocket.send_json({"id": "2", "message": "Tell me about skills"})
+            events = self._events_until_done(websocket, ["1", "2"])
+        
+        assert events["1"][-1]["type"] == "done"
+        assert events["2"][0]["error"] == "too_many_in_flight"
+    
+    def test_oversized_message_closes(self, ws_client, monkeypatch):
+        """Test a message over the size limit closes the connection"""
+        client, _, _ = ws_client
+        monkeypatch.setattr(get_settings(), "ws_max_message_bytes", 100)
+        
+        with client.websocket_connect("/api/ws/chat") as websocket:
+            websocket.send_json({"id": "1", "message": "x" * 200})
+            with pytest.raises(WebSocketDisconnect) as exc_info:
+                websocket.receive_json()
+        
+        assert exc_info.value.code == 1009
+    
+    def test_idle_connection_closed(self, ws_client, monkeypatch):
+        """Test a connection that sends nothing is closed after the idle limit"""
+        client, _, _ = ws_client
+        monkeypatch.setattr(get_settings(), "ws_idle_timeout_seconds", 0.05)
+        
+        with client.websocket_connect("/api/ws/chat") as websocket:
+            with pytest.raises(WebSocketDisconnect) as exc_info:
+                websocket.receive_json()
+        
+        assert exc_info.value.code == 1000
+    
+    @pytest.fixture
+    def stalled_client(self, ws_client, monkeypatch):
+        """ws_client whose socket never accepts another event, as if unread"""
+        async def stalled_send(self, event):
+            await asyncio.Event().wait()
+        
+        monkeypatch.setattr(ws.ChatConnection, "_send", stalled_send)
+        monkeypatch.setattr(get_settings(), "request_timeout_default_seconds", 0.2)
+        metrics.reset()
+        return ws_client
+    
+    def test_unread_events_close_connection(self, stalled_client):
+        """Test a client not reading by the deadline loses the connection"""
+        client, _, _ = stalled_client
+        
+        with client.websocket_connect("/api/ws/chat") as websocket:
+            websocket.send_json({"id": "1", "message": "Tell me about projects"})
+            with pytest.raises(WebSocketDisconnect) as exc_info:
+                websocket.receive_json()
+        
+        assert exc_info.value.code == 1008
+        assert metrics.counter("ws.closed.slow_consumer") == 1
+        assert metrics.counter("ws.errors.slow_consumer") == 0
+    
+    def test_event_queue_overflow_cancels_answer(self, stalled_client, monkeypatch):
+        """Test generation stops once its unsent events fill the queue"""
+        client, llm, _ = stalled_client
+        llm.chunks = ("token",) * 10
+        monkeypatch.setattr(get_settings(), "ws_max_queued_events", 2)
+        
+        with client.websocket_connect("/api/ws/chat") as websocket:
+            websocket.send_json({"id": "1", "message": "Tell me about projects"})
+            with pytest.raises(WebSocketDisconnect):
+                websocket.receive_json()
+        
+        assert metrics.counter("ws.errors.slow_consumer") == 1
+        assert metrics.counter("ws.closed.slow_consumer") == 1
+    
+    def test_foreign_origin_rejected(self, ws_client, monkeypatch):
+        """Test browsers from origins outside ALLOWED_ORIGINS are refused"""
+        client, _, _ = ws_client
+        monkeypatch.setattr(get_settings(), "allowed_origins", ["https://portfolio.example"])
+        
+        with pytest.raises(WebSocketDisconnect) as exc_info:
+            with client.websocket_connect(
+                "/api/ws/chat", headers={"Origin": "https://evil.example"}
+            ) as websocket:
+                websocket.receive_json()
+        
+        assert exc_info.value.code == 1008
@@ -0,0 +1,91 @@
+"""Startup budget regression tests"""
+
+import subprocess
+import sys
+import time
+from fastapi.testclient import TestClient
+from app.core.readiness import get_readiness
+from app.main import create_app
+
+# Measured at ~0.7 s (import and create_app) and ~1.5 s (uvicorn start to /ready) on one
+# CPU; the budgets leave room for slower CI machines
+IMPORT_BUDGET_SECONDS = 2.0
+READY_BUDGET_SECONDS = 10.0
+
+
+def _build_app(code: str = "") -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            f"import sys; from app.main import create_app; create_app(); {code}",
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+class TestStartupBudget:
+    """Import footprint and readiness timing"""
+    
+    def test_import_within_budget(self):
+        """Test building the app (and the interpreter start) stays in budget"""
+        timings = []
+        for _ in range(3):
+            started = time.perf_counter()
+            _build_app()
+            timings.append(time.perf_counter() - started)
+        
+        assert min(timings) < IMPORT_BUDGET_SECONDS
+    
+    def test_optional_subsystems_not_imported(self):
+        """Test disabled subsystems are not loaded when the app is built"""
+        result = _build_app("print('numpy' in sys.modules)")
+        
+        assert result.stdout.strip() == "False"
+    
+    def test_module_import_builds_nothing(self):
+        """Test importing app.main alone loads no framework or routers"""
+        result = subprocess.run(
+            [
+                sys.executable,
+                "-c",
+                "import sys, app.main; "
+                "print(any(m in sys.modules for m in ('fastapi', 'app.routers')))",
+            ],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        
+        assert result.stdout.strip() == "False"
+    
+    def test_not_ready_before_startup(self):
+        """Test /ready reports starting while liveness already answers"""
+        get_readiness.cache_clear()
+        client = TestClient(create_app())  # no lifespan: startup never runs
+        
+        assert client.get("/health").status_code == 200
+        response = client.get("/ready")
+        assert response.status_code == 503
+        assert response.json()["status"] == "starting"
+    
+    def test_ready_within_budget(self):
+        """Test every startup check passes and /ready opens within budget"""
+        get_readiness.cache_clear()
+        started = time.monotonic()
+        
+        with TestClient(create_app()) as client:
+            while time.monotonic() - started < READY_BUDGET_SECONDS:
+                response = client.get("/ready")
+                if response.status_code == 200:
+                    break
+                time.sleep(0.01)
+            elapsed = time.monotonic() - started
+        
+        assert response.status_code == 200, response.json()
+        assert elapsed < READY_BUDGET_SECONDS
+        checks = response.json()["checks"]
+        assert {"faq_table", "guardrail_workers"} <= set(checks)
+        assert all(check["status"] == "ok" for check in checks.values())
@@ -0,0 +1,37 @@
+"""Smoke test for the context reuse benchmark script"""
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from scripts import bench_context_reuse
+
+
+@pytest.mark.asyncio
+class TestBenchContextReuse:
+    
+    async def test_runs_against_mocked_ollama(self, capsys):
+        """Test both conversations complete and a row is printed per turn"""
+        payloads = []
+        
+        async def post(url, json, **kwargs):
+            payloads.append(json)
+            response = MagicMock()
+            response.json.return_value = {
+                "response": "answer",
+                "done_reason": "stop",
+                "context": [1, 2, 3],
+                "prompt_eval_duration": 2_000_000,
+            }
+            return response
+        
+        with patch("app.services.llm_service.httpx.AsyncClient") as mock_client_class:
+            mock_client = AsyncMock()
+            mock_client.post = AsyncMock(side_effect=post)
+            mock_client.__aenter__.return_value = mock_client
+            mock_client_class.return_value = mock_client
+            
+            await bench_context_reuse.main(turns=3)
+        
+        rows = capsys.readouterr().out.splitlines()[1:]
+        assert [row.split()[0] for row in rows] == ["1", "2", "3"]
+        # Only the second conversation sends the cached context back
+        assert ["context" in payload for payload in payloads] == [False] * 4 + [True] * 2
@@ -0,0 +1,326 @@
+"""Tests for chat usecases"""
+
+import asyncio
+import time
+import pytest
+from unittest.mock import ANY, AsyncMock
+from app.schemas.request import BatchChatRequest, ChatRequest
+from app.core.metrics import metrics
+from app.services.context_cache import ContextCache
+from app.services.faq import FAQEntry, FAQTable
+from app.services.llm_service import LLMServiceError
+from app.services.scheduler import FairScheduler
+from app.services.semantic_cache import SemanticCache
+from app.services.session_store import InMemorySessionStore
+from app.usecases import chat as chat_module
+from app.usecases.chat import (
+    ChatPipeline,
+    batch_chat_usecase,
+    chat_usecase,
+    iter_batch_chat,
+)
+
+
+def make_pipeline(llm_service, scheduler=None, **options):
+    """Pipeline around a mocked LLM service"""
+    return ChatPipeline(
+        llm_service=llm_service,
+        scheduler=scheduler or FairScheduler(limit=4),
+        session_store=options.pop("session_store", InMemorySessionStore()),
+        **options,
+    )
+
+
+def fake_embed(texts, **kwargs):
+    """Embed paraphrases of the projects question onto the same direction"""
+    return [[1.0, 0.0] if "project" in text or "build" in text else [0.0, 1.0]
+            for text in texts]
+
+
+@pytest.mark.asyncio
+class TestBatchChatUsecase:
+    """Test batch answering"""
+    
+    async def test_results_in_input_order(self, mock_llm_service):
+        """Test every message gets a result at its index"""
+        mock_llm_service.generate = AsyncMock(side_effect=lambda p, **kwargs: f"answer to {p}")
+        request = BatchChatRequest(messages=["a", "b", "c"])
+        
+        response = await batch_chat_usecase(
+            request, "req-1", make_pipeline(mock_llm_service), "ip:test"
+        )
+        
+        assert [item.index for item in response.results] == [0, 1, 2]
+        assert response.results[1].response == "answer to b"
+        assert response.request_id == "req-1"
+    
+    async def test_identical_prompts_generated_once(self, mock_llm_service):
+        """Test duplicate prompts share one LLM call"""
+        request = BatchChatRequest(messages=["same", " same ", "other"])
+        
+        response = await batch_chat_usecase(
+            request, "req-1", make_pipeline(mock_llm_service), "ip:test"
+        )
+        
+        assert mock_llm_service.generate.await_count == 2
+        assert all(item.response == "Mocked LLM response" for item in response.results)
+    
+    async def test_per_item_errors(self, mock_llm_service):
+        """Test invalid and failed items do not fail the batch"""
+        async def generate(prompt, **kwargs):
+            if prompt == "boom":
+                raise LLMServiceError("down")
+            return "ok"
+        mock_llm_service.generate = AsyncMock(side_effect=generate)
+        request = BatchChatRequest(messages=["fine", "<script>x</script>", "boom", "   "])
+        
+        response = await batch_chat_usecase(
+            request, "req-1", make_pipeline(mock_llm_service), "ip:test"
+        )
+        
+        results = response.results
+        assert results[0].response == "ok"
+        assert results[1].error.error == "validation_error"
+        assert results[2].error.error == "service_unavailable"
+        assert results[3].error.error == "validation_error"
+        mock_llm_service.generate.assert_any_await("fine", deadline=None, outcome=ANY)
+        assert mock_llm_service.generate.await_count == 2
+    
+    async def test_concurrency_limited(self, mock_llm_service):
+        """Test batch generations stay within the batch lane share"""
+        scheduler = FairScheduler(limit=6, batch_share=0.5)
+        peak = 0
+        
+        async def generate(prompt, **kwargs):
+            nonlocal peak
+            peak = max(peak, scheduler.in_flight)
+            await asyncio.sleep(0.01)
+            return prompt
+        mock_llm_service.generate = AsyncMock(side_effect=generate)
+        request = BatchChatRequest(messages=[f"q{i}" for i in range(12)])
+        
+        await batch_chat_usecase(
+            request, "req-1", make_pipeline(mock_llm_service, scheduler), "ip:test"
+        )
+        
+        assert peak == 3
+    
+    async def test_item_budget_outlasts_one_request_deadline(self, mock_llm_service):
+        """Test a batch far beyond capacity x per-item budget still completes"""
+        scheduler = FairScheduler(limit=2, batch_share=0.5)  # one batch slot
+        
+        async def generate(prompt, *, deadline, **kwargs):
+            await asyncio.sleep(0.02)
+            if time.monotonic() > deadline:
+                raise AssertionError("generated past its deadline")
+            return prompt
+        mock_llm_service.generate = AsyncMock(side_effect=generate)
+        # 20 items x 20 ms on one slot is 0.4 s, far beyond the 0.1 s per item
+        request = BatchChatRequest(messages=[f"q{i}" for i in range(20)])
+        
+        response = await batch_chat_usecase(
+            request,
+            "req-1",
+            make_pipeline(mock_llm_service, scheduler),
+            "ip:test",
+            deadline=time.monotonic() + 5,
+            item_timeout=0.1,
+        )
+        
+        assert all(item.response is not None for item in response.results)
+    
+    async def test_batch_deadline_bounds_queued_items(self, mock_llm_service):
+        """Test items still queued when the batch budget ends fail alone"""
+        scheduler = FairScheduler(limit=2, batch_share=0.5)
+        
+        async def generate(prompt, **kwargs):
+            await asyncio.sleep(0.05)
+            return prompt
+        mock_llm_service.generate = AsyncMock(side_effect=generate)
+        request = BatchChatRequest(messages=[f"q{i}" for i in range(10)])
+        
+        response = await batch_chat_usecase(
+            request,
+            "req-1",
+            make_pipeline(mock_llm_service, scheduler),
+            "ip:test",
+            deadline=time.monotonic() + 0.12,
+            item_timeout=1.0,
+        )
+        
+        errors = [item.error.error for item in response.results if item.error]
+        assert 0 < len(errors) < 10
+        assert set(errors) == {"deadline_exceeded"}
+    
+    async def test_stream_yields_in_completion_order(self, mock_llm_service):
+        """Test streamed items arrive as soon as they complete"""
+        async def generate(prompt, **kwargs):
+            await asyncio.sleep(0.05 if prompt == "slow" else 0)
+            return prompt
+        mock_llm_service.generate = AsyncMock(side_effect=generate)
+        request = BatchChatRequest(messages=["slow", "fast"])
+        
+        items = [
+            item async for item in iter_batch_chat(
+                request, make_pipeline(mock_llm_service), "ip:test"
+            )
+        ]
+        
+        assert [item.index for item in items] == [1, 0]
+
+
+@pytest.mark.asyncio
+class TestChatUsecaseSemanticCache:
+    """Test semantic caching of first turns"""
+    
+    async def ask(self, message, llm_service, cache, store, session_id=None):
+        return await chat_usecase(
+            ChatRequest(message=message, session_id=session_id),
+            "req-1",
+            make_pipeline(llm_service, session_store=store, semantic_cache=cache),
+            "ip:test",
+        )
+    
+    async def test_paraphrase_served_from_cache(self, mock_llm_service):
+        """Test a paraphrased first question does not call generate again"""
+        mock_llm_service.embed = AsyncMock(side_effect=fake_embed)
+        cache = SemanticCache(threshold=0.9)
+        store = InMemorySessionStore()
+        
+        first = await self.ask("What did you build?", mock_llm_service, cache, store)
+        second = await self.ask("Which projects have you made?", mock_llm_service, cache, store)
+        
+        assert second.response == first.response
+        assert mock_llm_service.generate.await_count == 1
+        # The cached answer still becomes part of the new session
+        assert (await store.get_history(second.session_id)).turns[0].assistant == first.response
+    
+    async def test_truncated_answer_not_cached(self, mock_llm_service):
+        """Test an answer that hit its token limit is not served to paraphrases"""
+        async def generate(prompt, *, outcome=None, **kwargs):
+            outcome.done_reason = "length"
+            return "Cut short"
+        mock_llm_service.generate = AsyncMock(side_effect=generate)
+        mock_llm_service.embed = AsyncMock(side_effect=fake_embed)
+        cache = SemanticCache(threshold=0.9)
+        store = InMemorySessionStore()
+        
+        await self.ask("What did you build?", mock_llm_service, cache, store)
+        await self.ask("Which projects have you made?", mock_llm_service, cache, store)
+        
+        assert mock_llm_service.generate.await_count == 2
+    
+    async def test_follow_up_bypasses_cache(self, mock_llm_service):
+        """Test turns with history always go to the LLM"""
+        mock_llm_service.embed = AsyncMock(side_effect=fake_embed)
+        cache = SemanticCache(threshold=0.9)
+        store = InMemorySessionStore()
+        
+        first = await self.ask("What did you build?", mock_llm_service, cache, store)
+        await self.ask("Which projects?", mock_llm_service, cache, store, first.session_id)
+        
+        assert mock_llm_service.generate.await_count == 2
+        assert mock_llm_service.embed.await_count == 1
+    
+    async def test_embedding_failure_falls_through(self, mock_llm_service):
+        """Test an embedding error is treated as a miss"""
+        mock_llm_service.embed = AsyncMock(side_effect=LLMServiceError("no model"))
+        
+        response = await self.ask(
+            "What did you build?", mock_llm_service, SemanticCache(), InMemorySessionStore()
+        )
+        
+        assert response.response == "Mocked LLM response"
+    
+    async def test_batch_uses_cache(self, mock_llm_service):
+        """Test batch paraphrases share one generation through the cache"""
+        mock_llm_service.embed = AsyncMock(side_effect=fake_embed)
+        cache = SemanticCache(threshold=0.9)
+        cache.add([1.0, 0.0], "cached projects answer")
+        request = BatchChatRequest(messages=["What did you build?", "Other"])
+        
+        response = await batch_chat_usecase(
+            request, "req-1", make_pipeline(mock_llm_service, semantic_cache=cache),
+            "ip:test",
+        )
+        
+        assert response.results[0].response == "cached projects answer"
+        assert mock_llm_service.generate.await_count == 1
+
+
+@pytest.mark.asyncio
+class TestChatUsecaseFAQ:
+    """Test precomputed FAQ answers"""
+    
+    @pytest.fixture
+    def faq(self):
+        return FAQTable([
+            FAQEntry("contact", ("How can I contact you?",), "Use the contact form."),
+        ])
+    
+    async def test_faq_answer_skips_llm(self, mock_llm_service, faq):
+        """Test a FAQ intent is answered without embedding or generation"""
+        mock_llm_service.embed = AsyncMock(side_effect=fake_embed)
+        pipeline = make_pipeline(
+            mock_llm_service, faq=faq, semantic_cache=SemanticCache()
+        )
+        
+        response = await chat_usecase(
+            ChatRequest(message="how can I contact you"), "req-1", pipeline, "ip:test"
+        )
+        
+        assert response.response == "Use the contact form."
+        mock_llm_service.generate.assert_not_awaited()
+        mock_llm_service.embed.assert_not_awaited()
+    
+    async def test_faq_answer_discards_kv_context(
+        self, mock_llm_service, faq, monkeypatch
+    ):
+        """Test a turn answered without the LLM drops the session's context"""
+        monkeypatch.setattr(chat_module, "new_session_id", lambda: "s1")
+        context_cache = ContextCache()
+        context_cache.put("s1", "llama3", [1, 2, 3], 0)
+        pipeline = make_pipeline(mock_llm_service, faq=faq, context_cache=context_cache)
+        
+        await chat_usecase(
+            ChatRequest(message="How can I contact you?"), "req-1", pipeline, "ip:test"
+        )
+        
+        assert len(context_cache) == 0
+    
+    async def test_history_turns_passed_to_llm(self, mock_llm_service):
+        """Test the LLM is told how many turns the prompt is built on"""
+        pipeline = make_pipeline(mock_llm_service)
+        first = await chat_usecase(
+            ChatRequest(message="Hi"), "req-1", pipeline, "ip:test"
+        )
+        await chat_usecase(
+            ChatRequest(message="Hi", session_id=first.session_id),
+            "req-2",
+            pipeline,
+            "ip:test",
+        )
+        
+        calls = mock_llm_service.generate.await_args_list
+        turns = [call.kwargs["history_turns"] for call in calls]
+        assert turns == [0, 1]
+    
+    async def test_other_questions_fall_through(self, mock_llm_service, faq):
+        """Test non-FAQ questions go to the LLM"""
+        response = await chat_usecase(
+            ChatRequest(message="What is your favourite food?"),
+            "req-1",
+            make_pipeline(mock_llm_service, faq=faq),
+            "ip:test",
+        )
+        
+        assert response.response == "Mocked LLM response"
+    
+    async def test_traffic_share_reported(self, mock_llm_service, faq):
+        """Test the share of messages served from the table is a metric"""
+        metrics.reset()
+        pipeline = make_pipeline(mock_llm_service, faq=faq)
+        for message in ["How can I contact you?", "Something else"]:
+            await chat_usecase(ChatRequest(message=message), "req-1", pipeline, "ip:test")
+        
+        assert metrics.snapshot()["gauges"]["faq.traffic_share"] == 0.5
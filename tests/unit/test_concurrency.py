@@ -0,0 +1,130 @@
+"""Tests for adaptive concurrency limit"""
+
+import asyncio
+import pytest
+from app.core.metrics import metrics
+from app.core.exceptions import DeadlineExceededError, ValidationError
+from app.services.concurrency import AdaptiveLimit
+from app.services.llm_service import LLMServiceError
+from app.services.scheduler import FairScheduler
+
+BASE_LATENCY = 0.005
+CAPACITY = 4
+
+
+def backend_latency(in_flight):
+    """Latency of a fake backend that serves CAPACITY calls at full speed"""
+    return BASE_LATENCY * max(1.0, in_flight / CAPACITY)
+
+
+def drive(limiter, samples):
+    """Feed samples from a saturated fake backend running at the current limit"""
+    for _ in range(samples):
+        limit = limiter.limit
+        limiter.on_sample(backend_latency(limit), in_flight=limit)
+    return limiter.limit
+
+
+class TestAdaptiveLimit:
+    """Test limit adjustment from latency samples"""
+    
+    def test_grows_towards_capacity(self):
+        """Test limit rises from 1 while latency stays at baseline"""
+        limiter = AdaptiveLimit(initial=1, max_limit=64)
+        assert CAPACITY <= drive(limiter, 2000) <= CAPACITY * 3
+    
+    def test_shrinks_towards_capacity(self):
+        """Test an oversized limit is reduced once latency degrades"""
+        limiter = AdaptiveLimit(initial=1, max_limit=64)
+        limiter.on_sample(BASE_LATENCY, in_flight=1)  # learn the baseline
+        limiter._estimate = 48
+        assert CAPACITY <= drive(limiter, 2000) <= CAPACITY * 3
+    
+    def test_follows_capacity_change(self):
+        """Test limit adapts when the backend gets slower (e.g. new model)"""
+        global CAPACITY
+        limiter = AdaptiveLimit(initial=1, max_limit=64)
+        high = drive(limiter, 2000)
+        CAPACITY, original = 2, CAPACITY
+        try:
+            low = drive(limiter, 3000)
+        finally:
+            CAPACITY = original
+        assert low < high
+    
+    def test_drop_backs_off(self):
+        """Test failed calls shrink the limit multiplicatively"""
+        limiter = AdaptiveLimit(initial=10)
+        limiter.on_sample(1.0, in_flight=10, dropped=True)
+        assert limiter.limit == 9
+    
+    def test_bounds(self):
+        """Test limit stays within min/max"""
+        limiter = AdaptiveLimit(initial=2, min_limit=2, max_limit=3)
+        for _ in range(20):
+            limiter.on_sample(1.0, in_flight=2, dropped=True)
+        assert limiter.limit == 2
+        assert drive(limiter, 500) <= 3
+    
+    def test_app_limited_does_not_grow(self):
+        """Test limit does not probe upwards when traffic is light"""
+        limiter = AdaptiveLimit(initial=8)
+        for _ in range(200):
+            limiter.on_sample(BASE_LATENCY, in_flight=1)
+        assert limiter.limit == 8
+    
+    def test_metrics_exported(self):
+        """Test limit and RTT estimates are exported as gauges"""
+        metrics.reset()
+        AdaptiveLimit(initial=4).on_sample(0.02, in_flight=4)
+        gauges = metrics.snapshot()["gauges"]
+        assert gauges["concurrency.limit"] >= 4
+        assert gauges["concurrency.rtt_recent_ms"] == pytest.approx(20)
+        assert gauges["concurrency.rtt_baseline_ms"] == pytest.approx(20)
+
+
+@pytest.mark.asyncio
+class TestSchedulerWithAdaptiveLimit:
+    """Test the scheduler retunes its limit against a degrading fake backend"""
+    
+    async def test_limit_discovered(self):
+        """Test the scheduler settles near the backend's capacity"""
+        scheduler = FairScheduler(adaptive=AdaptiveLimit(initial=1, max_limit=64))
+        active = 0
+        
+        async def call():
+            nonlocal active
+            async with scheduler.slot("ip:eval"):
+                active += 1
+                try:
+                    await asyncio.sleep(backend_latency(active))
+                finally:
+                    active -= 1
+        
+        await asyncio.gather(*(call() for _ in range(600)))
+        
+        assert CAPACITY <= scheduler.limit <= CAPACITY * 3
+    
+    async def test_errors_lower_limit(self):
+        """Test backend errors inside the slot back the limit off"""
+        scheduler = FairScheduler(adaptive=AdaptiveLimit(initial=10))
+        with pytest.raises(LLMServiceError):
+            async with scheduler.slot("ip:a"):
+                raise LLMServiceError("backend down")
+        assert scheduler.limit == 9
+        assert scheduler.in_flight == 0
+    
+    async def test_client_side_errors_not_sampled(self):
+        """Test deadline, validation and cancellation exits leave the limit alone"""
+        scheduler = FairScheduler(adaptive=AdaptiveLimit(initial=8))
+        for error in (
+            DeadlineExceededError("too slow"),
+            ValidationError("bad input"),
+            asyncio.CancelledError(),
+        ):
+            for _ in range(30):
+                with pytest.raises(type(error)):
+                    async with scheduler.slot("ip:a"):
+                        raise error
+        assert scheduler.limit == 8
+        assert scheduler.in_flight == 0
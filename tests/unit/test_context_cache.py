@@ -0,0 +1,59 @@
+"""Tests for Ollama KV context cache"""
+
+from array import array
+from app.services.context_cache import ContextCache
+
+
+class TestContextCache:
+    """Test per-session context storage"""
+    
+    def test_put_and_get(self):
+        """Test stored context is returned as a compact int array"""
+        cache = ContextCache()
+        cache.put("s1", "llama3", [1, 2, 3], 1)
+        context = cache.get("s1", "llama3", 1)
+        assert isinstance(context, array)
+        assert context.typecode == "i"
+        assert context.tolist() == [1, 2, 3]
+    
+    def test_missing_session(self):
+        """Test unknown session returns None"""
+        assert ContextCache().get("missing", "llama3", 1) is None
+    
+    def test_model_change_invalidates(self):
+        """Test context from another model is never reused"""
+        cache = ContextCache()
+        cache.put("s1", "llama3", [1, 2, 3], 1)
+        assert cache.get("s1", "mistral", 1) is None
+        assert len(cache) == 0
+    
+    def test_oversized_context_dropped(self):
+        """Test contexts longer than max_tokens are not kept"""
+        cache = ContextCache(max_tokens=2)
+        cache.put("s1", "llama3", [1], 1)
+        cache.put("s1", "llama3", [1, 2, 3], 1)
+        assert cache.get("s1", "llama3", 1) is None
+    
+    def test_lru_eviction(self):
+        """Test least recently used session is evicted beyond max_sessions"""
+        cache = ContextCache(max_sessions=2)
+        cache.put("s1", "llama3", [1], 1)
+        cache.put("s2", "llama3", [2], 1)
+        cache.get("s1", "llama3", 1)
+        cache.put("s3", "llama3", [3], 1)
+        assert cache.get("s2", "llama3", 1) is None
+        assert cache.get("s1", "llama3", 1) is not None
+    
+    def test_discard(self):
+        """Test discard forgets a session"""
+        cache = ContextCache()
+        cache.put("s1", "llama3", [1], 1)
+        cache.discard("s1")
+        assert cache.get("s1", "llama3", 1) is None
+    
+    def test_turn_count_mismatch_invalidates(self):
+        """Test a context covering other turns than the history is dropped"""
+        cache = ContextCache()
+        cache.put("s1", "llama3", [1, 2, 3], 2)
+        assert cache.get("s1", "llama3", 3) is None
+        assert len(cache) == 0
@@ -0,0 +1,98 @@
+"""Tests for micro-batched embeddings"""
+
+import asyncio
+import time
+import pytest
+from unittest.mock import AsyncMock
+from app.core.exceptions import DeadlineExceededError
+from app.core.metrics import metrics
+from app.services.embedding_batcher import BatchedEmbeddingService, EmbeddingBatcher
+
+
+def fake_embed(delay: float = 0.0):
+    """Batch embedding call returning [len(text)] per text"""
+
+    async def embed(texts, deadline=None):
+        await asyncio.sleep(delay)
+        return [[float(len(text))] for text in texts]
+
+    return AsyncMock(side_effect=embed)
+
+
+@pytest.mark.asyncio
+class TestEmbeddingBatcher:
+    """Test coalescing, fan-out, errors and deadlines"""
+
+    @pytest.fixture(autouse=True)
+    def reset_metrics(self):
+        metrics.reset()
+
+    async def test_concurrent_requests_share_one_call(self):
+        """Test concurrent callers are sent together and get their own vectors"""
+        embed = fake_embed()
+        batcher = EmbeddingBatcher(embed, max_batch_size=32, max_wait=0.01)
+        results = await asyncio.gather(
+            batcher.embed(["a"]), batcher.embed(["bb", "ccc"]), batcher.embed(["dddd"])
+        )
+        assert results == [[[1.0]], [[2.0], [3.0]], [[4.0]]]
+        embed.assert_awaited_once()
+        assert embed.await_args.args[0] == ["a", "bb", "ccc", "dddd"]
+        assert metrics.counter("embed_batch.requests") == 3
+        assert metrics.counter("embed_batch.batches") == 1
+
+    async def test_identical_texts_embedded_once(self):
+        """Test a text requested by several callers is sent once"""
+        embed = fake_embed()
+        batcher = EmbeddingBatcher(embed, max_wait=0.01)
+        first, second = await asyncio.gather(batcher.embed(["hi"]), batcher.embed(["hi"]))
+        assert first == second == [[2.0]]
+        assert embed.await_args.args[0] == ["hi"]
+
+    async def test_full_batch_sent_without_waiting(self):
+        """Test reaching max_batch_size sends immediately and splits the rest"""
+        embed = fake_embed()
+        batcher = EmbeddingBatcher(embed, max_batch_size=2, max_wait=10.0)
+        started = time.monotonic()
+        await asyncio.gather(batcher.embed(["a", "b"]), batcher.embed(["c", "d"]))
+        assert time.monotonic() - started < 1.0
+        assert [call.args[0] for call in embed.await_args_list] == [["a", "b"], ["c", "d"]]
+        assert metrics.snapshot()["summaries"]["embed_batch.fill_ratio"]["avg"] == 1.0
+
+    async def test_error_reaches_every_caller(self):
+        """Test a failed batch call fails each request in it"""
+        batcher = EmbeddingBatcher(AsyncMock(side_effect=RuntimeError("down")), max_wait=0.01)
+        results = await asyncio.gather(
+            batcher.embed(["a"]), batcher.embed(["b"]), return_exceptions=True
+        )
+        assert all(isinstance(result, RuntimeError) for result in results)
+
+    async def test_batch_sent_with_latest_deadline(self):
+        """Test the batch call gets the latest deadline of its callers"""
+        embed = fake_embed()
+        batcher = EmbeddingBatcher(embed, max_wait=0.01)
+        soon, later = time.monotonic() + 5, time.monotonic() + 10
+        await asyncio.gather(
+            batcher.embed(["a"], deadline=soon), batcher.embed(["b"], deadline=later)
+        )
+        assert embed.await_args.kwargs["deadline"] == later
+
+    async def test_caller_deadline_exceeded(self):
+        """Test a caller stops waiting at its own deadline; others still get results"""
+        batcher = EmbeddingBatcher(fake_embed(delay=0.2), max_wait=0.01)
+        hurried = batcher.embed(["a"], deadline=time.monotonic() + 0.05)
+        patient = batcher.embed(["b"])
+        results = await asyncio.gather(hurried, patient, return_exceptions=True)
+        assert isinstance(results[0], DeadlineExceededError)
+        assert results[1] == [[1.0]]
+
+    async def test_service_routes_embeddings_through_batcher(self):
+        """Test the wrapper batches embed and passes generate through"""
+        inner = AsyncMock()
+        inner.generate = AsyncMock(return_value="answer")
+        embed = fake_embed()
+        service = BatchedEmbeddingService(inner, EmbeddingBatcher(embed, max_wait=0.01))
+
+        assert await service.generate("hi", session_id="s1") == "answer"
+        await asyncio.gather(service.embed(["a"]), service.embed(["b"]))
+        embed.assert_awaited_once()
+        inner.embed.assert_not_awaited()
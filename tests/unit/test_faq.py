@@ -0,0 +1,187 @@
+"""Tests for FAQ table"""
+
+import asyncio
+import json
+import time
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import AsyncMock
+from app.core.config import get_settings
+from app.services import faq as faq_module
+from app.services.faq import (
+    FAQEntry,
+    FAQTable,
+    clear_faq_table,
+    generate_missing_answers,
+    get_faq_table,
+    load_faq_entries,
+    normalise,
+)
+
+
+@pytest.fixture
+def table():
+    return FAQTable([
+        FAQEntry("projects", ("What projects have you built?", "프로젝트 소개해 주세요"), "Projects."),
+        FAQEntry("skills", ("What is your tech stack?",), "Skills."),
+        FAQEntry("draft", ("Unanswered question?",), ""),
+    ])
+
+
+class TestNormalise:
+    """Test question normalisation"""
+    
+    def test_case_and_punctuation_ignored(self):
+        """Test case, punctuation and spacing do not matter"""
+        assert normalise("What  is your Tech-Stack?") == ("what", "is", "your", "tech", "stack")
+    
+    def test_hangul_tokens(self):
+        """Test Korean words are kept as tokens"""
+        assert normalise("프로젝트 소개해 주세요!") == ("프로젝트", "소개해", "주세요")
+
+
+class TestFAQTable:
+    """Test FAQ matching"""
+    
+    def test_exact_match(self, table):
+        """Test normalised exact question matches"""
+        assert table.match("what projects have you built").id == "projects"
+    
+    def test_korean_match(self, table):
+        """Test Korean questions match"""
+        assert table.match("프로젝트 소개해 주세요").id == "projects"
+    
+    def test_fuzzy_match(self, table):
+        """Test a reordered question with high token overlap matches"""
+        assert table.match("your tech stack is what?").id == "skills"
+    
+    def test_unrelated_falls_through(self, table):
+        """Test unrelated questions do not match"""
+        assert table.match("What did you eat today?") is None
+    
+    def test_entries_without_answer_skipped(self, table):
+        """Test entries without an answer are never served"""
+        assert len(table) == 2
+        assert table.match("Unanswered question?") is None
+    
+    def test_match_is_sub_millisecond(self, table):
+        """Test a match costs well under a millisecond"""
+        started = time.perf_counter()
+        for _ in range(1000):
+            table.match("Which technologies are in your tech stack?")
+        assert (time.perf_counter() - started) / 1000 < 0.001
+
+
+class TestLoadFAQ:
+    """Test FAQ file loading"""
+    
+    def test_load_entries(self, tmp_path):
+        """Test entries and null answers are loaded"""
+        path = tmp_path / "faq.json"
+        path.write_text(json.dumps({"entries": [
+            {"id": "a", "questions": ["q1", "q2"], "answer": "A"},
+            {"id": "b", "questions": ["q3"], "answer": None},
+        ]}), encoding="utf-8")
+        
+        entries = load_faq_entries(path)
+        
+        assert entries[0] == FAQEntry("a", ("q1", "q2"), "A")
+        assert entries[1].answer == ""
+    
+    def test_shipped_faq_file_loads(self):
+        """Test the curated FAQ file in the repo is valid"""
+        entries = load_faq_entries("app/data/faq.json")
+        assert {entry.id for entry in entries} >= {"projects", "skills", "contact"}
+
+
+@pytest.mark.asyncio
+class TestGenerateMissingAnswers:
+    """Test filling null answers through the LLM"""
+    
+    @pytest.fixture
+    def path(self, tmp_path):
+        path = tmp_path / "faq.json"
+        path.write_text(json.dumps({"entries": [
+            {"id": "a", "questions": ["q1"], "answer": "A"},
+            {"id": "b", "questions": ["q2", "q3"], "answer": None},
+        ]}), encoding="utf-8")
+        return path
+    
+    async def test_answers_generated_and_saved(self, path, mock_llm_service):
+        """Test null answers are generated from the first question and persisted"""
+        filled = await generate_missing_answers(path, mock_llm_service)
+        
+        assert filled == 1
+        mock_llm_service.generate.assert_awaited_once()
+        assert mock_llm_service.generate.await_args.args[0] == "q2"
+        assert len(FAQTable(load_faq_entries(path))) == 2
+    
+    async def test_truncated_answer_not_saved(self, path, mock_llm_service):
+        """Test an answer that hit its token limit stays null"""
+        async def generate(prompt, *, outcome=None, **kwargs):
+            outcome.done_reason = "length"
+            return "Cut"
+        mock_llm_service.generate = AsyncMock(side_effect=generate)
+        
+        assert await generate_missing_answers(path, mock_llm_service) == 0
+        assert load_faq_entries(path)[1].answer == ""
+    
+    async def test_concurrent_workers_generate_once(self, path, mock_llm_service):
+        """Test a second worker waits for the file and finds it filled"""
+        async def generate(prompt, *, outcome=None, **kwargs):
+            await asyncio.sleep(0.05)
+            outcome.done_reason = "stop"
+            return "B"
+        mock_llm_service.generate = AsyncMock(side_effect=generate)
+        
+        filled = await asyncio.gather(
+            generate_missing_answers(path, mock_llm_service),
+            generate_missing_answers(path, mock_llm_service),
+        )
+        
+        assert sorted(filled) == [0, 1]
+        mock_llm_service.generate.assert_awaited_once()
+        assert load_faq_entries(path)[1].answer == "B"
+
+
+class TestGetFAQTable:
+    """Test the startup factory"""
+    
+    def test_warns_without_answers(self, tmp_path, monkeypatch, caplog):
+        """Test a table with nothing to serve is logged"""
+        path = tmp_path / "faq.json"
+        path.write_text(json.dumps({"entries": [
+            {"id": "b", "questions": ["q"], "answer": None},
+        ]}), encoding="utf-8")
+        monkeypatch.setattr(get_settings(), "faq_path", str(path))
+        clear_faq_table()
+        
+        try:
+            assert len(get_faq_table()) == 0
+        finally:
+            clear_faq_table()
+        assert "no answers" in caplog.text
+    
+    def test_built_once_by_concurrent_callers(self, tmp_path, monkeypatch):
+        """Test first callers racing on the factory share one table"""
+        path = tmp_path / "faq.json"
+        path.write_text(json.dumps({"entries": [
+            {"id": "a", "questions": ["q"], "answer": "A"},
+        ]}), encoding="utf-8")
+        monkeypatch.setattr(get_settings(), "faq_path", str(path))
+        loads = []
+        
+        def slow_load(faq_path):
+            loads.append(faq_path)
+            time.sleep(0.05)
+            return load_faq_entries(faq_path)
+        monkeypatch.setattr(faq_module, "load_faq_entries", slow_load)
+        clear_faq_table()
+        
+        try:
+            with ThreadPoolExecutor(max_workers=4) as pool:
+                tables = list(pool.map(lambda _: get_faq_table(), range(4)))
+        finally:
+            clear_faq_table()
+        assert len(loads) == 1
+        assert all(table is tables[0] for table in tables)
@@ -1,8 +1,30 @@
 """Tests for guardrails module"""
 
+import asyncio
+import time
 import pytest
-from app.core.guardrails import validate_input, validate_output
+from app.core.guardrails import (
+    GuardrailPool,
+    validate_input,
+    validate_input_async,
+    validate_inputs,
+    validate_inputs_async,
+    validate_output,
+)
 from app.core.exceptions import ValidationError
+from app.core.metrics import metrics
+
+# Unclosed script tags make the script pattern rescan the rest of the input:
+# tens of milliseconds of regex work at the maximum length
+PATHOLOGICAL_INPUT = "<script>" * 1250
+
+
+@pytest.fixture(scope="module")
+def pool():
+    pool = GuardrailPool(max_workers=2, timeout=30.0)
+    pool.start()
+    yield pool
+    pool.shutdown()
 
 
 class TestValidateInput:
@@ -79,6 +101,113 @@ class TestValidateInput:
             validate_input("window.location")
 
 
+class TestValidateInputs:
+    """Test batch input validation"""
+    
+    def test_mixed_batch(self):
+        """Test each input gets its cleaned text or its error"""
+        results = validate_inputs([" ok ", "<script>x</script>", ""])
+        assert results[0] == "ok"
+        assert isinstance(results[1], ValidationError)
+        assert isinstance(results[2], ValidationError)
+    
+    def test_max_length_per_item(self):
+        """Test max_length applies to each item"""
+        results = validate_inputs(["a" * 5, "a" * 6], max_length=5)
+        assert results[0] == "a" * 5
+        assert isinstance(results[1], ValidationError)
+
+
+async def _max_loop_lag(work) -> float:
+    """Largest delay (seconds) of a 1 ms ticker while `work()` runs"""
+    lag = 0.0
+    done = False
+
+    async def ticker():
+        nonlocal lag
+        while not done:
+            started = time.perf_counter()
+            await asyncio.sleep(0.001)
+            lag = max(lag, time.perf_counter() - started - 0.001)
+
+    task = asyncio.create_task(ticker())
+    await asyncio.sleep(0.01)
+    try:
+        await work()
+    finally:
+        done = True
+        await task
+    return lag
+
+
+@pytest.mark.asyncio
+class TestGuardrailPool:
+    """Test size-based offload of guardrail checks"""
+    
+    async def test_small_input_inline(self, pool):
+        """Test inputs under the threshold are not sent to the pool"""
+        metrics.reset()
+        assert await validate_input_async(" hello ", pool=pool) == "hello"
+        assert metrics.counter("guardrails.offloaded") == 0
+    
+    async def test_large_input_offloaded(self, pool):
+        """Test large inputs are checked in the pool with the same results"""
+        metrics.reset()
+        assert await validate_input_async("a" * 5000, pool=pool) == "a" * 5000
+        with pytest.raises(ValidationError):
+            await validate_input_async("a" * 5000 + "<script>x</script>", pool=pool)
+        assert metrics.counter("guardrails.offloaded") == 2
+    
+    async def test_long_chat_message_offloaded(self, pool):
+        """Test a single message within ChatRequest's limit can reach the pool"""
+        metrics.reset()
+        message = "on" * 500  # ChatRequest.message max_length is 1000
+        assert await validate_input_async(message, pool=pool) == message
+        assert metrics.counter("guardrails.offloaded") == 1
+    
+    async def test_large_batch_offloaded(self, pool):
+        """Test a batch is offloaded by its total size"""
+        metrics.reset()
+        results = await validate_inputs_async(["a" * 900] * 3 + ["<iframe>"], 1000, pool=pool)
+        assert results[:3] == ["a" * 900] * 3
+        assert isinstance(results[3], ValidationError)
+        assert metrics.counter("guardrails.offloaded") == 1
+    
+    async def test_timeout_fails_closed(self, pool):
+        """Test a check over the time limit rejects the input"""
+        slow_pool = GuardrailPool(max_workers=1, inline_max_chars=0, timeout=0.001)
+        try:
+            with pytest.raises(ValidationError, match="in time"):
+                await validate_input_async(PATHOLOGICAL_INPUT, pool=slow_pool)
+            results = await validate_inputs_async([PATHOLOGICAL_INPUT] * 2, pool=slow_pool)
+        finally:
+            slow_pool.shutdown()
+        assert all(isinstance(result, ValidationError) for result in results)
+    
+    async def test_no_workers_stays_inline(self):
+        """Test max_workers=0 checks everything inline"""
+        metrics.reset()
+        inline = GuardrailPool(max_workers=0)
+        assert await validate_input_async("a" * 5000, pool=inline) == "a" * 5000
+        assert metrics.counter("guardrails.offloaded") == 0
+    
+    async def test_event_loop_lag_under_large_payloads(self, pool):
+        """Test concurrent pathological payloads do not stall the event loop"""
+        inline = GuardrailPool(max_workers=0)
+        await validate_input_async("a" * 5000, pool=pool)  # workers are warm
+
+        def checks(p):
+            return lambda: asyncio.gather(
+                *(validate_input_async(PATHOLOGICAL_INPUT, pool=p) for _ in range(4))
+            )
+
+        inline_lag = await _max_loop_lag(checks(inline))
+        offloaded_lag = await _max_loop_lag(checks(pool))
+
+        assert offloaded_lag < 0.025
+        assert offloaded_lag < inline_lag / 2
+
+
 class TestValidateOutput:
     """Test output validation"""
     
@@ -0,0 +1,304 @@
+"""Tests for hedged LLM requests"""
+
+import asyncio
+import pytest
+from app.core.metrics import metrics
+from app.services.context_cache import ContextCache
+from app.services.generation import GenerationOutcome
+from app.services.hedging import (
+    CALL_TYPES,
+    HedgeBudget,
+    HedgedLLMService,
+    LatencyTracker,
+)
+from app.services.llm_service import LLMServiceError
+
+
+class FakeBackend:
+    """Backend answering with its name after a fixed delay"""
+
+    def __init__(self, name, delay=0.0, error=None):
+        self.name = name
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+        self.cancelled = 0
+        self.session_ids = []
+
+    async def generate(self, prompt, outcome=None, session_id=None, **kwargs):
+        self.calls += 1
+        self.session_ids.append(session_id)
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.error is not None:
+            raise self.error
+        if outcome is not None:
+            outcome.done_reason = f"{self.name} stop"
+        return self.name
+
+    async def embed(self, texts, **kwargs):
+        await asyncio.sleep(self.delay)
+        return [[float(len(self.name))] for _ in texts]
+
+
+class StoringBackend(FakeBackend):
+    """Backend that has stored a session context before it answers"""
+
+    def __init__(self, name, cache, delay=0.0):
+        super().__init__(name, delay)
+        self.cache = cache
+
+    async def generate(self, prompt, outcome=None, session_id=None, **kwargs):
+        if session_id is not None:
+            self.cache.put(session_id, "llama3", [1, 2, 3], turns=1)
+        return await super().generate(
+            prompt, outcome=outcome, session_id=session_id, **kwargs
+        )
+
+
+def make_service(
+    primary, secondary, budget_percent=100.0, delay=0.01, context_cache=None
+):
+    budget = HedgeBudget(percent=budget_percent)
+    return HedgedLLMService(
+        [primary, secondary],
+        {call_type: LatencyTracker(min_samples=5) for call_type in CALL_TYPES},
+        budget,
+        initial_delay=delay,
+        context_cache=context_cache,
+    )
+
+
+class TestLatencyTracker:
+    """Test percentile-based hedge delay"""
+
+    def test_no_percentile_before_min_samples(self):
+        """Test percentile is unknown until enough samples are seen"""
+        tracker = LatencyTracker(min_samples=3)
+        tracker.record(1.0)
+        tracker.record(2.0)
+
+        assert tracker.percentile(95) is None
+
+    def test_percentile(self):
+        """Test percentile over the window"""
+        tracker = LatencyTracker(min_samples=1)
+        for value in range(1, 101):
+            tracker.record(value / 100)
+
+        assert tracker.percentile(50) == 0.51
+        assert tracker.percentile(95) == 0.96
+
+    def test_window_is_bounded(self):
+        """Test old samples drop out of the window"""
+        tracker = LatencyTracker(window=10, min_samples=1)
+        for _ in range(10):
+            tracker.record(5.0)
+        for _ in range(10):
+            tracker.record(0.1)
+
+        assert len(tracker) == 10
+        assert tracker.percentile(99) == 0.1
+
+
+class TestHedgeBudget:
+    """Test hedge rate cap"""
+
+    def test_caps_hedges_to_share_of_traffic(self):
+        """Test at most `percent` of requests may be hedged"""
+        budget = HedgeBudget(percent=10)
+        hedges = 0
+        for _ in range(1000):
+            budget.deposit()
+            hedges += budget.try_spend()
+
+        assert hedges == pytest.approx(100, abs=1)
+
+    def test_burst_is_bounded(self):
+        """Test an idle period saves up at most `burst` hedges"""
+        budget = HedgeBudget(percent=100, burst=3)
+        for _ in range(50):
+            budget.deposit()
+
+        assert [budget.try_spend() for _ in range(4)] == [True, True, True, False]
+
+
+@pytest.mark.asyncio
+class TestHedgedLLMService:
+    """Test hedging between a primary and a secondary backend"""
+
+    def setup_method(self):
+        metrics.reset()
+
+    async def test_fast_primary_is_not_hedged(self):
+        """Test no duplicate is sent when the primary answers in time"""
+        primary = FakeBackend("primary")
+        secondary = FakeBackend("secondary")
+        service = make_service(primary, secondary, delay=0.1)
+
+        assert await service.generate("hi") == "primary"
+        assert secondary.calls == 0
+        assert metrics.counter("llm.hedge.sent") == 0
+
+    async def test_slow_primary_loses_to_hedge(self):
+        """Test the hedge answers first and the primary call is cancelled"""
+        primary = FakeBackend("primary", delay=1.0)
+        secondary = FakeBackend("secondary")
+        service = make_service(primary, secondary)
+
+        assert await service.generate("hi") == "secondary"
+        assert primary.cancelled == 1
+        assert metrics.counter("llm.hedge.sent") == 1
+        assert metrics.counter("llm.hedge.won") == 1
+
+    async def test_winner_outcome_reported(self):
+        """Test the caller gets the outcome of the call that answered"""
+        primary = FakeBackend("primary", delay=1.0)
+        secondary = FakeBackend("secondary")
+        service = make_service(primary, secondary)
+        outcome = GenerationOutcome()
+
+        await service.generate("hi", outcome=outcome)
+        assert outcome.done_reason == "secondary stop"
+
+    async def test_primary_still_wins_after_hedge(self):
+        """Test a hedged primary that finishes first cancels the hedge"""
+        primary = FakeBackend("primary", delay=0.02)
+        secondary = FakeBackend("secondary", delay=1.0)
+        service = make_service(primary, secondary)
+
+        assert await service.generate("hi") == "primary"
+        assert secondary.cancelled == 1
+        assert metrics.counter("llm.hedge.won") == 0
+
+    async def test_only_primary_uses_session_context(self):
+        """Test the hedge is sent without the session, so it stores nothing"""
+        primary = FakeBackend("primary", delay=0.05)
+        secondary = FakeBackend("secondary", delay=1.0)
+        service = make_service(primary, secondary)
+
+        await service.generate("hi", session_id="s1")
+        assert primary.session_ids == ["s1"]
+        assert secondary.session_ids == [None]
+
+    async def test_losing_primary_context_discarded(self):
+        """Test a context stored by a primary that lost is dropped"""
+        cache = ContextCache()
+        primary = StoringBackend("primary", cache, delay=1.0)
+        secondary = StoringBackend("secondary", cache)
+        service = make_service(primary, secondary, context_cache=cache)
+
+        assert await service.generate("hi", session_id="s1") == "secondary"
+        assert cache.get("s1", "llama3", 1) is None
+
+    async def test_winning_primary_context_kept(self):
+        """Test the primary's context survives when it answers first"""
+        cache = ContextCache()
+        primary = StoringBackend("primary", cache, delay=0.02)
+        secondary = StoringBackend("secondary", cache, delay=1.0)
+        service = make_service(primary, secondary, context_cache=cache)
+
+        assert await service.generate("hi", session_id="s1") == "primary"
+        assert list(cache.get("s1", "llama3", 1)) == [1, 2, 3]
+
+    async def test_budget_exhausted(self):
+        """Test no hedge is sent without budget"""
+        primary = FakeBackend("primary", delay=0.03)
+        secondary = FakeBackend("secondary")
+        service = make_service(primary, secondary, budget_percent=0)
+
+        assert await service.generate("hi") == "primary"
+        assert secondary.calls == 0
+        assert metrics.counter("llm.hedge.budget_exhausted") == 1
+
+    async def test_failed_call_falls_back_to_other(self):
+        """Test a failing backend does not fail a hedged request"""
+        primary = FakeBackend("primary", delay=0.05, error=LLMServiceError("down"))
+        secondary = FakeBackend("secondary", delay=0.1)
+        service = make_service(primary, secondary)
+
+        assert await service.generate("hi") == "secondary"
+
+    async def test_all_failed_raises(self):
+        """Test the error is raised when every backend fails"""
+        primary = FakeBackend("primary", error=LLMServiceError("down"))
+        secondary = FakeBackend("secondary")
+        service = make_service(primary, secondary)
+
+        with pytest.raises(LLMServiceError):
+            await service.generate("hi")
+        assert secondary.calls == 0
+
+    async def test_delay_follows_primary_latency(self):
+        """Test the hedge delay becomes the primary's latency percentile"""
+        primary = FakeBackend("primary", delay=0.02)
+        secondary = FakeBackend("secondary", delay=1.0)
+        service = make_service(primary, secondary, delay=5.0)
+        for _ in range(5):
+            await service.generate("hi")
+
+        assert 0.02 <= service.hedge_delay() < 0.1
+
+    async def test_call_types_tracked_separately(self):
+        """Test fast embeddings do not lower the hedge delay of generations"""
+        primary = FakeBackend("primary", delay=0.02)
+        secondary = FakeBackend("secondary", delay=1.0)
+        service = make_service(primary, secondary, delay=5.0)
+        for _ in range(5):
+            await service.embed(["a"])
+
+        assert len(service.trackers["embed"]) == 5
+        assert service.hedge_delay("generate") == 5.0
+
+    async def test_losing_primary_latency_recorded(self):
+        """Test the primary's elapsed time is recorded when the hedge wins"""
+        primary = FakeBackend("primary", delay=1.0)
+        secondary = FakeBackend("secondary", delay=0.02)
+        service = make_service(primary, secondary)
+
+        await service.generate("hi")
+        tracker = service.trackers["generate"]
+        tracker.min_samples = 1
+        assert len(tracker) == 1
+        assert tracker.percentile(50) >= 0.03
+
+    async def test_failed_primary_not_recorded(self):
+        """Test a fast-failing primary does not add a latency sample"""
+        primary = FakeBackend("primary", error=LLMServiceError("down"))
+        secondary = FakeBackend("secondary")
+        service = make_service(primary, secondary)
+
+        with pytest.raises(LLMServiceError):
+            await service.generate("hi")
+        assert len(service.trackers["generate"]) == 0
+
+    async def test_embed_is_hedged(self):
+        """Test embeddings use the same hedging"""
+        primary = FakeBackend("primary", delay=1.0)
+        secondary = FakeBackend("secondary")
+        service = make_service(primary, secondary)
+
+        assert await service.embed(["a", "b"]) == [[9.0], [9.0]]
+
+    async def test_caller_cancellation_cancels_calls(self):
+        """Test cancelling the caller cancels both backend calls"""
+        primary = FakeBackend("primary", delay=1.0)
+        secondary = FakeBackend("secondary", delay=1.0)
+        service = make_service(primary, secondary)
+
+        task = asyncio.create_task(service.generate("hi"))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        assert primary.cancelled == 1
+        assert secondary.cancelled == 1
+
+    async def test_needs_two_backends(self):
+        """Test a single backend is rejected"""
+        with pytest.raises(ValueError):
+            HedgedLLMService([FakeBackend("only")], {}, HedgeBudget())
@@ -1,12 +1,33 @@
+import json
+import time
 import pytest
 import httpx
 from unittest.mock import AsyncMock, MagicMock, patch
+from app.core.exceptions import DeadlineExceededError
+from app.core.metrics import metrics
+from app.services.context_cache import ContextCache
+from app.services.generation import GenerationOutcome
 from app.services.llm_service import (
     OllamaService, 
     LLMServiceError
 )
 
 
+def _mock_client_returning(mock_client_class, *payloads):
+    """Configure patched AsyncClient to return the given JSON bodies in order"""
+    mock_client = AsyncMock()
+    responses = []
+    for payload in payloads:
+        mock_response = MagicMock()
+        mock_response.json.return_value = payload
+        responses.append(mock_response)
+    mock_client.post = AsyncMock(side_effect=responses)
+    mock_client.__aenter__.return_value = mock_client
+    mock_client.__aexit__.return_value = None
+    mock_client_class.return_value = mock_client
+    return mock_client
+
+
 @pytest.mark.asyncio
 class TestOllamaService:
     
@@ -78,3 +99,301 @@ class TestOllamaService:
             
             with pytest.raises(LLMServiceError):
                 await service.generate("test prompt")
+
+
+@pytest.mark.asyncio
+class TestOllamaContextReuse:
+    
+    @pytest.fixture
+    def service(self):
+        return OllamaService(
+            base_url="http://localhost:11434",
+            model_name="llama3",
+            context_cache=ContextCache()
+        )
+    
+    async def test_context_reused_on_next_turn(self, service):
+        """Test returned context is sent back with only the new turn"""
+        with patch("app.services.llm_service.httpx.AsyncClient") as mock_client_class:
+            mock_client = _mock_client_returning(
+                mock_client_class,
+                {"response": "first", "context": [1, 2, 3]},
+                {"response": "second", "context": [1, 2, 3, 4, 5]},
+            )
+            
+            await service.generate("q1", session_id="s1")
+            await service.generate(
+                "full history q2", session_id="s1", turn_prompt="q2", history_turns=1
+            )
+            
+            payload = mock_client.post.call_args.kwargs["json"]
+            assert payload["prompt"] == "q2"
+            assert payload["context"] == [1, 2, 3]
+            assert service.context_cache.get("s1", "llama3", 2).tolist() == [1, 2, 3, 4, 5]
+    
+    async def test_full_prompt_without_cached_context(self, service):
+        """Test full prompt is sent when no context is cached"""
+        with patch("app.services.llm_service.httpx.AsyncClient") as mock_client_class:
+            mock_client = _mock_client_returning(mock_client_class, {"response": "ok"})
+            
+            await service.generate(
+                "full history q2", session_id="s1", turn_prompt="q2", history_turns=1
+            )
+            
+            payload = mock_client.post.call_args.kwargs["json"]
+            assert payload["prompt"] == "full history q2"
+            assert "context" not in payload
+    
+    async def test_model_change_falls_back_to_full_prompt(self, service):
+        """Test context produced by another model is not reused"""
+        service.context_cache.put("s1", "mistral", [9, 9], 1)
+        with patch("app.services.llm_service.httpx.AsyncClient") as mock_client_class:
+            mock_client = _mock_client_returning(mock_client_class, {"response": "ok"})
+            
+            await service.generate(
+                "full history q2", session_id="s1", turn_prompt="q2", history_turns=1
+            )
+            
+            payload = mock_client.post.call_args.kwargs["json"]
+            assert payload["prompt"] == "full history q2"
+            assert "context" not in payload
+    
+    async def test_stale_context_falls_back_to_full_prompt(self, service):
+        """Test a context missing turns answered elsewhere is not reused"""
+        service.context_cache.put("s1", "llama3", [1, 2, 3], 1)
+        with patch("app.services.llm_service.httpx.AsyncClient") as mock_client_class:
+            mock_client = _mock_client_returning(
+                mock_client_class, {"response": "ok", "context": [4, 5]}
+            )
+            
+            await service.generate(
+                "q1 q2 q3", session_id="s1", turn_prompt="q3", history_turns=2
+            )
+            
+            payload = mock_client.post.call_args.kwargs["json"]
+            assert payload["prompt"] == "q1 q2 q3"
+            assert "context" not in payload
+            assert service.context_cache.get("s1", "llama3", 3).tolist() == [4, 5]
+    
+    async def test_prompt_eval_time_recorded(self, service):
+        """Test prompt evaluation time is recorded per reuse kind"""
+        metrics.reset()
+        with patch("app.services.llm_service.httpx.AsyncClient") as mock_client_class:
+            _mock_client_returning(
+                mock_client_class,
+                {"response": "a", "context": [1], "prompt_eval_duration": 900_000_000},
+                {"response": "b", "context": [1, 2], "prompt_eval_duration": 50_000_000},
+            )
+            
+            await service.generate("q1", session_id="s1")
+            await service.generate(
+                "q1 q2", session_id="s1", turn_prompt="q2", history_turns=1
+            )
+        
+        summaries = metrics.snapshot()["summaries"]
+        assert summaries["llm.prompt_eval_ms.full_prompt"]["avg"] == 900
+        assert summaries["llm.prompt_eval_ms.context_reuse"]["avg"] == 50
+
+
+@pytest.mark.asyncio
+class TestOllamaDeadline:
+    
+    @pytest.fixture
+    def service(self):
+        return OllamaService(
+            base_url="http://localhost:11434",
+            model_name="llama3",
+            timeout=30.0,
+            min_budget=0.5,
+            tokens_per_second=20.0,
+            max_predict=512,
+            min_predict=64
+        )
+    
+    async def test_timeout_and_num_predict_follow_budget(self, service):
+        """Test HTTP timeout and num_predict are sized to the remaining budget"""
+        with patch("app.services.llm_service.httpx.AsyncClient") as mock_client_class:
+            mock_client = _mock_client_returning(mock_client_class, {"response": "ok"})
+            
+            await service.generate("q", deadline=time.monotonic() + 5)
+            
+            timeout = mock_client_class.call_args.kwargs["timeout"]
+            assert 4 < timeout <= 5
+            num_predict = mock_client.post.call_args.kwargs["json"]["options"]["num_predict"]
+            assert 80 < num_predict <= 100
+    
+    async def test_num_predict_capped(self, service):
+        """Test num_predict never exceeds max_predict"""
+        with patch("app.services.llm_service.httpx.AsyncClient") as mock_client_class:
+            mock_client = _mock_client_returning(mock_client_class, {"response": "ok"})
+            
+            await service.generate("q", deadline=time.monotonic() + 100)
+            
+            assert mock_client_class.call_args.kwargs["timeout"] == 30.0
+            assert mock_client.post.call_args.kwargs["json"]["options"]["num_predict"] == 512
+    
+    async def test_expired_budget_skips_call(self, service):
+        """Test no call is made when the budget is already spent"""
+        with patch("app.services.llm_service.httpx.AsyncClient") as mock_client_class:
+            with pytest.raises(DeadlineExceededError):
+                await service.generate("q", deadline=time.monotonic() + 0.1)
+            mock_client_class.assert_not_called()
+    
+    async def test_timeout_within_budget_is_deadline_error(self, service):
+        """Test a timeout caused by the request budget reports the deadline"""
+        with patch("app.services.llm_service.httpx.AsyncClient") as mock_client_class:
+            mock_client = AsyncMock()
+            mock_client.post = AsyncMock(side_effect=httpx.TimeoutException("timeout"))
+            mock_client.__aenter__.return_value = mock_client
+            mock_client.__aexit__.return_value = None
+            mock_client_class.return_value = mock_client
+            
+            with pytest.raises(DeadlineExceededError):
+                await service.generate("q", deadline=time.monotonic() + 5)
+    
+    async def test_budget_below_min_predict_skips_call(self, service):
+        """Test a budget too short for a useful answer fails instead of truncating"""
+        with patch("app.services.llm_service.httpx.AsyncClient") as mock_client_class:
+            with pytest.raises(DeadlineExceededError):
+                # 2 s at 20 tokens/s leaves 40 tokens, below min_predict
+                await service.generate("q", deadline=time.monotonic() + 2)
+            mock_client_class.assert_not_called()
+    
+    async def test_outcome_reports_truncation(self, service):
+        """Test done_reason and deadline capping are reported to the caller"""
+        metrics.reset()
+        with patch("app.services.llm_service.httpx.AsyncClient") as mock_client_class:
+            _mock_client_returning(
+                mock_client_class, {"response": "cut", "done_reason": "length"}
+            )
+            outcome = GenerationOutcome()
+            
+            await service.generate("q", deadline=time.monotonic() + 5, outcome=outcome)
+            
+            assert outcome.done_reason == "length"
+            assert outcome.deadline_capped
+            assert not outcome.complete
+            assert metrics.counter("llm.generate.truncated") == 1
+    
+    async def test_outcome_complete_without_deadline(self, service):
+        """Test an answer the model finished itself is reported complete"""
+        with patch("app.services.llm_service.httpx.AsyncClient") as mock_client_class:
+            _mock_client_returning(
+                mock_client_class, {"response": "ok", "done_reason": "stop"}
+            )
+            outcome = GenerationOutcome()
+            
+            await service.generate("q", outcome=outcome)
+            
+            assert outcome.complete
+    
+    async def test_no_deadline_keeps_defaults(self, service):
+        """Test calls without a deadline use the fixed timeout and no options"""
+        with patch("app.services.llm_service.httpx.AsyncClient") as mock_client_class:
+            mock_client = _mock_client_returning(mock_client_class, {"response": "ok"})
+            
+            await service.generate("q")
+            
+            assert mock_client_class.call_args.kwargs["timeout"] == 30.0
+            assert "options" not in mock_client.post.call_args.kwargs["json"]
+
+
+@pytest.mark.asyncio
+class TestOllamaEmbed:
+    
+    @pytest.fixture
+    def service(self):
+        return OllamaService(
+            base_url="http://localhost:11434",
+            model_name="llama3",
+            embedding_model="nomic-embed-text"
+        )
+    
+    async def test_embed_success(self, service):
+        """Test texts are embedded in one call"""
+        with patch("app.services.llm_service.httpx.AsyncClient") as mock_client_class:
+            mock_client = _mock_client_returning(
+                mock_client_class, {"embeddings": [[0.1, 0.2], [0.3, 0.4]]}
+            )
+            
+            result = await service.embed(["a", "b"])
+            
+            assert result == [[0.1, 0.2], [0.3, 0.4]]
+            payload = mock_client.post.call_args.kwargs["json"]
+            assert payload == {"model": "nomic-embed-text", "input": ["a", "b"]}
+            assert mock_client.post.call_args.args[0].endswith("/api/embed")
+    
+    async def test_embed_count_mismatch(self, service):
+        """Test a malformed embedding response raises LLMServiceError"""
+        with patch("app.services.llm_service.httpx.AsyncClient") as mock_client_class:
+            _mock_client_returning(mock_client_class, {"embeddings": [[0.1]]})
+            
+            with pytest.raises(LLMServiceError):
+                await service.embed(["a", "b"])
+
+
+@pytest.mark.asyncio
+class TestOllamaStream:
+    
+    @pytest.fixture
+    def service(self):
+        return OllamaService(
+            base_url="http://localhost:11434",
+            model_name="llama3",
+            context_cache=ContextCache()
+        )
+    
+    @staticmethod
+    def _patch_transport(handler):
+        """Patch AsyncClient to answer through `handler`"""
+        real_client = httpx.AsyncClient
+        return patch(
+            "app.services.llm_service.httpx.AsyncClient",
+            lambda timeout: real_client(
+                transport=httpx.MockTransport(handler), timeout=timeout
+            ),
+        )
+    
+    async def test_chunks_streamed(self, service):
+        """Test NDJSON chunks are yielded and the final context cached"""
+        requests = []
+        
+        def handler(request):
+            requests.append(json.loads(request.content))
+            lines = [
+                {"response": "Hel", "done": False},
+                {"response": "lo", "done": False},
+                {"response": "", "done": True, "done_reason": "stop", "context": [7, 8]},
+            ]
+            return httpx.Response(
+                200, content="\n".join(json.dumps(line) for line in lines) + "\n"
+            )
+        
+        outcome = GenerationOutcome()
+        with self._patch_transport(handler):
+            chunks = [
+                chunk
+                async for chunk in service.generate_stream(
+                    "hi", session_id="s1", outcome=outcome
+                )
+            ]
+        
+        assert chunks == ["Hel", "lo"]
+        assert outcome.complete
+        assert requests[0]["stream"] is True
+        assert service.context_cache.get("s1", "llama3", 1).tolist() == [7, 8]
+    
+    async def test_error_line_raises(self, service):
+        """Test an error reported mid-stream raises LLMServiceError"""
+        def handler(request):
+            return httpx.Response(200, content='{"error": "model not found"}\n')
+        
+        with self._patch_transport(handler):
+            with pytest.raises(LLMServiceError, match="model not found"):
+                [chunk async for chunk in service.generate_stream("hi")]
+    
+    async def test_http_error_raises(self, service):
+        """Test an HTTP error status raises LLMServiceError"""
+        with self._patch_transport(lambda request: httpx.Response(500)):
+            with pytest.raises(LLMServiceError):
+                [chunk async for chunk in service.generate_stream("hi")]
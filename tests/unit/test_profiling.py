@@ -0,0 +1,79 @@
+"""Tests for per-request profiling"""
+
+import time
+from app.core.profiling import (
+    Profile,
+    ProfileStore,
+    finish_profile,
+    phase,
+    start_profile,
+)
+
+
+def make_profile(request_id, reason="header"):
+    profile = Profile(method="POST", path="/api/chat")
+    profile.request_id = request_id
+    profile.reason = reason
+    return profile
+
+
+class TestPhase:
+    """Test phase timing"""
+    
+    def test_noop_outside_profile(self):
+        """Test phases outside a profiled request record nothing"""
+        with phase("anything"):
+            pass
+        
+        assert phase("anything") is phase("other")
+    
+    def test_records_phases(self):
+        """Test phases are recorded with offsets and durations"""
+        profile, token = start_profile("POST", "/api/chat")
+        with phase("guardrails.input"):
+            pass
+        with phase("llm.generate"):
+            time.sleep(0.01)
+        finish_profile(profile, token)
+        
+        names = [name for name, _, _ in profile.phases]
+        assert names == ["guardrails.input", "llm.generate"]
+        _, start, duration = profile.phases[1]
+        assert duration >= 10
+        assert profile.total_ms >= start + duration
+        with phase("after"):
+            pass
+        assert len(profile.phases) == 2
+    
+    def test_to_dict(self):
+        """Test time outside the endpoint is reported"""
+        profile = make_profile("req-1")
+        profile.total_ms = 12.0
+        profile.phases = [("llm.generate", 2.0, 7.0), ("endpoint", 1.0, 9.0)]
+        
+        data = profile.to_dict()
+        
+        assert data["outside_endpoint_ms"] == 3.0
+        assert [p["name"] for p in data["phases"]] == ["endpoint", "llm.generate"]
+
+
+class TestProfileStore:
+    """Test bounded profile buffer"""
+    
+    def test_get_by_request_id(self):
+        """Test a stored profile is found by its request id"""
+        store = ProfileStore(capacity=5)
+        store.add(make_profile("req-1"))
+        
+        assert store.get("req-1").request_id == "req-1"
+        assert store.get("missing") is None
+    
+    def test_oldest_evicted(self):
+        """Test the buffer keeps only the newest profiles"""
+        store = ProfileStore(capacity=3)
+        for n in range(5):
+            store.add(make_profile(f"req-{n}"))
+        
+        assert len(store) == 3
+        assert store.get("req-0") is None
+        assert [p.request_id for p in store.recent()] == ["req-4", "req-3", "req-2"]
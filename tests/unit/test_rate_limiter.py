@@ -2,7 +2,9 @@
 
 import pytest
 import time
-from app.middleware.rate_limiter import SlidingWindowRateLimiter
+from starlette.requests import Request
+from app.core.config import get_settings
+from app.middleware.rate_limiter import SlidingWindowRateLimiter, get_client_key
 
 
 class TestSlidingWindowRateLimiter:
@@ -102,3 +104,33 @@ class TestSlidingWindowRateLimiter:
         start_time = time.time()
         for req_time in limiter.requests["192.168.1.1"]:
             assert start_time - req_time < limiter.window_size
+
+
+class TestGetClientKey:
+    """Test client identity for fair scheduling"""
+    
+    @staticmethod
+    def make_request(headers):
+        scope = {
+            "type": "http",
+            "headers": [(k.lower().encode(), v.encode()) for k, v in headers.items()],
+            "client": ("10.0.0.1", 1234),
+        }
+        return Request(scope)
+    
+    def test_ip_without_key(self):
+        """Test requests without an API key are keyed by IP"""
+        assert get_client_key(self.make_request({})) == "ip:10.0.0.1"
+    
+    def test_configured_key(self, monkeypatch):
+        """Test a configured API key identifies the client"""
+        monkeypatch.setattr(get_settings(), "api_keys", ["team-a"])
+        request = self.make_request({"X-API-Key": "team-a"})
+        assert get_client_key(request) == "key:team-a"
+    
+    def test_unknown_key_falls_back_to_ip(self, monkeypatch):
+        """Test made-up keys do not create a new identity"""
+        monkeypatch.setattr(get_settings(), "api_keys", ["team-a"])
+        for key in ("random-1", "random-2"):
+            request = self.make_request({"X-API-Key": key})
+            assert get_client_key(request) == "ip:10.0.0.1"
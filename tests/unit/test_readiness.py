@@ -0,0 +1,57 @@
+"""Tests for the readiness gate"""
+
+import asyncio
+import pytest
+from app.core.readiness import Readiness
+
+
+async def _ok():
+    pass
+
+
+async def _fail():
+    raise RuntimeError("boom")
+
+
+@pytest.mark.asyncio
+class TestReadiness:
+    """Test startup check bookkeeping"""
+    
+    async def test_starting_until_finished(self):
+        """Test the gate stays closed until startup finishes"""
+        readiness = Readiness()
+        await readiness.run("faq_table", _ok())
+        
+        assert not readiness.ready
+        assert readiness.snapshot()["status"] == "starting"
+        readiness.finish()
+        assert readiness.ready
+        assert readiness.snapshot()["checks"]["faq_table"]["status"] == "ok"
+    
+    async def test_required_failure_keeps_gate_closed(self):
+        """Test a failed required check makes the app report failed"""
+        readiness = Readiness()
+        assert await readiness.run("guardrail_workers", _fail()) is False
+        readiness.finish()
+        
+        assert not readiness.ready
+        snapshot = readiness.snapshot()
+        assert snapshot["status"] == "failed"
+        assert snapshot["checks"]["guardrail_workers"]["error"] == "RuntimeError: boom"
+    
+    async def test_optional_failure_does_not_block(self):
+        """Test a failed optional check is reported but the app is ready"""
+        readiness = Readiness()
+        await readiness.run("faq_table", _ok())
+        await readiness.run("llm_model", _fail(), required=False)
+        readiness.finish()
+        
+        assert readiness.ready
+        assert readiness.snapshot()["checks"]["llm_model"]["status"] == "failed"
+    
+    async def test_duration_recorded(self):
+        """Test each check records how long it took"""
+        readiness = Readiness()
+        await readiness.run("slow", asyncio.sleep(0.02))
+        
+        assert readiness.checks["slow"]["ms"] >= 15
@@ -0,0 +1,203 @@
+"""Tests for the persistent response cache"""
+
+import time
+import pytest
+from unittest.mock import AsyncMock
+from app.core.metrics import metrics
+from app.services.generation import GenerationOutcome
+from app.services.response_cache import (
+    CachedLLMService,
+    ResponseCache,
+    cache_fingerprint,
+    cache_key,
+)
+
+
+@pytest.fixture
+def make_cache(tmp_path):
+    """Factory opening caches on one database file; closes them afterwards"""
+    caches = []
+
+    def factory(**options):
+        cache = ResponseCache(str(tmp_path / "responses.sqlite3"), **options)
+        caches.append(cache)
+        return cache
+
+    yield factory
+    for cache in caches:
+        cache.close()
+
+
+class TestCacheKey:
+    """Test key derivation"""
+
+    def test_compact_and_stable(self):
+        """Test keys are 16 bytes and independent of option order"""
+        key = cache_key("llama3", "hi", {"a": 1, "b": 2})
+        assert len(key) == 16
+        assert key == cache_key("llama3", "hi", {"b": 2, "a": 1})
+
+    def test_inputs_change_key(self):
+        """Test model, prompt and options are all part of the key"""
+        base = cache_key("llama3", "hi", {"max_predict": 512})
+        assert base != cache_key("mistral", "hi", {"max_predict": 512})
+        assert base != cache_key("llama3", "hi!", {"max_predict": 512})
+        assert base != cache_key("llama3", "hi", {"max_predict": 256})
+
+
+class TestResponseCache:
+    """Test storage, expiry, eviction and invalidation"""
+
+    @pytest.fixture(autouse=True)
+    def reset_metrics(self):
+        metrics.reset()
+
+    def test_round_trip(self, make_cache):
+        """Test a stored answer is returned and counted as a hit"""
+        cache = make_cache()
+        key = cache_key("llama3", "hi")
+        assert cache.get(key) is None
+        cache.put(key, "hello")
+        assert cache.get(key) == "hello"
+        assert metrics.counter("response_cache.hits") == 1
+        assert metrics.counter("response_cache.lookups") == 2
+
+    def test_shared_across_instances(self, make_cache):
+        """Test another worker (or a restart) sees the same entries"""
+        make_cache(fingerprint="f").put(b"k" * 16, "hello")
+        assert make_cache(fingerprint="f").get(b"k" * 16) == "hello"
+
+    def test_fingerprint_change_invalidates(self, make_cache):
+        """Test a new model or system prompt drops every entry"""
+        old = cache_fingerprint("llama3", "You are helpful")
+        make_cache(fingerprint=old).put(b"k" * 16, "hello")
+
+        same = make_cache(fingerprint=old)
+        assert same.get(b"k" * 16) == "hello"
+        changed = make_cache(fingerprint=cache_fingerprint("llama3", "Be brief"))
+        assert changed.get(b"k" * 16) is None
+        assert metrics.counter("response_cache.invalidations") == 1
+
+    def test_expired_entry_misses(self, make_cache):
+        """Test entries older than the TTL are misses and compacted away"""
+        cache = make_cache(ttl_seconds=0.05)
+        cache.put(b"k" * 16, "hello")
+        time.sleep(0.06)
+        assert cache.get(b"k" * 16) is None
+        assert cache.compact() == 1
+
+    def test_compaction_evicts_least_recently_used(self, make_cache):
+        """Test compaction evicts the least recently used entries down to the cap"""
+        cache = make_cache(max_bytes=10, compact_interval=3600)
+        for name in ("a", "b"):
+            cache.put(name.encode() * 16, name * 4)
+            time.sleep(0.01)
+        cache.get(b"a" * 16)  # a becomes the most recently used
+        time.sleep(0.01)
+        cache.put(b"c" * 16, "cccc")
+
+        cache.compact()
+        assert cache.get(b"b" * 16) is None
+        assert cache.get(b"a" * 16) == "aaaa"
+        assert cache.get(b"c" * 16) == "cccc"
+        assert metrics.counter("response_cache.evicted") == 1
+
+    def test_background_compaction_after_writes(self, make_cache):
+        """Test writing a tenth of the cap wakes the compaction thread"""
+        cache = make_cache(max_bytes=100, compact_interval=3600)
+        for n in range(12):
+            cache.put(bytes([n]) * 16, "x" * 10)
+
+        # Wake-ups can land mid-loop, so earlier passes may evict less
+        for _ in range(200):
+            if metrics.counter("response_cache.evicted") >= 2:
+                break
+            time.sleep(0.01)
+        assert metrics.counter("response_cache.evicted") >= 2
+
+    def test_oversized_answer_not_cached(self, make_cache):
+        """Test an answer larger than the whole cap is skipped"""
+        cache = make_cache(max_bytes=4)
+        cache.put(b"k" * 16, "too long")
+        assert cache.get(b"k" * 16) is None
+
+
+@pytest.mark.asyncio
+class TestCachedLLMService:
+    """Test the cache tier in front of the LLM service"""
+
+    @pytest.fixture
+    def inner(self):
+        inner = AsyncMock()
+        inner.done_reason = "stop"
+
+        async def generate(prompt, *, outcome=None, **kwargs):
+            if outcome is not None:
+                outcome.done_reason = inner.done_reason
+            return "generated"
+
+        async def stream(prompt, *, outcome, **kwargs):
+            for chunk in ("gene", "rated"):
+                yield chunk
+            outcome.done_reason = inner.done_reason
+
+        inner.generate = AsyncMock(side_effect=generate)
+        inner.generate_stream = stream
+        return inner
+
+    async def test_repeated_prompt_served_from_cache(self, make_cache, inner):
+        """Test the second identical prompt does not reach the LLM"""
+        service = CachedLLMService(inner, make_cache(), "llama3")
+        assert await service.generate("hi", session_id="s1") == "generated"
+        assert await service.generate("hi", session_id="s2") == "generated"
+        assert inner.generate.await_count == 1
+
+    async def test_follow_up_turns_bypass_cache(self, make_cache, inner):
+        """Test generations continuing a KV context are never cached"""
+        service = CachedLLMService(inner, make_cache(), "llama3")
+        for _ in range(2):
+            await service.generate("history + hi", session_id="s1", turn_prompt="hi")
+        assert inner.generate.await_count == 2
+
+    async def test_stream_cached_after_completion(self, make_cache, inner):
+        """Test a streamed answer is cached and replayed as one chunk"""
+        service = CachedLLMService(inner, make_cache(), "llama3")
+        first = [chunk async for chunk in service.generate_stream("hi")]
+        second = [chunk async for chunk in service.generate_stream("hi")]
+        assert first == ["gene", "rated"]
+        assert second == ["generated"]
+        assert await service.generate("hi") == "generated"
+        inner.generate.assert_not_awaited()
+
+    async def test_truncated_answer_not_cached(self, make_cache, inner):
+        """Test answers cut off at num_predict are served but not stored"""
+        metrics.reset()
+        service = CachedLLMService(inner, make_cache(), "llama3")
+        inner.done_reason = "length"
+        assert [chunk async for chunk in service.generate_stream("hi")] == ["gene", "rated"]
+        assert await service.generate("hi") == "generated"
+        assert inner.generate.await_count == 1
+        assert metrics.counter("response_cache.skipped_incomplete") == 2
+
+    async def test_deadline_capped_answer_not_cached(self, make_cache, inner):
+        """Test an answer sized down to a short deadline is not replayed"""
+        service = CachedLLMService(inner, make_cache(), "llama3")
+
+        async def capped(prompt, *, outcome, **kwargs):
+            outcome.done_reason = "stop"
+            outcome.deadline_capped = True
+            return "short"
+
+        inner.generate.side_effect = capped
+        await service.generate("hi")
+        inner.generate.side_effect = None
+        inner.generate.return_value = "full"
+        assert await service.generate("hi", outcome=GenerationOutcome()) == "full"
+
+    async def test_hit_reports_complete_outcome(self, make_cache, inner):
+        """Test a cached answer counts as complete for the caller"""
+        service = CachedLLMService(inner, make_cache(), "llama3")
+        await service.generate("hi")
+        outcome = GenerationOutcome()
+        assert await service.generate("hi", outcome=outcome) == "generated"
+        assert outcome.complete
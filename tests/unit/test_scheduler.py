@@ -0,0 +1,204 @@
+"""Tests for fair LLM scheduler"""
+
+import asyncio
+import statistics
+import time
+import pytest
+from app.core.exceptions import DeadlineExceededError
+from app.services.scheduler import FairScheduler, Lane
+
+SERVICE_TIME = 0.01
+
+
+def p95(samples):
+    return statistics.quantiles(samples, n=20)[-1]
+
+
+async def fake_backend(scheduler, client_key, lane=Lane.INTERACTIVE):
+    """Fake LLM call with fixed service time; returns observed latency"""
+    started = time.monotonic()
+    async with scheduler.slot(client_key, lane):
+        await asyncio.sleep(SERVICE_TIME)
+    return time.monotonic() - started
+
+
+@pytest.mark.asyncio
+class TestFairScheduler:
+    """Test scheduling order and limits"""
+    
+    async def test_limit_respected(self):
+        """Test no more than `limit` generations run at once"""
+        scheduler = FairScheduler(limit=2)
+        peak = 0
+        
+        async def work():
+            nonlocal peak
+            async with scheduler.slot("ip:a"):
+                peak = max(peak, scheduler.in_flight)
+                await asyncio.sleep(0.005)
+        
+        await asyncio.gather(*(work() for _ in range(8)))
+        assert peak == 2
+        assert scheduler.in_flight == 0
+    
+    async def test_round_robin_between_clients(self):
+        """Test a flooding client does not starve a later one"""
+        scheduler = FairScheduler(limit=1)
+        order = []
+        
+        async def work(client):
+            async with scheduler.slot(client):
+                order.append(client)
+                await asyncio.sleep(0)
+        
+        heavy = [asyncio.ensure_future(work("heavy")) for _ in range(6)]
+        await asyncio.sleep(0)
+        light = [asyncio.ensure_future(work("light")) for _ in range(2)]
+        await asyncio.gather(*heavy, *light)
+        
+        # Light requests are interleaved near the front, not queued behind heavy
+        assert order.index("light") <= 2
+        assert order[:5].count("light") == 2
+    
+    async def test_client_weights(self):
+        """Test a client with weight 2 gets twice the share"""
+        scheduler = FairScheduler(limit=1, client_weights={"gold": 2.0})
+        order = []
+        
+        async def work(client):
+            async with scheduler.slot(client):
+                order.append(client)
+                await asyncio.sleep(0)
+        
+        blocker = asyncio.ensure_future(work("blocker"))
+        await asyncio.sleep(0)
+        tasks = [asyncio.ensure_future(work(c)) for c in ["gold", "std"] * 6]
+        await asyncio.gather(blocker, *tasks)
+        
+        first = order[1:7]
+        assert first.count("gold") == 4
+        assert first.count("std") == 2
+    
+    async def test_interactive_lane_first(self):
+        """Test interactive requests overtake queued batch requests"""
+        scheduler = FairScheduler(limit=1, batch_share=1.0)
+        order = []
+        
+        async def work(lane):
+            async with scheduler.slot("ip:a", lane):
+                order.append(lane)
+                await asyncio.sleep(0)
+        
+        await scheduler.acquire("ip:a", Lane.BATCH)
+        tasks = [asyncio.ensure_future(work(Lane.BATCH)) for _ in range(3)]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.ensure_future(work(Lane.INTERACTIVE)))
+        await asyncio.sleep(0)
+        scheduler.release(Lane.BATCH)
+        await asyncio.gather(*tasks)
+        
+        assert order[0] is Lane.INTERACTIVE
+    
+    async def test_batch_share_caps_batch_lane(self):
+        """Test batch lane leaves capacity for interactive traffic"""
+        scheduler = FairScheduler(limit=4, batch_share=0.5)
+        peak_batch = 0
+        
+        async def work():
+            nonlocal peak_batch
+            async with scheduler.slot("ip:a", Lane.BATCH):
+                peak_batch = max(peak_batch, scheduler.in_flight)
+                await asyncio.sleep(0.005)
+        
+        await asyncio.gather(*(work() for _ in range(10)))
+        assert peak_batch == 2
+    
+    async def test_cancelled_waiter_skipped(self):
+        """Test a cancelled waiter neither runs nor leaks a slot"""
+        scheduler = FairScheduler(limit=1)
+        await scheduler.acquire("ip:a")
+        waiter = asyncio.ensure_future(scheduler.acquire("ip:b"))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        scheduler.release()
+        assert scheduler.in_flight == 0
+        assert scheduler.queued() == 0
+    
+    async def test_deadline_while_queued(self):
+        """Test a request whose deadline passes in the queue is dropped"""
+        scheduler = FairScheduler(limit=1)
+        await scheduler.acquire("ip:a")
+        with pytest.raises(DeadlineExceededError):
+            await scheduler.acquire("ip:b", deadline=time.monotonic() + 0.01)
+        scheduler.release()
+        assert scheduler.in_flight == 0
+        assert scheduler.queued() == 0
+
+    
+    async def test_deadline_racing_grant_releases_slot(self):
+        """Test a slot granted while the loop overran the deadline is not leaked"""
+        scheduler = FairScheduler(limit=1)
+        await scheduler.acquire("ip:a")
+        waiter = asyncio.ensure_future(
+            scheduler.acquire("ip:b", deadline=time.monotonic() + 0.05)
+        )
+        await asyncio.sleep(0)
+        
+        def release_then_block():
+            scheduler.release()
+            time.sleep(0.1)  # grant and timeout become due together
+        
+        asyncio.get_running_loop().call_later(0.04, release_then_block)
+        try:
+            await waiter
+        except DeadlineExceededError:
+            pass
+        else:
+            scheduler.release()
+        assert scheduler.in_flight == 0
+        assert scheduler.queued() == 0
+    
+    async def test_timeout_after_grant_releases_slot(self, monkeypatch):
+        """Test wait_for raising after the grant (as on 3.12) gives the slot back"""
+        scheduler = FairScheduler(limit=1)
+        await scheduler.acquire("ip:a")
+        
+        async def wait_for_granted_then_timeout(future, timeout):
+            scheduler.release()  # dispatches, granting `future`
+            assert future.done()
+            raise asyncio.TimeoutError
+        
+        monkeypatch.setattr(asyncio, "wait_for", wait_for_granted_then_timeout)
+        with pytest.raises(DeadlineExceededError):
+            await scheduler.acquire("ip:b", deadline=time.monotonic() + 1)
+        assert scheduler.in_flight == 0
+
+@pytest.mark.asyncio
+class TestSchedulerSimulation:
+    """Simulate a heavy client against light interactive clients"""
+    
+    async def test_heavy_client_does_not_inflate_interactive_p95(self):
+        """Test light clients' p95 stays near the service time under a flood"""
+        scheduler = FairScheduler(limit=2)
+        
+        async def light_client(name):
+            latencies = []
+            for _ in range(5):
+                latencies.append(await fake_backend(scheduler, name))
+                await asyncio.sleep(SERVICE_TIME)
+            return latencies
+        
+        heavy = [
+            asyncio.ensure_future(fake_backend(scheduler, "ip:heavy"))
+            for _ in range(60)
+        ]
+        await asyncio.sleep(0)
+        light = await asyncio.gather(*(light_client(f"ip:light{i}") for i in range(3)))
+        heavy_latencies = await asyncio.gather(*heavy)
+        
+        light_latencies = [latency for client in light for latency in client]
+        # FIFO would make every light request wait behind ~30 service times
+        assert p95(light_latencies) < SERVICE_TIME * 6
+        assert p95(heavy_latencies) > SERVICE_TIME * 20
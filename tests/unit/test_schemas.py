@@ -30,12 +30,25 @@ class TestChatRequest:
         with pytest.raises(ValidationError):
             ChatRequest(message="a" * 1001)
 
+    def test_session_id_optional(self):
+        req = ChatRequest(message="hello")
+        assert req.session_id is None
+
+    def test_session_id_accepted(self):
+        req = ChatRequest(message="hello", session_id="abc_123-XYZ")
+        assert req.session_id == "abc_123-XYZ"
+
+    def test_invalid_session_id_rejected(self):
+        with pytest.raises(ValidationError):
+            ChatRequest(message="hello", session_id="../etc")
+
 
 class TestChatResponse:
     def test_valid_response(self):
         resp = ChatResponse(response="hello", request_id="abc-123")
         assert resp.response == "hello"
         assert resp.request_id == "abc-123"
+        assert resp.session_id is None
 
     def test_missing_request_id_rejected(self):
         with pytest.raises(ValidationError):
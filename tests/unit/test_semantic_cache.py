@@ -0,0 +1,82 @@
+"""Tests for semantic answer cache"""
+
+import pytest
+from app.core.metrics import metrics
+from app.services.semantic_cache import SemanticCache
+
+
+class TestSemanticCache:
+    """Test nearest-neighbour lookup and eviction"""
+    
+    @pytest.fixture(autouse=True)
+    def reset_metrics(self):
+        metrics.reset()
+    
+    def test_empty_cache_misses(self):
+        """Test lookup on an empty cache misses"""
+        assert SemanticCache().lookup([1.0, 0.0]) is None
+    
+    def test_similar_vector_hits(self):
+        """Test a vector above the similarity threshold returns the answer"""
+        cache = SemanticCache(threshold=0.9)
+        cache.add([1.0, 0.0, 0.0], "projects answer")
+        assert cache.lookup([0.95, 0.1, 0.0]) == "projects answer"
+    
+    def test_dissimilar_vector_misses(self):
+        """Test a vector below the threshold misses"""
+        cache = SemanticCache(threshold=0.9)
+        cache.add([1.0, 0.0, 0.0], "projects answer")
+        assert cache.lookup([0.0, 1.0, 0.0]) is None
+    
+    def test_best_match_wins(self):
+        """Test the most similar cached prompt is returned"""
+        cache = SemanticCache(threshold=0.5)
+        cache.add([1.0, 0.0], "a")
+        cache.add([0.7, 0.7], "b")
+        assert cache.lookup([0.6, 0.8]) == "b"
+    
+    def test_scale_invariant(self):
+        """Test similarity is cosine (vector length does not matter)"""
+        cache = SemanticCache(threshold=0.99)
+        cache.add([2.0, 0.0], "a")
+        assert cache.lookup([10.0, 0.0]) == "a"
+    
+    def test_expired_rows_do_not_match(self):
+        """Test rows older than the TTL are ignored"""
+        cache = SemanticCache(ttl_seconds=0)
+        cache.add([1.0, 0.0], "a")
+        assert cache.lookup([1.0, 0.0]) is None
+    
+    def test_lru_row_evicted_when_full(self):
+        """Test the least recently used row is replaced at capacity"""
+        cache = SemanticCache(capacity=2, threshold=0.99)
+        cache.add([1.0, 0.0, 0.0], "a")
+        cache.add([0.0, 1.0, 0.0], "b")
+        cache.lookup([1.0, 0.0, 0.0])
+        cache.add([0.0, 0.0, 1.0], "c")
+        assert len(cache) == 2
+        assert cache.lookup([1.0, 0.0, 0.0]) == "a"
+        assert cache.lookup([0.0, 1.0, 0.0]) is None
+        assert cache.lookup([0.0, 0.0, 1.0]) == "c"
+    
+    def test_dimension_change_resets(self):
+        """Test switching embedding dimension starts a fresh matrix"""
+        cache = SemanticCache(threshold=0.99)
+        cache.add([1.0, 0.0], "a")
+        cache.add([1.0, 0.0, 0.0], "b")
+        assert len(cache) == 1
+        assert cache.lookup([1.0, 0.0]) is None
+    
+    def test_zero_vector_ignored(self):
+        """Test zero vectors are neither stored nor matched"""
+        cache = SemanticCache()
+        cache.add([0.0, 0.0], "a")
+        assert len(cache) == 0
+    
+    def test_hit_rate_metric(self):
+        """Test hit rate gauge follows lookups"""
+        cache = SemanticCache(threshold=0.9)
+        cache.add([1.0, 0.0], "a")
+        cache.lookup([1.0, 0.0])
+        cache.lookup([0.0, 1.0])
+        assert metrics.snapshot()["gauges"]["semantic_cache.hit_rate"] == 0.5
@@ -0,0 +1,67 @@
+"""Tests for JSON serialization helpers"""
+
+import json
+import logging
+import pytest
+from app.core import serialization
+from app.core.logging import JsonFormatter
+from app.core.serialization import FastJSONResponse, dumps, dumps_str
+from app.schemas.response import ChatResponse
+
+DATA = {"response": "안녕하세요", "count": 3, "ratio": 0.5, "items": [1, None, True]}
+
+
+class TestDumps:
+    """Test serializer backends"""
+
+    def test_compact_utf8(self):
+        """Test output is compact and keeps non-ASCII text"""
+        assert dumps(DATA) == json.dumps(
+            DATA, ensure_ascii=False, separators=(",", ":")
+        ).encode("utf-8")
+
+    def test_stdlib_fallback_matches(self, monkeypatch):
+        """Test the stdlib fallback produces the same bytes"""
+        expected = dumps(DATA)
+        monkeypatch.setattr(serialization, "orjson", None)
+
+        assert dumps(DATA) == expected
+
+    @pytest.mark.parametrize("use_orjson", [True, False])
+    def test_default_for_unknown_types(self, monkeypatch, use_orjson):
+        """Test `default` handles values JSON cannot represent"""
+        if not use_orjson:
+            monkeypatch.setattr(serialization, "orjson", None)
+
+        assert dumps_str({"value": object()}, default=lambda _: "x") == '{"value":"x"}'
+
+
+class TestFastJSONResponse:
+    """Test response rendering"""
+
+    def test_renders_model_without_revalidation(self):
+        """Test a pydantic model is dumped as is"""
+        model = ChatResponse(response="hi", request_id="req-1")
+
+        response = FastJSONResponse(model)
+
+        assert json.loads(response.body) == model.model_dump()
+        assert response.media_type == "application/json"
+
+    def test_renders_plain_content(self):
+        """Test dicts go through the fast serializer"""
+        assert FastJSONResponse(DATA).body == dumps(DATA)
+
+
+class TestJsonFormatter:
+    """Test structured log formatting"""
+
+    def test_extra_fields_and_unserializable_values(self):
+        """Test records with odd extra values still produce valid JSON"""
+        record = logging.LogRecord("test", logging.INFO, __file__, 1, "안녕", None, None)
+        record.request_id = object()
+
+        data = json.loads(JsonFormatter().format(record))
+
+        assert data["message"] == "안녕"
+        assert data["request_id"].startswith("<object")
@@ -0,0 +1,141 @@
+"""Tests for session stores and prompt building"""
+
+import pytest
+from app.services.prompt_builder import build_prompt
+from app.services.session_store import (
+    InMemorySessionStore,
+    SessionHistory,
+    SQLiteSessionStore,
+    Turn,
+    summarize_turn,
+)
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_store(request, tmp_path):
+    """Factory building either store implementation with the same limits"""
+    def factory(**options):
+        if request.param == "sqlite":
+            return SQLiteSessionStore(str(tmp_path / "sessions.sqlite3"), **options)
+        return InMemorySessionStore(**options)
+    return factory
+
+
+@pytest.mark.asyncio
+class TestSessionStore:
+    """Behaviour shared by all session store implementations"""
+    
+    async def test_unknown_session_is_empty(self, make_store):
+        """Test unknown session returns empty history"""
+        store = make_store()
+        history = await store.get_history("missing")
+        assert history.turns == []
+        assert history.summary == ""
+    
+    async def test_turns_returned_in_order(self, make_store):
+        """Test turns are returned oldest first"""
+        store = make_store()
+        await store.append_turn("s1", Turn("q1", "a1"))
+        await store.append_turn("s1", Turn("q2", "a2"))
+        history = await store.get_history("s1")
+        assert history.turns == [Turn("q1", "a1"), Turn("q2", "a2")]
+    
+    async def test_sessions_independent(self, make_store):
+        """Test sessions do not see each other's turns"""
+        store = make_store()
+        await store.append_turn("s1", Turn("q1", "a1"))
+        assert (await store.get_history("s2")).turns == []
+    
+    async def test_ring_buffer_summarises_old_turns(self, make_store):
+        """Test turns beyond max_turns are folded into the summary"""
+        store = make_store(max_turns=2)
+        for i in range(4):
+            await store.append_turn("s1", Turn(f"q{i}", f"a{i}. more"))
+        history = await store.get_history("s1")
+        assert history.turns == [Turn("q2", "a2. more"), Turn("q3", "a3. more")]
+        assert "q0" in history.summary
+        assert "q1" in history.summary
+        assert "more" not in history.summary
+    
+    async def test_summarisation_disabled(self, make_store):
+        """Test old turns are dropped when summarisation is disabled"""
+        store = make_store(max_turns=1, summary_max_chars=0)
+        await store.append_turn("s1", Turn("q0", "a0"))
+        await store.append_turn("s1", Turn("q1", "a1"))
+        history = await store.get_history("s1")
+        assert history.turns == [Turn("q1", "a1")]
+        assert history.summary == ""
+    
+    async def test_idle_sessions_expire(self, make_store):
+        """Test sessions idle longer than the TTL are evicted"""
+        store = make_store(ttl_seconds=0)
+        await store.append_turn("s1", Turn("q1", "a1"))
+        assert (await store.get_history("s1")).turns == []
+    
+    async def test_global_cap_evicts_least_recent_session(self, make_store):
+        """Test exceeding the global size cap evicts the oldest session"""
+        store = make_store(max_total_chars=25)
+        await store.append_turn("old", Turn("q" * 5, "a" * 5))
+        await store.append_turn("new", Turn("q" * 5, "a" * 5))
+        await store.append_turn("old", Turn("q" * 5, "a" * 5))
+        # "new" is now least recently used and must go
+        assert (await store.get_history("new")).turns == []
+        assert len((await store.get_history("old")).turns) == 2
+    
+    async def test_delete(self, make_store):
+        """Test deleted session is forgotten"""
+        store = make_store()
+        await store.append_turn("s1", Turn("q1", "a1"))
+        await store.delete("s1")
+        assert (await store.get_history("s1")).turns == []
+    
+    async def test_rejects_empty_ring_buffer(self, make_store):
+        """Test a store must keep at least one turn per session"""
+        with pytest.raises(ValueError):
+            make_store(max_turns=0)
+
+
+@pytest.mark.asyncio
+class TestInMemorySessionStore:
+    """In-memory specific accounting"""
+    
+    async def test_total_chars_tracked(self):
+        """Test global character count follows appends and deletes"""
+        store = InMemorySessionStore()
+        await store.append_turn("s1", Turn("abc", "de"))
+        assert store.total_chars == 5
+        await store.delete("s1")
+        assert store.total_chars == 0
+
+
+class TestSummarizeTurn:
+    """Test extractive summarisation"""
+    
+    def test_keeps_first_sentence(self):
+        """Test only the first sentence of the answer is kept"""
+        summary = summarize_turn("", Turn("q", "First. Second."), 100)
+        assert "First." in summary
+        assert "Second" not in summary
+    
+    def test_respects_max_chars(self):
+        """Test summary is trimmed to max_chars"""
+        summary = ""
+        for i in range(50):
+            summary = summarize_turn(summary, Turn(f"question {i}", "answer"), 120)
+        assert len(summary) <= 120
+        assert "question 49" in summary
+
+
+class TestBuildPrompt:
+    """Test prompt construction"""
+    
+    def test_no_history_returns_message(self):
+        """Test first turn sends the bare message"""
+        assert build_prompt("hello", SessionHistory()) == "hello"
+    
+    def test_history_included(self):
+        """Test previous turns and summary precede the new message"""
+        history = SessionHistory(turns=[Turn("q1", "a1")], summary="- earlier")
+        prompt = build_prompt("q2", history)
+        assert prompt.index("- earlier") < prompt.index("User: q1")
+        assert prompt.endswith("User: q2\nAssistant:")
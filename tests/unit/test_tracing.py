@@ -0,0 +1,306 @@
+"""Tests for in-process tracing"""
+
+import json
+import time
+import timeit
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from app.core import tracing
+from app.core.metrics import metrics
+from app.core.tracing import (
+    BatchSpanExporter,
+    Span,
+    current_traceparent,
+    parse_traceparent,
+    span,
+    start_trace,
+    traced,
+)
+from app.services.llm_service import OllamaService
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+PARENT_ID = "00f067aa0ba902b7"
+
+
+class FakeExporter:
+    """Collects finished spans in memory"""
+
+    def __init__(self):
+        self.spans = []
+
+    def export(self, span):
+        self.spans.append(span)
+
+
+@pytest.fixture
+def exporter(monkeypatch):
+    fake = FakeExporter()
+    monkeypatch.setattr(tracing, "get_span_exporter", lambda: fake)
+    return fake
+
+
+class TestTraceparent:
+    """Test W3C traceparent parsing"""
+
+    def test_sampled(self):
+        """Test a sampled traceparent is parsed"""
+        assert parse_traceparent(f"00-{TRACE_ID}-{PARENT_ID}-01") == (
+            TRACE_ID,
+            PARENT_ID,
+            True,
+        )
+
+    def test_not_sampled(self):
+        """Test the sampled flag is read"""
+        assert parse_traceparent(f"00-{TRACE_ID}-{PARENT_ID}-00")[2] is False
+
+    @pytest.mark.parametrize(
+        "value",
+        [
+            None,
+            "",
+            "garbage",
+            f"01-{TRACE_ID}-{PARENT_ID}-01",
+            f"00-{'0' * 32}-{PARENT_ID}-01",
+            f"00-{TRACE_ID}-{'0' * 16}-01",
+        ],
+    )
+    def test_invalid(self, value):
+        """Test malformed or all-zero traceparents are ignored"""
+        assert parse_traceparent(value) is None
+
+
+class TestSpans:
+    """Test span creation and nesting"""
+
+    def test_noop_outside_trace(self, exporter):
+        """Test spans outside a sampled trace are not recorded"""
+        with span("orphan") as current:
+            current.set_attribute("key", "value")
+
+        assert exporter.spans == []
+        assert current_traceparent() is None
+
+    def test_unsampled_trace_is_noop(self, exporter):
+        """Test a zero sample ratio records nothing"""
+        with start_trace("GET /", sample_ratio=0.0):
+            with span("child"):
+                pass
+
+        assert exporter.spans == []
+
+    def test_noop_overhead(self):
+        """Test an unsampled span costs well under a few microseconds"""
+        def unsampled():
+            with span("hot.path"):
+                pass
+
+        per_span = min(timeit.repeat(unsampled, number=20000, repeat=5)) / 20000
+
+        assert per_span < 3e-6
+
+    def test_nested_spans(self, exporter):
+        """Test children share the trace and point at their parent"""
+        with start_trace("POST /api/chat", sample_ratio=1.0) as root:
+            with span("guardrails.validate_input") as child:
+                assert current_traceparent() == f"00-{root.trace_id}-{child.span_id}-01"
+                with span("llm.generate") as grandchild:
+                    pass
+
+        assert [s.name for s in exporter.spans] == [
+            "llm.generate",
+            "guardrails.validate_input",
+            "POST /api/chat",
+        ]
+        assert {s.trace_id for s in exporter.spans} == {root.trace_id}
+        assert grandchild.parent_id == child.span_id
+        assert child.parent_id == root.span_id
+        assert root.parent_id is None
+        assert root.end_ns >= child.end_ns >= child.start_ns >= root.start_ns
+
+    def test_continues_incoming_trace(self, exporter):
+        """Test a sampled incoming traceparent is continued when trusted"""
+        with start_trace(
+            "GET /", f"00-{TRACE_ID}-{PARENT_ID}-01", trust_incoming=True
+        ) as root:
+            pass
+
+        assert root.trace_id == TRACE_ID
+        assert root.parent_id == PARENT_ID
+
+    def test_untrusted_sampled_flag_ignored(self, exporter):
+        """Test a client cannot force export with its own sampled flag"""
+        with start_trace("GET /", f"00-{TRACE_ID}-{PARENT_ID}-01"):
+            pass
+
+        assert exporter.spans == []
+
+    def test_untrusted_trace_sampled_locally(self, exporter):
+        """Test a locally sampled request still joins the caller's trace"""
+        with start_trace(
+            "GET /", f"00-{TRACE_ID}-{PARENT_ID}-00", sample_ratio=1.0
+        ) as root:
+            pass
+
+        assert root.trace_id == TRACE_ID
+
+    def test_unsampled_trace_propagated(self, exporter):
+        """Test an unsampled request forwards the caller's trace, flags 00"""
+        with start_trace("GET /", f"00-{TRACE_ID}-{PARENT_ID}-01") as root:
+            root.set_attribute("http.status_code", 200)
+            with span("child"):
+                assert current_traceparent() == f"00-{TRACE_ID}-{PARENT_ID}-00"
+
+        assert current_traceparent() is None
+        assert exporter.spans == []
+
+    def test_error_recorded(self, exporter):
+        """Test an exception marks the span as failed"""
+        with pytest.raises(ValueError):
+            with start_trace("GET /", sample_ratio=1.0):
+                raise ValueError("boom")
+
+        assert exporter.spans[0].error == "ValueError"
+        assert exporter.spans[0].to_otlp()["status"]["code"] == 2
+
+    @pytest.mark.asyncio
+    async def test_traced_decorator(self, exporter):
+        """Test sync and async functions are wrapped in spans"""
+        @traced("sync.work")
+        def work(x):
+            return x * 2
+
+        @traced("async.work")
+        async def async_work(x):
+            return x + 1
+
+        with start_trace("GET /", sample_ratio=1.0):
+            assert work(2) == 4
+            assert await async_work(2) == 3
+
+        assert [s.name for s in exporter.spans] == ["sync.work", "async.work", "GET /"]
+
+
+class TestBatchSpanExporter:
+    """Test batched OTLP/JSON file export"""
+
+    def _span(self, name):
+        return Span(name, TRACE_ID, "b7ad6b7169203331", PARENT_ID, end_ns=1)
+
+    def test_writes_batches(self, tmp_path):
+        """Test spans are written as OTLP export requests in batches"""
+        path = tmp_path / "traces.jsonl"
+        exporter = BatchSpanExporter(path, batch_size=2, flush_interval=60)
+        for n in range(5):
+            exporter.export(self._span(f"span-{n}"))
+        exporter.shutdown()
+
+        lines = [json.loads(line) for line in path.read_text().splitlines()]
+        batches = [
+            [s["name"] for s in line["resourceSpans"][0]["scopeSpans"][0]["spans"]]
+            for line in lines
+        ]
+        assert batches == [["span-0", "span-1"], ["span-2", "span-3"], ["span-4"]]
+        first = lines[0]["resourceSpans"][0]["scopeSpans"][0]["spans"][0]
+        assert first["traceId"] == TRACE_ID
+        assert first["parentSpanId"] == PARENT_ID
+
+    def test_flushes_after_interval(self, tmp_path):
+        """Test a partial batch is written once the interval passes"""
+        path = tmp_path / "traces.jsonl"
+        exporter = BatchSpanExporter(path, batch_size=100, flush_interval=0.01)
+        exporter.export(self._span("lonely"))
+
+        for _ in range(200):
+            if path.exists():
+                break
+            time.sleep(0.01)
+        exporter.shutdown()
+
+        assert "lonely" in path.read_text()
+
+    def test_full_queue_drops_spans(self, tmp_path):
+        """Test spans beyond the queue bound are dropped and counted"""
+        metrics.reset()
+        exporter = BatchSpanExporter(
+            tmp_path / "traces.jsonl", batch_size=100, flush_interval=60, max_queue=2
+        )
+        exporter._thread = MagicMock()  # no writer draining the queue
+        for n in range(5):
+            exporter.export(self._span(f"span-{n}"))
+
+        assert metrics.counter("tracing.spans_dropped") == 3
+
+    def test_file_rotated_at_cap(self, tmp_path):
+        """Test the export file is rotated once it reaches max_bytes"""
+        path = tmp_path / "traces.jsonl"
+        exporter = BatchSpanExporter(path, batch_size=1, flush_interval=60, max_bytes=500)
+        for n in range(6):
+            exporter.export(self._span(f"span-{n}"))
+        exporter.shutdown()
+
+        rotated = path.with_name("traces.jsonl.1")
+        assert rotated.exists()
+        assert path.stat().st_size <= 500
+        assert "span-5" in path.read_text()
+
+
+@pytest.mark.asyncio
+class TestOllamaPropagation:
+    """Test trace context is sent to Ollama"""
+
+    async def test_traceparent_header(self, exporter):
+        """Test the generate call carries the llm.generate span as parent"""
+        service = OllamaService(base_url="http://localhost:11434", model_name="llama3")
+        with patch("app.services.llm_service.httpx.AsyncClient") as mock_client_class:
+            mock_client = AsyncMock()
+            mock_response = MagicMock()
+            mock_response.json.return_value = {"response": "hi"}
+            mock_client.post = AsyncMock(return_value=mock_response)
+            mock_client.__aenter__.return_value = mock_client
+            mock_client.__aexit__.return_value = None
+            mock_client_class.return_value = mock_client
+
+            with start_trace("POST /api/chat", sample_ratio=1.0):
+                await service.generate("hello")
+
+        llm_span = exporter.spans[0]
+        assert llm_span.name == "llm.generate"
+        assert llm_span.attributes["llm.model"] == "llama3"
+        headers = mock_client.post.call_args.kwargs["headers"]
+        assert headers["traceparent"] == llm_span.traceparent
+
+    async def test_no_header_without_trace(self):
+        """Test nothing is added to calls outside any trace"""
+        service = OllamaService(base_url="http://localhost:11434", model_name="llama3")
+        with patch("app.services.llm_service.httpx.AsyncClient") as mock_client_class:
+            mock_client = AsyncMock()
+            mock_response = MagicMock()
+            mock_response.json.return_value = {"response": "hi"}
+            mock_client.post = AsyncMock(return_value=mock_response)
+            mock_client.__aenter__.return_value = mock_client
+            mock_client.__aexit__.return_value = None
+            mock_client_class.return_value = mock_client
+
+            await service.generate("hello")
+
+        assert mock_client.post.call_args.kwargs["headers"] == {}
+
+    async def test_unsampled_caller_trace_forwarded(self, exporter):
+        """Test an unsampled request passes the caller's trace on unsampled"""
+        service = OllamaService(base_url="http://localhost:11434", model_name="llama3")
+        with patch("app.services.llm_service.httpx.AsyncClient") as mock_client_class:
+            mock_client = AsyncMock()
+            mock_response = MagicMock()
+            mock_response.json.return_value = {"response": "hi"}
+            mock_client.post = AsyncMock(return_value=mock_response)
+            mock_client.__aenter__.return_value = mock_client
+            mock_client.__aexit__.return_value = None
+            mock_client_class.return_value = mock_client
+
+            with start_trace("POST /api/chat", f"00-{TRACE_ID}-{PARENT_ID}-01"):
+                await service.generate("hello")
+
+        headers = mock_client.post.call_args.kwargs["headers"]
+        assert headers["traceparent"] == f"00-{TRACE_ID}-{PARENT_ID}-00"
+        assert exporter.spans == []